@@ -1,14 +1,31 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
+import os
+import sys
+
+if __name__ == "__main__":
+    # Serve as `python -m uvicorn app:app` rather than from this script: spawned render processes re-run the main
+    # script, which would rebuild the app (job store, caches, backends) in every one of them
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "app:app", "--app-dir",
+                              os.path.dirname(os.path.abspath(__file__)), "--host", "0.0.0.0", "--port", "8000"])
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import List, Dict
-import uuid
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Dict, Optional, Tuple, Literal
 import asyncio
+import json
+import uuid
 import concurrent.futures
+import contextvars
+import requests
+import threading
+import time
 from pathlib import Path
 from loguru import logger
-from utils import AssetManager, CreativeGenerator, MetricsManager, ContentModerator, ImageGenerator
+from utils import (AssetManager, CreativeGenerator, MetricsManager, ContentModerator, ImageGenerator, VariantCache,
+                   JobStore, CampaignWorkerPool, RenderPool, ManifestManager, ProviderScheduler, SourceNormalizer,
+                   BodySizeLimitMiddleware, provider_registry, stream_zip, telemetry)
 
 app = FastAPI(title="Creative Automation Pipeline", version="1.0.0")
 
@@ -19,36 +36,171 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "ETag"],
 )
 
 # API Keys - Replace with actual API keys
 GROQ_API_KEY = "GROQ_API_KEY"
 REPLICATE_API_TOKEN = "REPLICATE_API_TOKEN"
 
-asset_manager = AssetManager()
+# Concurrency limits - products processed in parallel per campaign, and
+# img2img variants in flight across all campaigns
+MAX_CONCURRENT_PRODUCTS_PER_CAMPAIGN = 4
+MAX_CONCURRENT_VARIANTS = 6
+
+# Maximum size of a single uploaded asset, and files per upload request. Whole upload request bodies are capped
+# at MAX_UPLOAD_FILES files plus form overhead before they are parsed
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+MAX_UPLOAD_FILES = 10
+MAX_UPLOAD_REQUEST_BYTES = MAX_UPLOAD_FILES * MAX_UPLOAD_BYTES + 1024 * 1024
+
+# Source images over MAX_SOURCE_PIXELS are rejected; larger than MAX_WORKING_SIDE on the long side
+# they are decoded at reduced scale into a working copy (compare with python -m benchmarks.source_benchmark)
+MAX_SOURCE_PIXELS = 60_000_000
+MAX_WORKING_SIDE = 2048
+
+# Processes for CPU-bound decode/overlay/encode work (0 renders in the I/O threads)
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", str(os.cpu_count() or 1)))
+
+# Img2img variant cache - identical inputs skip the remote call entirely
+VARIANT_CACHE_ENABLED = True
+VARIANT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Preview renditions encoded with every creative ("avif" needs a Pillow build with AVIF support)
+RENDITION_FORMATS = ("thumbnail", "webp")
+RENDITION_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Overrides of the JPEG encoder defaults for final creatives (DEFAULT_ENCODER_SETTINGS in utils/creative_generator.py),
+# e.g. {"quality_per_ratio": {"9:16": 90}}. Opt in to {"progressive": True, "optimize": True} for ~10% smaller
+# files at about twice the encode time (compare settings with python -m benchmarks.encode_benchmark)
+JPEG_ENCODER_SETTINGS = {}
+
+# Durable campaign state and job queue shared by every API and worker process.
+# Set CAMPAIGN_WORKERS=0 on API processes when running dedicated workers (worker.py)
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.sqlite3")
+CAMPAIGN_WORKERS = int(os.getenv("CAMPAIGN_WORKERS", "2"))
+JOB_LEASE_SECONDS = 120
+
+# Campaign progress stream: how often the event log is checked, and the idle keepalive interval
+EVENT_POLL_SECONDS = 0.5
+EVENT_KEEPALIVE_SECONDS = 15
+
+# Per-provider scheduling: request rate quota (0 = none), bounds for the adaptive concurrency limit,
+# latency above which concurrency is reduced, retries and circuit breaker. Set rates just under the account quotas
+PROVIDER_LIMITS = {
+    "replicate": {"rate_per_second": 5.0, "burst": 5, "max_concurrency": MAX_CONCURRENT_VARIANTS,
+                  "latency_target_seconds": 120.0, "max_retries": 3, "failure_threshold": 5,
+                  "reset_timeout_seconds": 30.0},
+    "download": {"rate_per_second": 0.0, "max_concurrency": 16, "max_retries": 3, "failure_threshold": 10,
+                 "reset_timeout_seconds": 15.0},
+    "groq": {"rate_per_second": 0.5, "burst": 5, "max_concurrency": 4, "latency_target_seconds": 20.0,
+             "max_retries": 4, "failure_threshold": 5, "reset_timeout_seconds": 30.0},
+}
+
+# Provider backends (see utils/provider_registry.py): "replicate" or "procedural" for images, "groq" or
+# "rules" for moderation. The local procedural and rules backends need no network or API keys, so the
+# whole service runs offline for capacity tests or during provider outages
+IMAGE_BACKEND = os.getenv("IMAGE_BACKEND", "replicate")
+IMG2IMG_BACKEND = os.getenv("IMG2IMG_BACKEND", IMAGE_BACKEND)
+MODERATION_BACKEND = os.getenv("MODERATION_BACKEND", "groq")
+
+# Options per backend; remote SDK clients are only created on a backend's first call
+PROVIDER_BACKEND_OPTIONS = {
+    "text_to_image": {
+        "replicate": {"api_token": REPLICATE_API_TOKEN, "model": "black-forest-labs/flux-dev"},
+    },
+    "img2img": {
+        "replicate": {"api_token": REPLICATE_API_TOKEN,
+                      "model": "bxclib2/flux_img2img:0ce45202d83c6bd379dfe58f4c0c41e6cadf93ebbd9d938cc63cc0f2fcb729a5"},
+    },
+    "moderation": {
+        "groq": {"api_key": GROQ_API_KEY, "model": "llama-3.1-8b-instant"},
+    },
+}
+
+# Batch submission: maximum briefs per request, and how often campaigns check the shared preparation
+MAX_BATCH_CAMPAIGNS = 100
+BATCH_POLL_SECONDS = 1.0
+
+# Oversized uploads are refused before Starlette spools the multipart body to disk
+app.add_middleware(BodySizeLimitMiddleware, max_body_bytes=MAX_UPLOAD_REQUEST_BYTES, paths=["/assets/upload"])
+
+asset_manager = AssetManager(max_upload_bytes=MAX_UPLOAD_BYTES, max_source_pixels=MAX_SOURCE_PIXELS)
 metrics_manager = MetricsManager()
 
-image_generator = ImageGenerator(replicate_api_token=REPLICATE_API_TOKEN)
-content_moderator = ContentModerator(groq_api_key=GROQ_API_KEY)
+# One scheduler per remote provider, shared by every backend calling it (Replicate text-to-image and img2img)
+provider_scheduler_registry = {
+    "download": ProviderScheduler(
+        "download", retry_on=(requests.Timeout, requests.ConnectionError), **PROVIDER_LIMITS["download"]
+    )
+}
+
+def create_backend(kind: str, name: str):
+    """Build a backend from the registry with its configured options and its provider's scheduler"""
+    options = dict(PROVIDER_BACKEND_OPTIONS.get(kind, {}).get(name, {}))
+    if name in PROVIDER_LIMITS:
+        if name not in provider_scheduler_registry:
+            provider_scheduler_registry[name] = ProviderScheduler(name, **PROVIDER_LIMITS[name])
+        options["scheduler"] = provider_scheduler_registry[name]
+    return provider_registry.create(kind, name, **options)
 
-creative_generator = CreativeGenerator(image_generator=image_generator, asset_manager=asset_manager)
+image_generator = ImageGenerator(
+    text_to_image=create_backend("text_to_image", IMAGE_BACKEND),
+    img2img=create_backend("img2img", IMG2IMG_BACKEND),
+    download_scheduler=provider_scheduler_registry["download"]
+)
+content_moderator = ContentModerator(backend=create_backend("moderation", MODERATION_BACKEND))
+provider_schedulers = list(provider_scheduler_registry.values())
+variant_cache = VariantCache(max_size_bytes=VARIANT_CACHE_MAX_BYTES, enabled=VARIANT_CACHE_ENABLED)
+render_pool = RenderPool(max_workers=RENDER_PROCESSES)
+manifest_manager = ManifestManager()
 
-# Global storage for campaign results
-campaign_results: Dict[str, dict] = {}
+creative_generator = CreativeGenerator(
+    image_generator=image_generator,
+    asset_manager=asset_manager,
+    max_concurrent_variants=MAX_CONCURRENT_VARIANTS,
+    variant_cache=variant_cache,
+    render_pool=render_pool,
+    manifest_manager=manifest_manager,
+    rendition_formats=RENDITION_FORMATS,
+    encoder_settings=JPEG_ENCODER_SETTINGS,
+    source_normalizer=SourceNormalizer(max_working_side=MAX_WORKING_SIDE, max_source_pixels=MAX_SOURCE_PIXELS)
+)
 
-# Thread pool for background processing
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+job_store = JobStore(db_path=JOB_DB_PATH, lease_seconds=JOB_LEASE_SECONDS)
 
 
 class Product(BaseModel):
     name: str
     description: str
+    render_mode: Optional[Literal["remote", "local"]] = None
+
+class LocalizedMessage(BaseModel):
+    # BCP 47 style tag, also used as the output directory name (e.g. fr-CA)
+    locale: str = Field(pattern=r"^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$")
+    message: str
 
 class CampaignBrief(BaseModel):
     products: List[Product]
     target_region: str
     target_audience: str
     campaign_message: str
+    # Extra messages rendered over the same variants, one creative set per locale
+    localized_messages: List[LocalizedMessage] = []
+    max_concurrent_products: Optional[int] = None
+    bypass_cache: bool = False
+    render_mode: Literal["remote", "local"] = "remote"
+
+def localized_messages(brief: CampaignBrief) -> Dict[str, str]:
+    """Locale -> message of a brief"""
+    return {localized.locale: localized.message for localized in brief.localized_messages}
+
+def validate_brief(brief: CampaignBrief, prefix: str = ""):
+    """Checks beyond the model schema, raises HTTPException 400"""
+    if len(brief.products) < 2:
+        raise HTTPException(status_code=400, detail=f"{prefix}At least 2 products are required")
+    if len(localized_messages(brief)) != len(brief.localized_messages):
+        raise HTTPException(status_code=400, detail=f"{prefix}Each locale may only appear once in localized_messages")
 
 @app.get("/")
 async def root():
@@ -60,31 +212,27 @@ async def get_assets_info():
     return asset_manager.get_asset_info()
 
 @app.get("/campaign/{campaign_id}/images")
-async def list_campaign_images(campaign_id: str):
-    """List all generated images for a campaign"""
-    campaign_dir = Path("output") / campaign_id
+async def list_campaign_images(campaign_id: str, request: Request):
+    """List all generated images for a campaign from its manifest (supports If-None-Match)"""
+    loaded = manifest_manager.get_manifest(campaign_id)
     
-    if not campaign_dir.exists():
+    if loaded is None:
         raise HTTPException(status_code=404, detail="Campaign output not found")
     
-    images = {}
-    for product_dir in campaign_dir.iterdir():
-        if product_dir.is_dir():
-            product_images = []
-            for image_file in product_dir.glob("*.jpg"):
-                product_images.append({
-                    "filename": image_file.name,
-                    "path": str(image_file.relative_to(Path("."))),
-                    "size": image_file.stat().st_size,
-                    "aspect_ratio": image_file.stem.split('_')[-1].replace('x', ':')
-                })
-            images[product_dir.name] = product_images
+    manifest, etag = loaded
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
     
-    return {
-        "campaign_id": campaign_id,
-        "images": images,
-        "total_images": sum(len(imgs) for imgs in images.values())
-    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(
+        content={
+            "campaign_id": campaign_id,
+            "images": manifest["images"],
+            "total_images": manifest["total_images"]
+        },
+        headers=headers
+    )
 
 @app.get("/campaign/{campaign_id}/download/{product_name}/{filename}")
 async def download_campaign_image(campaign_id: str, product_name: str, filename: str):
@@ -100,6 +248,60 @@ async def download_campaign_image(campaign_id: str, product_name: str, filename:
         filename=filename
     )
 
+@app.get("/campaign/{campaign_id}/renditions/{product_name}/{filename}")
+async def get_campaign_rendition(campaign_id: str, product_name: str, filename: str):
+    """Serve a thumbnail or preview rendition; names are content-hashed so they are cached indefinitely"""
+    rendition = manifest_manager.get_rendition(campaign_id, product_name, filename)
+    
+    if rendition is None or not Path(rendition["path"]).exists():
+        raise HTTPException(status_code=404, detail="Rendition not found")
+    
+    return FileResponse(
+        path=rendition["path"],
+        media_type=rendition["media_type"],
+        headers={"Cache-Control": RENDITION_CACHE_CONTROL}
+    )
+
+@app.get("/campaign/{campaign_id}/download-all")
+async def download_campaign_archive(
+    campaign_id: str,
+    product: Optional[str] = Query(None, description="Only include this product"),
+    ratio: Optional[str] = Query(None, description="Only include this aspect ratio, e.g. 9:16 or 9x16"),
+    locale: Optional[str] = Query(None, description="Only include creatives of this locale (the primary message is excluded)")
+):
+    """Stream a ZIP of all campaign creatives and their localized versions, built on the fly without a temporary archive"""
+    loaded = manifest_manager.get_manifest(campaign_id)
+    
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Campaign output not found")
+    
+    manifest, _ = loaded
+    product_filter = AssetManager.normalize_product_name(product) if product else None
+    ratio_filter = ratio.replace("x", ":") if ratio else None
+    
+    files = []
+    for product_dir, images in manifest["images"].items():
+        if product_filter is not None and product_dir != product_filter:
+            continue
+        for image in images:
+            if ratio_filter is not None and image["aspect_ratio"] != ratio_filter:
+                continue
+            if locale is None:
+                files.append((Path(image["path"]), f"{campaign_id}/{product_dir}/{image['filename']}"))
+            for image_locale, localized in image.get("locales", {}).items():
+                if locale is None or image_locale == locale:
+                    files.append((Path(localized["path"]),
+                                  f"{campaign_id}/{product_dir}/locales/{image_locale}/{localized['filename']}"))
+    
+    if not files:
+        raise HTTPException(status_code=404, detail="No images match the requested filters")
+    
+    return StreamingResponse(
+        stream_zip(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="campaign_{campaign_id}.zip"'}
+    )
+
 @app.get("/campaigns")
 async def list_campaigns():
     """List all available campaign IDs from output folder"""
@@ -113,49 +315,183 @@ async def list_campaigns():
     
     return campaign_ids
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get img2img variant and moderation verdict cache statistics, and coalesced hero image generations"""
+    return {
+        "variants": variant_cache.get_stats(),
+        "moderation": content_moderator.get_cache_stats(),
+        "hero_generation": creative_generator.hero_flights.get_stats()
+    }
+
 @app.get("/metrics")
-async def get_all_metrics():
-    """Get metrics for all campaigns"""
-    return metrics_manager.list_all_metrics()
+async def get_all_metrics(
+    response: Response,
+    status: Optional[str] = Query(None, description="Filter by final status, e.g. completed"),
+    since: Optional[str] = Query(None, description="ISO timestamp lower bound"),
+    until: Optional[str] = Query(None, description="ISO timestamp upper bound"),
+    product: Optional[str] = Query(None, description="Only campaigns containing this product"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; every matching record if omitted"),
+    offset: int = Query(0, ge=0)
+):
+    """Get campaign metrics, newest first, optionally a page of them (total count in X-Total-Count)"""
+    # SQLite treats a negative LIMIT as no limit
+    page = await run_in_threadpool(metrics_manager.query_metrics, status, since, until, product,
+                                   -1 if limit is None else limit, offset)
+    response.headers["X-Total-Count"] = str(page["total"])
+    return page["items"]
+
+@app.get("/metrics/aggregates")
+async def get_metrics_aggregates(
+    since: Optional[str] = Query(None, description="ISO timestamp lower bound"),
+    until: Optional[str] = Query(None, description="ISO timestamp upper bound"),
+    product: Optional[str] = Query(None, description="Only campaigns containing this product")
+):
+    """Get success rate, asset reuse counts and creatives per day across campaigns"""
+    return await run_in_threadpool(metrics_manager.get_aggregates, since, until, product)
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Stage timing histograms, counters, queue depth and cache counters in Prometheus text format"""
+    variant_stats = variant_cache.get_stats()
+    moderation_stats = content_moderator.get_cache_stats()
+    queue_stats = await run_in_threadpool(job_store.get_queue_stats)
+    sampled = {
+        "pipeline_job_queue_depth": (
+            "gauge",
+            "Campaign jobs by state",
+            {(("state", state),): count for state, count in queue_stats.items()}
+        ),
+        "pipeline_cache_lookups_total": (
+            "counter",
+            "Cache lookups by cache and result",
+            {
+                (("cache", "variants"), ("result", "hit")): variant_stats["hits"],
+                (("cache", "variants"), ("result", "miss")): variant_stats["misses"],
+                (("cache", "moderation"), ("result", "hit")): moderation_stats["hits"],
+                (("cache", "moderation"), ("result", "miss")): moderation_stats["misses"],
+            }
+        ),
+        "pipeline_variant_cache_bytes": ("gauge", "Size of the img2img variant cache", {(): variant_stats["size_bytes"]}),
+    }
+    provider_stats = [scheduler.get_stats() for scheduler in provider_schedulers]
+    for name, key, help_text in (
+        ("pipeline_provider_concurrency_limit", "concurrency_limit", "Current adaptive concurrency limit per provider"),
+        ("pipeline_provider_in_flight", "in_flight", "Provider calls in flight"),
+        ("pipeline_provider_queue_length", "queued", "Provider calls waiting for a concurrency slot or rate token"),
+    ):
+        sampled[name] = ("gauge", help_text, {(("provider", stats["provider"]),): stats[key] for stats in provider_stats})
+    sampled["pipeline_provider_circuit_open"] = (
+        "gauge",
+        "1 while the provider's circuit breaker rejects calls",
+        {(("provider", stats["provider"]),): int(stats["circuit"] != "closed") for stats in provider_stats}
+    )
+    return PlainTextResponse(telemetry.render_prometheus(sampled), media_type="text/plain; version=0.0.4")
 
 @app.get("/campaign/{campaign_id}")
 async def get_campaign_result(campaign_id: str):
     """Get specific campaign result"""
-    if campaign_id not in campaign_results:
+    result = await run_in_threadpool(job_store.get_campaign, campaign_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
-    # Create a clean copy to avoid any reference issues during background processing
-    return campaign_results[campaign_id].copy()
+    return result
+
+@app.get("/campaign/{campaign_id}/events")
+async def stream_campaign_events(
+    campaign_id: str,
+    request: Request,
+    after: int = Query(0, ge=0, description="Only send events after this id, e.g. last_event_id of a status snapshot")
+):
+    """Server-Sent Events stream of campaign progress: log lines, creatives as they are saved, status changes"""
+    if await run_in_threadpool(job_store.get_job_state, campaign_id) is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    # Reconnecting EventSource clients resume from the last event they received
+    last_event_id = request.headers.get("last-event-id")
+    last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else after
+    
+    async def event_stream():
+        nonlocal last_id
+        idle_seconds = 0.0
+        while not await request.is_disconnected():
+            events = await run_in_threadpool(job_store.get_events, campaign_id, last_id)
+            for event in events:
+                last_id = event["id"]
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            
+            if events:
+                idle_seconds = 0.0
+                continue
+            
+            # Job finished and every event is delivered - nothing more will come
+            state = await run_in_threadpool(job_store.get_job_state, campaign_id)
+            if state in ("done", "failed"):
+                yield f"event: end\ndata: {json.dumps({'state': state})}\n\n"
+                return
+            
+            if idle_seconds >= EVENT_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                idle_seconds = 0.0
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+            idle_seconds += EVENT_POLL_SECONDS
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/assets/upload")
 async def upload_product_image(
     product_name: str = Form(..., description="Name of the product"),
-    image: UploadFile = File(..., description="Image file to upload")
+    image: Optional[UploadFile] = File(None, description="Image file to upload"),
+    images: List[UploadFile] = File([], description="Additional image files to upload in the same request")
 ):
-    """Upload an image for a product to be stored in assets/product_name/"""
+    """Upload one or more images for a product to be stored in assets/product_name/"""
     try:
         if not product_name.strip():
             raise HTTPException(status_code=400, detail="Product name cannot be empty")
         
-        if not image.filename:
+        uploads = ([image] if image else []) + list(images)
+        if not uploads or any(not upload.filename for upload in uploads):
             raise HTTPException(status_code=400, detail="No file provided")
+        if len(uploads) > MAX_UPLOAD_FILES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_UPLOAD_FILES} files per upload")
         
-        result = asset_manager.save_uploaded_image(product_name, image)
+        # Stream each file to disk off the event loop
+        results = []
+        for upload in uploads:
+            result = await run_in_threadpool(asset_manager.save_uploaded_image, product_name, upload)
+            results.append(result)
+            
+            if result["duplicate"]:
+                logger.info(f"Skipped duplicate upload for product '{product_name}': {result['filename']}")
+            else:
+                logger.info(f"Successfully uploaded image for product '{product_name}': {result['filename']}")
         
-        logger.info(f"Successfully uploaded image for product '{product_name}': {result['filename']}")
+        files = [
+            {
+                "filename": result["filename"],
+                "size": result["size"],
+                "path": result["path"],
+                "content_hash": result["content_hash"],
+                "duplicate": result["duplicate"]
+            }
+            for result in results
+        ]
         
         return {
             "status": "success",
-            "message": f"Image uploaded successfully for product '{product_name}'",
+            "message": f"{len(files)} image(s) uploaded successfully for product '{product_name}'",
             "product_name": product_name,
-            "file_info": {
-                "filename": result["filename"],
-                "size": result["size"],
-                "path": result["path"]
-            },
-            "asset_directory": result["product_directory"]
+            "file_info": files[0],
+            "files": files,
+            "asset_directory": results[0]["product_directory"]
         }
         
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Upload validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -164,29 +500,24 @@ async def upload_product_image(
         raise HTTPException(status_code=500, detail="Internal server error during file upload")
 
 @app.post("/generate-campaign")
-async def generate_campaign(brief: CampaignBrief, background_tasks: BackgroundTasks):
+async def generate_campaign(brief: CampaignBrief):
     """Generate creative campaign from JSON brief - returns immediately"""
     
     # Quick validation
-    if len(brief.products) < 2:
-        raise HTTPException(status_code=400, detail="At least 2 products are required")
+    validate_brief(brief)
     
     # Generate campaign ID immediately
     campaign_id = str(uuid.uuid4())[:8]
     
     logger.info(f"Campaign {campaign_id} accepted for processing with {len(brief.products)} products")
     
-    # Initialize campaign status immediately
-    campaign_results[campaign_id] = {
-        "campaign_id": campaign_id,
-        "status": "processing",
-        "brief": brief.dict(),
-        "creatives": {},
-        "logs": [f"Campaign {campaign_id} started and queued for processing"]
-    }
-    
-    # Add background task to process the campaign asynchronously in thread pool
-    background_tasks.add_task(process_campaign_wrapper, campaign_id, brief)
+    # Persist campaign and queue its job; a worker picks it up from the store
+    await run_in_threadpool(
+        job_store.create_campaign,
+        campaign_id,
+        brief.dict(),
+        f"Campaign {campaign_id} started and queued for processing"
+    )
     
     # Return immediately with campaign ID
     return {
@@ -195,114 +526,519 @@ async def generate_campaign(brief: CampaignBrief, background_tasks: BackgroundTa
         "message": f"Campaign {campaign_id} has been queued for processing. Use the campaign ID to check status."
     }
 
-async def process_campaign_wrapper(campaign_id: str, brief: CampaignBrief):
-    """Wrapper to run campaign processing in thread pool"""
-    loop = asyncio.get_event_loop()
+@app.post("/campaign/{campaign_id}/rerender")
+async def rerender_campaign(campaign_id: str, brief: CampaignBrief):
+    """
+    Re-render a finished campaign with a modified brief as a new campaign - returns immediately.
+    Products whose variants are unchanged only get their text overlay redone
+    """
+    source = await run_in_threadpool(job_store.get_campaign, campaign_id)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if source["status"] == "processing":
+        raise HTTPException(status_code=409, detail="Campaign is still processing")
+    validate_brief(brief)
+    
+    plan = await run_in_threadpool(plan_rerender, campaign_id, CampaignBrief(**source["brief"]), source["status"], brief)
+    
+    rerender_id = str(uuid.uuid4())[:8]
+    logger.info(f"Campaign {rerender_id} accepted as a re-render of {campaign_id}: {plan}")
+    await run_in_threadpool(
+        job_store.create_campaign,
+        rerender_id,
+        brief.dict(),
+        f"Campaign {rerender_id} started as a re-render of campaign {campaign_id} and queued for processing",
+        source_campaign_id=campaign_id
+    )
+    
+    return {
+        "status": "accepted",
+        "campaign_id": rerender_id,
+        "source_campaign_id": campaign_id,
+        "plan": plan,
+        "message": f"Campaign {rerender_id} has been queued for processing. Use the campaign ID to check status."
+    }
+
+def plan_rerender(source_campaign_id: str, source_brief: CampaignBrief, source_status: str,
+                  brief: CampaignBrief) -> Dict:
+    """
+    Compare a modified brief with the campaign it was derived from
+    Returns: moderation "reused" or "rerun", and per product "overlay_only" (kept variants are
+    re-overlaid), "regenerate" (prompt or render mode changed, or no kept variants) or "new"
+    """
+    text_unchanged = (brief.campaign_message == source_brief.campaign_message
+                      and localized_messages(brief) == localized_messages(source_brief)
+                      and brief.target_audience == source_brief.target_audience)
+    source_products = {product.name: product for product in source_brief.products}
+    
+    products = {}
+    for product in brief.products:
+        previous = source_products.get(product.name)
+        render_mode = product.render_mode or brief.render_mode
+        if previous is None:
+            products[product.name] = "new"
+        elif (render_mode == "remote" and not brief.bypass_cache
+              and previous.description == product.description
+              and (previous.render_mode or source_brief.render_mode) == render_mode
+              and len(creative_generator.find_variants(product_output_dir(source_campaign_id, product.name),
+                                                       product.name)) == len(creative_generator.aspect_ratios)):
+            products[product.name] = "overlay_only"
+        else:
+            products[product.name] = "regenerate"
+    
+    return {
+        "moderation": "reused" if text_unchanged and source_status == "completed" else "rerun",
+        "products": products,
+        "removed_products": [name for name in source_products if name not in products]
+    }
+
+def _parse_batch_briefs(body: bytes) -> List[CampaignBrief]:
+    """Parse a JSON array or JSON Lines body into validated briefs, errors name the brief index"""
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 encoded JSON or JSON Lines")
+    
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        items = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_number}: {e.msg}")
+    
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="Expected a JSON array or JSON Lines of campaign briefs")
+    if len(items) > MAX_BATCH_CAMPAIGNS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CAMPAIGNS} briefs per batch")
+    
+    briefs = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=422, detail=f"Brief {index}: expected a JSON object")
+        try:
+            brief = CampaignBrief(**item)
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+            raise HTTPException(status_code=422, detail=f"Brief {index}: {problems}")
+        validate_brief(brief, prefix=f"Brief {index}: ")
+        briefs.append(brief)
+    return briefs
+
+@app.post("/generate-campaigns")
+async def generate_campaigns(request: Request):
+    """
+    Generate many campaigns from a JSON array or JSON Lines body - returns immediately.
+    Moderation, hero images and img2img variants shared between the briefs are computed once
+    """
+    briefs = _parse_batch_briefs(await request.body())
+    
+    batch_id = str(uuid.uuid4())[:8]
+    campaigns = []
+    for brief in briefs:
+        campaign_id = str(uuid.uuid4())[:8]
+        campaigns.append((
+            campaign_id,
+            brief.dict(),
+            f"Campaign {campaign_id} started and queued for processing in batch {batch_id}"
+        ))
+    
+    logger.info(f"Batch {batch_id} accepted for processing with {len(campaigns)} campaigns")
+    await run_in_threadpool(job_store.create_batch, batch_id, campaigns)
+    
+    return {
+        "status": "accepted",
+        "batch_id": batch_id,
+        "campaign_ids": [campaign_id for campaign_id, _, _ in campaigns],
+        "message": f"Batch {batch_id} with {len(campaigns)} campaigns has been queued for processing."
+    }
+
+@app.get("/batch/{batch_id}")
+async def get_batch_result(batch_id: str):
+    """Get batch status, per-campaign statuses and shared preparation stats"""
+    batch = await run_in_threadpool(job_store.get_batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    counts = {}
+    for campaign in batch["campaigns"]:
+        counts[campaign["status"]] = counts.get(campaign["status"], 0) + 1
+    
+    total = len(batch["campaigns"])
+    if counts.get("completed", 0) == total:
+        status = "completed"
+    elif counts.get("failed", 0) == total:
+        status = "failed"
+    elif counts.get("completed", 0) + counts.get("failed", 0) == total:
+        status = "partial"
+    else:
+        status = "processing"
+    
+    return {
+        "batch_id": batch_id,
+        "status": status,
+        "status_counts": counts,
+        "campaigns": batch["campaigns"],
+        "preparation_state": batch["state"],
+        "preparation": batch["preparation"].get("stats", {})
+    }
+
+@app.get("/providers/stats")
+async def get_provider_stats():
+    """Get each provider's current concurrency limit, queue length, circuit state and retry counters"""
+    return {scheduler.name: scheduler.get_stats() for scheduler in provider_schedulers}
+
+@app.get("/jobs/stats")
+async def get_job_stats():
+    """Get campaign job queue counts by state"""
+    return await run_in_threadpool(job_store.get_queue_stats)
+
+def process_campaign_job(campaign_id: str, brief_data: Dict, attempt: int):
+    """Worker entry point for a leased campaign job"""
+    if attempt > 1:
+        # Previous worker died mid-campaign - start over, cached variants make this cheap
+        job_store.reset_creatives(campaign_id)
+        job_store.append_log(campaign_id, f"Resuming campaign after interruption (attempt {attempt})")
+    
+    brief = CampaignBrief(**brief_data)
+    compliance = None
+    batch_id = job_store.get_campaign_batch_id(campaign_id)
+    if batch_id:
+        preparation = wait_for_batch_preparation(batch_id, campaign_id)
+        if preparation is not None:
+            compliance = tuple(preparation["compliance"][campaign_id])
+            # Variants were already fetched (bypassing the cache if requested), so reuse them
+            brief = brief.copy(update={"bypass_cache": False})
+    
+    kept_variants = {}
+    source_campaign_id = job_store.get_campaign_source_id(campaign_id)
+    if source_campaign_id:
+        source = job_store.get_campaign(source_campaign_id)
+        plan = plan_rerender(source_campaign_id, CampaignBrief(**source["brief"]), source["status"], brief)
+        job_store.append_log(
+            campaign_id,
+            f"Re-render of campaign {source_campaign_id}: moderation {plan['moderation']}, " +
+            ", ".join(f"{name} {stage}" for name, stage in plan["products"].items())
+        )
+        if plan["moderation"] == "reused":
+            compliance = (True, f"Content unchanged since campaign {source_campaign_id}")
+        kept_variants = {
+            name: creative_generator.find_variants(product_output_dir(source_campaign_id, name), name)
+            for name, stage in plan["products"].items() if stage == "overlay_only"
+        }
+    
+    process_campaign_sync(campaign_id, brief, compliance, kept_variants)
+
+def wait_for_batch_preparation(batch_id: str, campaign_id: str) -> Optional[Dict]:
+    """
+    Run or wait for the preparation shared by every campaign of a batch
+    Returns: the preparation, or None if it failed and the campaign should run on its own
+    """
+    worker_id = f"{campaign_id}-{uuid.uuid4().hex[:6]}"
+    announced = False
+    while True:
+        if job_store.claim_batch(batch_id, worker_id):
+            return prepare_batch(batch_id, worker_id)
+        
+        batch = job_store.get_batch(batch_id)
+        if batch is None or batch["state"] == "failed":
+            job_store.append_log(campaign_id, "Batch preparation failed - processing campaign on its own")
+            return None
+        if batch["state"] == "prepared":
+            return batch["preparation"]
+        
+        if not announced:
+            job_store.append_log(campaign_id, f"Waiting for shared preparation of batch {batch_id}")
+            announced = True
+        time.sleep(BATCH_POLL_SECONDS)
+
+def prepare_batch(batch_id: str, worker_id: str) -> Optional[Dict]:
+    """Moderate every brief at once and fetch hero images and variants once per distinct product"""
+    done = threading.Event()
+    
+    def heartbeat():
+        while not done.wait(JOB_LEASE_SECONDS / 3):
+            if not job_store.renew_batch_lease(batch_id, worker_id):
+                logger.warning(f"Lost lease on batch {batch_id} preparation")
+    
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
     try:
-        # Run the synchronous processing in a separate thread
-        await loop.run_in_executor(executor, process_campaign_sync, campaign_id, brief)
+        with telemetry.span("batch_preparation"):
+            preparation = _prepare_batch_stages(batch_id)
+        job_store.finish_batch(batch_id, worker_id, "prepared", preparation)
+        logger.info(f"Batch {batch_id} prepared: {preparation['stats']}")
+        return preparation
     except Exception as e:
-        logger.error(f"Campaign wrapper error {campaign_id}: {str(e)}")
-        if campaign_id in campaign_results:
-            campaign_results[campaign_id]["status"] = "failed"
-            campaign_results[campaign_id]["logs"].append(f"System error: {str(e)}")
+        logger.error(f"Batch {batch_id} preparation failed: {str(e)}")
+        job_store.finish_batch(batch_id, worker_id, "failed", {"error": str(e)})
+        return None
+    finally:
+        done.set()
+        heartbeat_thread.join()
 
-def process_campaign_sync(campaign_id: str, brief: CampaignBrief):
-    """Synchronous background task to process campaign and generate all creatives"""
+def _prepare_batch_stages(batch_id: str) -> Dict:
+    start = time.perf_counter()
+    campaign_ids = [campaign["campaign_id"] for campaign in job_store.get_batch(batch_id)["campaigns"]]
+    briefs = [CampaignBrief(**job_store.get_campaign(campaign_id)["brief"]) for campaign_id in campaign_ids]
+    
+    with telemetry.span("moderation"):
+        verdicts = content_moderator.validate_campaign_contents([brief.dict() for brief in briefs])
+    
+    # Distinct products of compliant briefs, grouped by asset directory: entries of a group share
+    # one hero image, so they run in order while different groups run in parallel
+    groups: Dict[str, Dict[Tuple[str, str, str], bool]] = {}
+    total_products = 0
+    for brief, (is_compliant, _) in zip(briefs, verdicts):
+        if not is_compliant:
+            continue
+        for product in brief.products:
+            total_products += 1
+            key = (product.name, product.description, product.render_mode or brief.render_mode)
+            entries = groups.setdefault(asset_manager.normalize_product_name(product.name), {})
+            entries[key] = entries.get(key, False) or brief.bypass_cache
+    
+    def prepare_group(entries: Dict[Tuple[str, str, str], bool]) -> int:
+        prefetched = 0
+        for (name, description, render_mode), bypass_cache in entries.items():
+            with telemetry.span("asset_scan"):
+                existing_assets = asset_manager.check_existing_assets(name)
+            prefetched += creative_generator.prefetch_variants(name, description, existing_assets,
+                                                               bypass_cache, render_mode)
+        return prefetched
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PRODUCTS_PER_CAMPAIGN) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, prepare_group, entries) for entries in groups.values()]
+        variants_prefetched = sum(future.result() for future in futures)
+    
+    moderation_texts = [text for brief in briefs for text in (brief.campaign_message, brief.target_audience)]
+    return {
+        "compliance": {campaign_id: list(verdict) for campaign_id, verdict in zip(campaign_ids, verdicts)},
+        "stats": {
+            "campaigns": len(briefs),
+            "compliant_campaigns": sum(1 for is_compliant, _ in verdicts if is_compliant),
+            "moderation_texts": len(moderation_texts),
+            "unique_moderation_texts": len(set(moderation_texts)),
+            "products": total_products,
+            "unique_products": sum(len(entries) for entries in groups.values()),
+            "variants_prefetched": variants_prefetched,
+            "duration_seconds": round(time.perf_counter() - start, 3)
+        }
+    }
+
+campaign_workers = CampaignWorkerPool(job_store, process_campaign_job, worker_count=CAMPAIGN_WORKERS)
+
+@app.on_event("startup")
+def start_campaign_workers():
+    if CAMPAIGN_WORKERS > 0:
+        campaign_workers.start()
+
+@app.on_event("shutdown")
+def stop_campaign_workers():
+    campaign_workers.stop()
+    render_pool.shutdown()
+
+def product_output_dir(campaign_id: str, product_name: str) -> Path:
+    return Path("output") / campaign_id / product_name.lower().replace(" ", "_")
+
+def localized_creative_paths(brief: CampaignBrief, product: Product, product_dir: Path,
+                             creatives: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """Locale -> aspect ratio -> path of the localized creatives rendered with each creative"""
+    paths = {}
+    for locale in localized_messages(brief):
+        rendered = {
+            ratio: str(creative_generator.localized_output_path(product_dir, locale, product.name, ratio))
+            for ratio in creatives
+        }
+        paths[locale] = {ratio: path for ratio, path in rendered.items() if Path(path).is_file()}
+    return paths
+
+def process_product_sync(campaign_id: str, brief: CampaignBrief, product: Product,
+                         kept_variants: Optional[Dict[str, str]] = None) -> Tuple[Dict, List[str]]:
+    """
+    Generate all creatives for a single product, returns (product result, log lines)
+    kept_variants: ratio -> un-overlaid variant of an earlier campaign, only the overlay is redone
+    """
+    logs = [f"Processing product: {product.name}"]
+    
+    product_dir = product_output_dir(campaign_id, product.name)
+    product_dir.mkdir(parents=True, exist_ok=True)
+    
+    def publish_creative(aspect_ratio: str, output_path: str, renditions: Dict[str, str]):
+        job_store.add_event(campaign_id, "creative", {
+            "product": product.name,
+            "product_directory": product_dir.name,
+            "aspect_ratio": aspect_ratio,
+            "filename": Path(output_path).name,
+            "renditions": {name: Path(path).name for name, path in renditions.items()}
+        })
+    
+    if kept_variants:
+        with telemetry.span("product"):
+            creatives = creative_generator.rerender_creative_set(
+                product_name=product.name,
+                campaign_message=brief.campaign_message,
+                output_dir=product_dir,
+                variants=kept_variants,
+                on_creative=publish_creative,
+                localized_messages=localized_messages(brief)
+            )
+        telemetry.increment("pipeline_creatives_total", {"render_mode": "rerender"},
+                            len(creatives), help_text="Creatives generated")
+        logs.append(f"♻️ Re-rendered overlay for {product.name} from kept variants - {len(creatives)} creatives created")
+        return {
+            "asset_status": "reused",
+            "render_mode": product.render_mode or brief.render_mode,
+            "existing_assets_found": len(kept_variants),
+            "existing_assets_used": list(kept_variants.values()),
+            "generated_creatives": creatives,
+            "localized_creatives": localized_creative_paths(brief, product, product_dir, creatives),
+            "aspect_ratios": list(creatives.keys()),
+            "overlay_only": True
+        }, logs
+    
+    # Check for existing assets with detailed logging
+    with telemetry.span("asset_scan"):
+        existing_assets = asset_manager.check_existing_assets(product.name)
+    
+    # Log asset discovery status
+    if existing_assets:
+        logs.append(f"✅ Found {len(existing_assets)} existing assets for {product.name} - REUSING")
+        asset_status = "reused"
+    else:
+        logs.append(f"❌ No existing assets found for {product.name} - WILL GENERATE")
+        asset_status = "generated"
+    
+    with telemetry.span("product"):
+        creatives = creative_generator.generate_creative_set(
+            product_name=product.name,
+            product_description=product.description,
+            campaign_message=brief.campaign_message,
+            output_dir=product_dir,
+            existing_assets=existing_assets,
+            bypass_cache=brief.bypass_cache,
+            render_mode=product.render_mode or brief.render_mode,
+            on_creative=publish_creative,
+            localized_messages=localized_messages(brief)
+        )
+    telemetry.increment("pipeline_creatives_total", {"render_mode": product.render_mode or brief.render_mode},
+                        len(creatives), help_text="Creatives generated")
+    
+    product_result = {
+        "asset_status": asset_status,
+        "render_mode": product.render_mode or brief.render_mode,
+        "existing_assets_found": len(existing_assets),
+        "existing_assets_used": existing_assets,
+        "generated_creatives": creatives,
+        "localized_creatives": localized_creative_paths(brief, product, product_dir, creatives),
+        "aspect_ratios": list(creatives.keys())
+    }
+    
+    if asset_status == "reused":
+        logs.append(f"✅ Successfully reused assets for {product.name} - {len(creatives)} creatives created")
+    else:
+        logs.append(f"🤖 Generated new assets for {product.name} - {len(creatives)} creatives created")
+    
+    return product_result, logs
+
+def process_campaign_sync(campaign_id: str, brief: CampaignBrief, compliance: Optional[Tuple[bool, str]] = None,
+                          kept_variants: Optional[Dict[str, Dict[str, str]]] = None):
+    """
+    Synchronous background task to process campaign and generate all creatives
+    compliance: verdict already computed for the whole batch or unchanged since the source campaign, skips moderation
+    kept_variants: product name -> variants of the source campaign, for re-renders
+    """
+    # Spans from every thread working on this campaign end up in its metrics
+    with telemetry.collect() as spans:
+        with telemetry.span("campaign"):
+            final_status = _process_campaign_stages(campaign_id, brief, spans, compliance, kept_variants or {})
+    telemetry.increment("pipeline_campaigns_total", {"status": final_status}, help_text="Campaigns processed by final status")
+
+def _process_campaign_stages(campaign_id: str, brief: CampaignBrief, spans,
+                             compliance: Optional[Tuple[bool, str]], kept_variants: Dict[str, Dict[str, str]]) -> str:
+    """Moderate, fan out products and save metrics, returns the final status"""
+    creatives = {}
     try:
-        result = campaign_results[campaign_id]
-        result["logs"].append("Starting content compliance check")
+        job_store.append_log(campaign_id, "Starting content compliance check")
         
         # Validate campaign content for compliance
-        is_compliant, compliance_reason = content_moderator.validate_campaign_content(brief.dict())
+        if compliance is not None:
+            is_compliant, compliance_reason = compliance
+        else:
+            with telemetry.span("moderation"):
+                is_compliant, compliance_reason = content_moderator.validate_campaign_content(brief.dict())
         
         if not is_compliant:
-            result["status"] = "failed"
-            result["logs"].append(f"COMPLIANCE FAILURE: {compliance_reason}")
+            job_store.set_status(campaign_id, "failed")
+            job_store.append_log(campaign_id, f"COMPLIANCE FAILURE: {compliance_reason}")
             
             metrics_manager.save_campaign_metrics(
                 campaign_id=campaign_id,
                 campaign_brief=brief.dict(),
                 final_status="failed_compliance",
                 product_metrics={},
-                reason=compliance_reason
+                reason=compliance_reason,
+                stage_timings=spans.summary()
             )
             
             logger.error(f"Campaign {campaign_id} failed compliance check: {compliance_reason}")
-            return
+            return "failed_compliance"
         
-        result["logs"].append("Content compliance check passed")
-        result["logs"].append("Starting creative generation")
+        job_store.append_logs(campaign_id, ["Content compliance check passed", "Starting creative generation"])
         
-        for product in brief.products:
-            result["logs"].append(f"Processing product: {product.name}")
-            
-            # Check for existing assets with detailed logging
-            existing_assets = asset_manager.check_existing_assets(product.name)
-            
-            # Log asset discovery status
-            if existing_assets:
-                result["logs"].append(f"✅ Found {len(existing_assets)} existing assets for {product.name} - REUSING")
-                asset_status = "reused"
-            else:
-                result["logs"].append(f"❌ No existing assets found for {product.name} - WILL GENERATE")
-                asset_status = "generated"
-            
-            product_dir = Path("output") / campaign_id / product.name.lower().replace(" ", "_")
-            product_dir.mkdir(parents=True, exist_ok=True)
-            
-            creatives = creative_generator.generate_creative_set(
-                product_name=product.name,
-                product_description=product.description,
-                campaign_message=brief.campaign_message,
-                output_dir=product_dir,
-                existing_assets=existing_assets
-            )
-            
-            result["creatives"][product.name] = {
-                "asset_status": asset_status,
-                "existing_assets_found": len(existing_assets),
-                "existing_assets_used": existing_assets,
-                "generated_creatives": creatives,
-                "aspect_ratios": list(creatives.keys())
-            }
-            
-            if asset_status == "reused":
-                result["logs"].append(f"✅ Successfully reused assets for {product.name} - {len(creatives)} creatives created")
-            else:
-                result["logs"].append(f"🤖 Generated new assets for {product.name} - {len(creatives)} creatives created")
+        # Fan out products, bounded by the per-campaign limit (1 runs them serially)
+        max_products = min(
+            brief.max_concurrent_products or MAX_CONCURRENT_PRODUCTS_PER_CAMPAIGN,
+            MAX_CONCURRENT_PRODUCTS_PER_CAMPAIGN
+        )
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_products)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, process_product_sync, campaign_id, brief, product,
+                            kept_variants.get(product.name))
+                for product in brief.products
+            ]
+            # Merge results and logs in brief order so output is deterministic
+            for product, future in zip(brief.products, futures):
+                product_result, product_logs = future.result()
+                job_store.append_logs(campaign_id, product_logs)
+                job_store.set_product_result(campaign_id, product.name, product_result)
+                creatives[product.name] = product_result
         
-        result["status"] = "completed"
-        result["logs"].append("Campaign processing completed successfully")
+        job_store.set_status(campaign_id, "completed")
+        job_store.append_log(campaign_id, "Campaign processing completed successfully")
         
         metrics_manager.save_campaign_metrics(
             campaign_id=campaign_id,
             campaign_brief=brief.dict(),
             final_status="completed",
-            product_metrics=result["creatives"],
-            reason="Campaign successfully completed with all creatives generated"
+            product_metrics=creatives,
+            reason="Campaign successfully completed with all creatives generated",
+            stage_timings=spans.summary()
         )
-        result["logs"].append("Campaign metrics saved")
+        job_store.append_log(campaign_id, "Campaign metrics saved")
         
         logger.info(f"Campaign {campaign_id} completed successfully")
+        return "completed"
         
     except Exception as e:
-        if campaign_id in campaign_results:
-            result = campaign_results[campaign_id]
-            result["status"] = "failed"
-            result["logs"].append(f"Error: {str(e)}")
-            
-            # Save failed campaign metrics
-            metrics_manager.save_campaign_metrics(
-                campaign_id=campaign_id,
-                campaign_brief=brief.dict(),
-                final_status="failed_technical",
-                product_metrics=result.get("creatives", {}),
-                reason=f"Technical error during campaign processing: {str(e)}"
-            )
+        job_store.set_status(campaign_id, "failed")
+        job_store.append_log(campaign_id, f"Error: {str(e)}")
+        
+        # Save failed campaign metrics
+        metrics_manager.save_campaign_metrics(
+            campaign_id=campaign_id,
+            campaign_brief=brief.dict(),
+            final_status="failed_technical",
+            product_metrics=creatives,
+            reason=f"Technical error during campaign processing: {str(e)}",
+            stage_timings=spans.summary()
+        )
         
         logger.error(f"Campaign {campaign_id} failed: {str(e)}")
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+        return "failed_technical"
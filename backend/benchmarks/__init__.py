@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the Creative Automation Pipeline.
+
+Run from the backend directory, e.g. `python -m benchmarks.overlay_benchmark`.
+"""
@@ -0,0 +1,164 @@
+"""
+End-to-end campaign throughput benchmark, fully offline.
+
+Starts the FastAPI app on a local port inside a temporary working directory,
+replaces Replicate, image downloads and Groq with the fakes from
+benchmarks.fake_providers (configurable latency and error injection), submits N
+campaigns over HTTP and polls them to completion. Reports campaigns per minute,
+p50/p95/p99 completion latency (submit to final status) and the provider
+schedulers' final concurrency limits and retry counts.
+
+With --local-backends the app runs on the procedural image and rule-based
+moderation backends instead, without fakes or simulated latency, which measures
+the service's own capacity ceiling.
+
+Usage: python -m benchmarks.e2e_benchmark [--campaigns 20] [--products 2]
+       [--replicate-latency 2.0] [--download-latency 0.2] [--groq-latency 0.3]
+       [--error-rate 0.0] [--error-status 503] [--workers 2] [--render-processes 2] [--local-backends]
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import requests
+from .fake_providers import ProviderProfile, install_fake_providers, provider_call_counts
+from .stats import summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FINAL_STATUSES = ("completed", "failed")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(app, port: int):
+    """Run uvicorn in a background thread, returns the server once it accepts requests"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def make_brief(index: int, products: int, bypass_cache: bool) -> dict:
+    """Campaign brief with product names unique to the campaign, so every campaign does full work"""
+    return {
+        "products": [
+            {"name": f"Bench Product {index}-{p}", "description": "Benchmark product in a studio setting"}
+            for p in range(products)
+        ],
+        "target_region": "North America",
+        "target_audience": "Adults 25-45",
+        "campaign_message": f"Benchmark campaign {index}: better every day",
+        "bypass_cache": bypass_cache
+    }
+
+
+def run_campaigns(base_url: str, campaigns: int, products: int, bypass_cache: bool, poll_interval: float):
+    """Submit all campaigns at once and wait for each to reach a final status"""
+    session = requests.Session()
+    submitted = {}
+    for index in range(campaigns):
+        response = session.post(f"{base_url}/generate-campaign", json=make_brief(index, products, bypass_cache))
+        response.raise_for_status()
+        submitted[response.json()["campaign_id"]] = time.perf_counter()
+
+    finished = {}
+    while len(finished) < len(submitted):
+        for campaign_id in submitted.keys() - finished.keys():
+            result = session.get(f"{base_url}/campaign/{campaign_id}").json()
+            if result["status"] in FINAL_STATUSES:
+                creatives = sum(len(p["generated_creatives"]) for p in result["creatives"].values())
+                finished[campaign_id] = (time.perf_counter(), result["status"], creatives)
+        time.sleep(poll_interval)
+
+    return submitted, finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end campaign throughput benchmark")
+    parser.add_argument("--campaigns", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2)
+    parser.add_argument("--replicate-latency", type=float, default=2.0, help="Seconds per Replicate prediction")
+    parser.add_argument("--download-latency", type=float, default=0.2, help="Seconds per image download")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="Seconds per Groq completion")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency varies by +/- this fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure probability per call")
+    parser.add_argument("--error-status", type=int, default=503,
+                        help="HTTP status of injected failures (429 exercises the adaptive concurrency limit)")
+    parser.add_argument("--workers", type=int, default=2, help="Campaign workers (CAMPAIGN_WORKERS)")
+    parser.add_argument("--render-processes", type=int, default=2, help="RENDER_PROCESSES")
+    parser.add_argument("--bypass-cache", action="store_true", help="Skip the img2img variant cache")
+    parser.add_argument("--local-backends", action="store_true",
+                        help="Use the procedural image and rules moderation backends instead of the fakes")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # The app keeps all state relative to the working directory
+    work_dir = tempfile.mkdtemp(prefix="campaign-bench-")
+    os.chdir(work_dir)
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ["CAMPAIGN_WORKERS"] = str(args.workers)
+    os.environ["RENDER_PROCESSES"] = str(args.render_processes)
+    os.environ["JOB_DB_PATH"] = str(Path(work_dir) / "data" / "jobs.sqlite3")
+    if args.local_backends:
+        os.environ["IMAGE_BACKEND"] = "procedural"
+        os.environ["MODERATION_BACKEND"] = "rules"
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    import app as app_module
+
+    fakes = {} if args.local_backends else install_fake_providers(
+        app_module.image_generator,
+        app_module.content_moderator,
+        replicate_profile=ProviderProfile(args.replicate_latency, args.jitter, args.error_rate, args.error_status),
+        download_profile=ProviderProfile(args.download_latency, args.jitter, args.error_rate, args.error_status),
+        groq_profile=ProviderProfile(args.groq_latency, args.jitter, args.error_rate, args.error_status)
+    )
+
+    port = _free_port()
+    server, thread = _start_server(app_module.app, port)
+    print(f"Working directory {work_dir}, {args.campaigns} campaigns x {args.products} products, "
+          f"{args.workers} workers, {args.render_processes} render processes")
+
+    try:
+        start = time.perf_counter()
+        submitted, finished = run_campaigns(f"http://127.0.0.1:{port}", args.campaigns, args.products,
+                                            args.bypass_cache, args.poll_interval)
+        elapsed = max(done for done, _, _ in finished.values()) - start
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    latencies = [finished[campaign_id][0] - submitted_at for campaign_id, submitted_at in submitted.items()]
+    stats = summarize(latencies)
+    completed = sum(1 for _, status, _ in finished.values() if status == "completed")
+    creatives = sum(count for _, _, count in finished.values())
+    expected = args.campaigns * args.products * len(app_module.creative_generator.aspect_ratios)
+
+    print(f"Throughput: {args.campaigns / elapsed * 60:.1f} campaigns/min ({elapsed:.1f} s total)")
+    print(f"Completion latency: p50 {stats['p50']:.2f} s, p95 {stats['p95']:.2f} s, p99 {stats['p99']:.2f} s")
+    print(f"Campaigns completed {completed}/{args.campaigns}, creatives {creatives}/{expected}")
+    for name, (calls, errors) in provider_call_counts(fakes).items():
+        print(f"  {name:>9}: {calls} calls, {errors} injected errors")
+    for scheduler in app_module.provider_schedulers:
+        stats = scheduler.get_stats()
+        print(f"  {stats['provider']:>9} scheduler: concurrency limit {stats['concurrency_limit']}, "
+              f"{stats['retries']} retries, {stats['rate_limited']} rate limited, circuit {stats['circuit']}")
+
+
+if __name__ == "__main__":
+    main()
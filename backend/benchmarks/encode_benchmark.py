@@ -0,0 +1,114 @@
+"""
+Benchmark for the variant download-to-creative path.
+
+Compares the previous temp-file path (write the downloaded variant to
+temp_variant_*.jpg, reopen it, overlay, save at quality 95, unlink) with the
+in-memory path in CreativeGenerator.render_creative_file (decode the response
+bytes directly and encode with the configured JPEG settings). Reports, per
+creative and aspect ratio, the time saved by skipping the temp file and the
+bytes and time the encoder settings trade against the previous quality 95 save.
+The temp file usually stays in the page cache here, so the I/O saving grows on
+slow or shared disks.
+
+Usage: python -m benchmarks.encode_benchmark [--iterations 20] [--quality 95] [--progressive] [--optimize]
+"""
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image, ImageFilter
+from utils import CreativeGenerator
+
+MESSAGE = "Clean your family's clothes the natural way. Gentle on skin, tough on stains, kind to the planet."
+PRODUCT = "EcoClean Detergent"
+
+# Typical img2img output sizes per aspect ratio
+VARIANT_SIZES = {"1:1": (1024, 1024), "9:16": (768, 1344), "16:9": (1344, 768)}
+
+
+def make_variant_bytes(width: int, height: int) -> bytes:
+    """Photo-like test variant encoded the way the remote model returns it"""
+    noise = Image.effect_noise((width, height), 48).filter(ImageFilter.GaussianBlur(2))
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = Image.merge('RGB', (noise, gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def temp_file_path(generator: CreativeGenerator, variant: bytes, output_dir: Path, aspect_ratio: str) -> int:
+    """Previous implementation: temp file round-trip and default encoder settings"""
+    temp_path = output_dir / f"temp_variant_{aspect_ratio.replace(':', 'x')}.jpg"
+    output_path = output_dir / "legacy.jpg"
+    with open(temp_path, 'wb') as f:
+        f.write(variant)
+
+    with Image.open(temp_path) as source_file:
+        source_file.load()
+        image = source_file if source_file.mode == 'RGB' else source_file.convert('RGB')
+    final_creative = generator.add_text_overlay(image, MESSAGE, PRODUCT, in_place=True)
+    final_creative.save(output_path, quality=95)
+    temp_path.unlink()
+    return output_path.stat().st_size
+
+
+def in_memory_path(generator: CreativeGenerator, variant: bytes, output_dir: Path, aspect_ratio: str) -> int:
+    """Current implementation, as called by the pipeline for a downloaded variant"""
+    result = generator.render_creative_file(variant, str(output_dir / "current.jpg"), MESSAGE, PRODUCT, aspect_ratio)
+    return result["output_bytes"]
+
+
+def measure(path_fn, generator: CreativeGenerator, variant: bytes, output_dir: Path,
+            aspect_ratio: str, iterations: int):
+    """Average seconds and output bytes per creative"""
+    path_fn(generator, variant, output_dir, aspect_ratio)  # warm font and layout caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        output_bytes = path_fn(generator, variant, output_dir, aspect_ratio)
+    return (time.perf_counter() - start) / iterations, output_bytes
+
+
+def _print_row(aspect_ratio: str, size: tuple, variant: bytes, legacy, in_memory, configured):
+    legacy_seconds, legacy_bytes = legacy
+    io_saved = legacy_seconds - in_memory[0]
+    encoder_cost = configured[0] - in_memory[0]
+    print(f"{aspect_ratio:>5} {size[0]}x{size[1]}: "
+          f"temp file {legacy_seconds * 1000:6.1f} ms, in memory {in_memory[0] * 1000:6.1f} ms "
+          f"(saved {io_saved * 1000:5.1f} ms and {2 * len(variant) / 1024:6.1f} KB temp file I/O) | "
+          f"encoder settings {configured[0] * 1000:6.1f} ms ({encoder_cost * 1000:+5.1f} ms), "
+          f"{configured[1] / 1024:6.1f} KB (saved {(legacy_bytes - configured[1]) / 1024:5.1f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the variant decode and encode path")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--quality", type=int, default=95)
+    parser.add_argument("--subsampling", default="4:2:0")
+    parser.add_argument("--progressive", action="store_true")
+    parser.add_argument("--optimize", action="store_true")
+    args = parser.parse_args()
+
+    encoder_settings = {
+        "quality": args.quality,
+        "progressive": args.progressive,
+        "optimize": args.optimize,
+        "subsampling": args.subsampling,
+    }
+    legacy_generator = CreativeGenerator(image_generator=None, asset_manager=None)
+    generator = CreativeGenerator(image_generator=None, asset_manager=None, encoder_settings=encoder_settings)
+    print(f"Encoder settings: {encoder_settings}, {args.iterations} creatives per ratio")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = Path(temp_dir)
+        for aspect_ratio, (width, height) in VARIANT_SIZES.items():
+            variant = make_variant_bytes(width, height)
+            legacy = measure(temp_file_path, legacy_generator, variant, output_dir, aspect_ratio, args.iterations)
+            # Same encoder settings as the temp file path isolates the I/O saving
+            in_memory = measure(in_memory_path, legacy_generator, variant, output_dir, aspect_ratio, args.iterations)
+            configured = measure(in_memory_path, generator, variant, output_dir, aspect_ratio, args.iterations)
+            _print_row(aspect_ratio, (width, height), variant, legacy, in_memory, configured)
+
+
+if __name__ == "__main__":
+    main()
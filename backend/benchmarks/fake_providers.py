@@ -0,0 +1,194 @@
+"""
+Local stand-ins for the remote providers, for offline benchmarks.
+
+FakeReplicateClient replaces the Replicate backends' client, FakeRequests serves
+the image URLs it returns, and FakeGroqClient answers chat completions with
+compliant moderation verdicts. Each provider has its own latency and error injection
+settings (ProviderProfile). install_fake_providers wires them into the app's
+ImageGenerator and ContentModerator instances.
+"""
+import io
+import json
+import random
+import threading
+import time
+from typing import Dict, Tuple
+from PIL import Image, ImageFilter
+
+# Output sizes of the text-to-image model per requested aspect ratio
+TEXT_TO_IMAGE_SIZES = {"1:1": (1024, 1024), "9:16": (768, 1344), "16:9": (1344, 768)}
+
+
+class ProviderProfile:
+    def __init__(self, latency_seconds: float = 0.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 error_status: int = 503):
+        """
+        Simulated behaviour of one remote provider; latency varies uniformly by +/- jitter
+        error_status: HTTP status of injected errors (429 and 5xx are retried by the provider schedulers)
+        """
+        self.latency_seconds = latency_seconds
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+
+class FakeProviderError(Exception):
+    def __init__(self, message: str, status_code: int):
+        """Injected provider failure, classified like an HTTP error response"""
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _Injector:
+    def __init__(self, name: str, profile: ProviderProfile, seed: int):
+        self.name = name
+        self.profile = profile
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """Sleep for the simulated latency, then raise an injected error with the configured probability"""
+        with self._lock:
+            self.calls += 1
+            jitter = self._random.uniform(-self.profile.jitter, self.profile.jitter)
+            fail = self._random.random() < self.profile.error_rate
+            if fail:
+                self.errors += 1
+
+        time.sleep(max(0.0, self.profile.latency_seconds * (1 + jitter)))
+        if fail:
+            raise FakeProviderError(f"Injected {self.name} failure", self.profile.error_status)
+
+
+class FakeImageStore:
+    def __init__(self):
+        """Encoded images addressed by fake URL"""
+        self._images: Dict[str, bytes] = {}
+        self._encoded_sizes: Dict[Tuple[int, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    def _encode(self, size: Tuple[int, int]) -> bytes:
+        """Photo-like JPEG of the given size, encoded once per size"""
+        with self._lock:
+            payload = self._encoded_sizes.get(size)
+            if payload is None:
+                noise = Image.effect_noise(size, 48).filter(ImageFilter.GaussianBlur(2))
+                gradient = Image.linear_gradient('L').resize(size)
+                image = Image.merge('RGB', (noise, gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=90)
+                payload = self._encoded_sizes[size] = buffer.getvalue()
+            return payload
+
+    def publish(self, size: Tuple[int, int]) -> str:
+        payload = self._encode(size)
+        with self._lock:
+            url = f"fake://replicate/{len(self._images)}.jpg"
+            self._images[url] = payload
+        return url
+
+    def get(self, url: str) -> bytes:
+        with self._lock:
+            return self._images[url]
+
+
+class FakeReplicateClient:
+    def __init__(self, images: FakeImageStore, profile: ProviderProfile, seed: int = 0):
+        """Stand-in for replicate.Client: returns fake image URLs after the simulated latency"""
+        self.images = images
+        self.injector = _Injector("replicate", profile, seed)
+
+    def run(self, model: str, input: Dict):
+        self.injector()
+        if "image" in input:
+            # img2img keeps the input dimensions
+            with Image.open(input["image"]) as source:
+                size = source.size
+        else:
+            size = TEXT_TO_IMAGE_SIZES.get(input.get("aspect_ratio", "1:1"), (1024, 1024))
+        return [self.images.publish(size)]
+
+
+class _FakeResponse:
+    def __init__(self, payload: bytes):
+        self.content = payload
+        self.status_code = 200
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class FakeRequests:
+    def __init__(self, images: FakeImageStore, profile: ProviderProfile, seed: int = 1):
+        """Stand-in for the requests module as used by ImageGenerator downloads"""
+        self.images = images
+        self.injector = _Injector("download", profile, seed)
+
+    def get(self, url: str, timeout: float = None, stream: bool = False) -> _FakeResponse:
+        self.injector()
+        return _FakeResponse(self.images.get(url))
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class FakeGroqClient:
+    BATCH_MARKER = "Content items to analyze (JSON object of id -> content):"
+
+    def __init__(self, profile: ProviderProfile, seed: int = 2):
+        """Stand-in for the Groq client: every item is compliant"""
+        self.injector = _Injector("groq", profile, seed)
+        self.chat = _Namespace(completions=_Namespace(create=self._create))
+
+    def _create(self, model: str, messages, **kwargs):
+        self.injector()
+        prompt = messages[-1]["content"]
+        verdict = {"is_compliant": True, "violations": [], "reason": "Benchmark content"}
+
+        if self.BATCH_MARKER in prompt:
+            items_json = prompt.split(self.BATCH_MARKER, 1)[1].lstrip()
+            items, _ = json.JSONDecoder().raw_decode(items_json)
+            content = json.dumps({"results": {item_id: verdict for item_id in items}})
+        else:
+            content = json.dumps(verdict)
+
+        return _Namespace(choices=[_Namespace(message=_Namespace(content=content))])
+
+
+def install_fake_providers(image_generator, content_moderator,
+                           replicate_profile: ProviderProfile,
+                           download_profile: ProviderProfile,
+                           groq_profile: ProviderProfile) -> Dict:
+    """Point the app's Replicate and Groq backend clients at the fakes, returns the fakes by provider name"""
+    import utils.image_generator as image_generator_module
+
+    images = FakeImageStore()
+    fakes = {
+        "replicate": FakeReplicateClient(images, replicate_profile),
+        "download": FakeRequests(images, download_profile),
+        "groq": FakeGroqClient(groq_profile),
+    }
+    image_generator.text_to_image.client.set(fakes["replicate"])
+    image_generator.img2img.client.set(fakes["replicate"])
+    image_generator_module.requests = fakes["download"]
+    content_moderator.backend.client.set(fakes["groq"])
+    return fakes
+
+
+def provider_call_counts(fakes: Dict) -> Dict[str, Tuple[int, int]]:
+    """(calls, injected errors) per provider"""
+    return {name: (fake.injector.calls, fake.injector.errors) for name, fake in fakes.items()}
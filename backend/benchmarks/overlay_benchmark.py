@@ -0,0 +1,125 @@
+"""
+Benchmark for the text overlay band compositing.
+
+Compares the previous full-frame compositing (full RGBA overlay, full RGBA
+conversion, alpha composite, convert back) with the region-only path in
+CreativeGenerator.add_text_overlay. Checks the outputs are pixel-identical and
+reports time and peak RSS growth per creative, each measured in a fresh process.
+
+Usage: python -m benchmarks.overlay_benchmark [--width 2048] [--height 2048] [--iterations 20]
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from PIL import Image, ImageChops, ImageDraw
+from utils import CreativeGenerator
+
+MESSAGE = "Clean your family's clothes the natural way. Gentle on skin, tough on stains, kind to the planet."
+PRODUCT = "EcoClean Detergent"
+
+
+def full_frame_overlay(generator: CreativeGenerator, image: Image.Image, campaign_message: str, product_name: str) -> Image.Image:
+    """Previous implementation: darken the band by compositing a full-size RGBA overlay"""
+    img_with_text = image.copy()
+    width, height = img_with_text.size
+    font_size = width // 25
+
+    overlay = Image.new('RGBA', img_with_text.size, (0, 0, 0, 0))
+    overlay_draw = ImageDraw.Draw(overlay)
+    overlay_height = height // 4
+    overlay_draw.rectangle([0, height - overlay_height, width, height], fill=(0, 0, 0, 180))
+
+    img_with_text = Image.alpha_composite(img_with_text.convert('RGBA'), overlay)
+    img_with_text = img_with_text.convert('RGB')
+
+    draw = ImageDraw.Draw(img_with_text)
+    generator._draw_wrapped_text(draw, campaign_message, 20, height - overlay_height + 20, width - 40, font_size, "white")
+    generator._draw_wrapped_text(draw, product_name.upper(), 20, 20, width - 40, font_size // 2, "white")
+    return img_with_text
+
+
+def region_overlay(generator: CreativeGenerator, image: Image.Image, campaign_message: str, product_name: str) -> Image.Image:
+    """Current implementation, as called by the pipeline on a freshly decoded variant"""
+    return generator.add_text_overlay(image, campaign_message, product_name, in_place=True)
+
+
+def make_image(width: int, height: int, mode: str = 'RGB') -> Image.Image:
+    """Deterministic noisy test image"""
+    image = Image.effect_noise((width, height), 64).convert(mode)
+    return image
+
+
+def check_identical(width: int, height: int):
+    """Assert both paths produce the same pixels for common source modes"""
+    generator = CreativeGenerator(image_generator=None, asset_manager=None)
+    for mode in ('RGB', 'RGBA', 'L', 'P'):
+        source = make_image(width, height, mode)
+        if mode == 'RGBA':
+            source.putalpha(Image.linear_gradient('L').resize((width, height)))
+        expected = full_frame_overlay(generator, source, MESSAGE, PRODUCT)
+        actual = generator.add_text_overlay(source.copy(), MESSAGE, PRODUCT, in_place=True)
+        diff = ImageChops.difference(expected, actual).getbbox()
+        if diff is not None or expected.mode != actual.mode:
+            raise AssertionError(f"Outputs differ for mode {mode}: bbox={diff}")
+    print(f"Pixel-identical output for RGB, RGBA, L and P sources at {width}x{height}")
+
+
+def _run(name: str, width: int, height: int, iterations: int, queue):
+    """Worker: time the overlay and record peak RSS growth in a fresh process"""
+    overlay_fn = full_frame_overlay if name == "full_frame" else region_overlay
+    generator = CreativeGenerator(image_generator=None, asset_manager=None)
+    sources = [make_image(width, height) for _ in range(2)]
+
+    # Warm font and layout caches so only compositing is compared
+    overlay_fn(generator, sources[0].copy(), MESSAGE, PRODUCT)
+    inputs = [sources[i % 2].copy() for i in range(iterations)]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    for image in inputs:
+        overlay_fn(generator, image, MESSAGE, PRODUCT)
+    elapsed = time.perf_counter() - start
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed / iterations, (rss_after - rss_before) * 1024))
+
+
+def measure(name: str, width: int, height: int, iterations: int):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run, args=(name, width, height, iterations, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text overlay compositing")
+    parser.add_argument("--width", type=int, default=2048)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    check_identical(min(args.width, 512), min(args.height, 512))
+
+    # Pillow stores RGB and RGBA images with 4 bytes per pixel
+    frame_bytes = args.width * args.height * 4
+    print(f"Image {args.width}x{args.height}, {args.iterations} creatives per run")
+    print(f"Working buffers per creative: full-frame ~{frame_bytes * 5 // 1024 ** 2} MB "
+          f"(RGB copy, RGBA overlay, RGBA source, RGBA composite, RGB result), "
+          f"region-only ~{frame_bytes // 1024 ** 2} MB (band crop, RGBA band, band composite, RGB band)")
+
+    results = {}
+    for name in ("full_frame", "region"):
+        per_creative, rss_growth = measure(name, args.width, args.height, args.iterations)
+        results[name] = per_creative
+        print(f"{name:>10}: {per_creative * 1000:8.2f} ms/creative, peak RSS growth {rss_growth / 1024 ** 2:7.1f} MB")
+
+    saved = results["full_frame"] - results["region"]
+    print(f"Saved {saved * 1000:.2f} ms per creative ({saved / results['full_frame'] * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
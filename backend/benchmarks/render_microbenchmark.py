@@ -0,0 +1,109 @@
+"""
+Micro-benchmarks for the overlay hot path.
+
+Times CreativeGenerator.add_text_overlay per creative at typical variant sizes,
+CreativeGenerator._draw_wrapped_text with a warm layout cache and with the
+layout cache cleared before every call (first render of a new message), and
+render_creative_file with localized messages: N locales decode the variant once
+and add N overlays and encodes.
+
+Usage: python -m benchmarks.render_microbenchmark [--iterations 50]
+"""
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image, ImageDraw
+from utils import CreativeGenerator
+from utils.text_layout import layout_text
+from .stats import summarize
+
+MESSAGE = "Clean your family's clothes the natural way. Gentle on skin, tough on stains, kind to the planet."
+PRODUCT = "EcoClean Detergent"
+
+SIZES = [(1024, 1024), (768, 1344), (1344, 768), (2048, 2048)]
+
+LOCALIZED_MESSAGES = {
+    "fr-FR": "Lavez les vêtements de votre famille naturellement. Doux pour la peau, efficace sur les taches.",
+    "de-DE": "Waschen Sie die Kleidung Ihrer Familie auf natürliche Weise. Sanft zur Haut, stark gegen Flecken.",
+    "es-ES": "Lava la ropa de tu familia de forma natural. Suave con la piel, fuerte contra las manchas.",
+    "it-IT": "Lava i vestiti della tua famiglia in modo naturale. Delicato sulla pelle, forte sulle macchie.",
+}
+
+
+def _report(name: str, samples):
+    stats = summarize(samples)
+    print(f"{name:<40} mean {stats['mean'] * 1000:7.3f} ms  p50 {stats['p50'] * 1000:7.3f} ms  "
+          f"p95 {stats['p95'] * 1000:7.3f} ms  p99 {stats['p99'] * 1000:7.3f} ms")
+
+
+def bench_add_text_overlay(generator: CreativeGenerator, size, iterations: int):
+    """Overlay on a freshly decoded variant, as in render_creative_file"""
+    source = Image.effect_noise(size, 64).convert('RGB')
+    generator.add_text_overlay(source.copy(), MESSAGE, PRODUCT, in_place=True)
+
+    samples = []
+    for _ in range(iterations):
+        image = source.copy()
+        start = time.perf_counter()
+        generator.add_text_overlay(image, MESSAGE, PRODUCT, in_place=True)
+        samples.append(time.perf_counter() - start)
+    _report(f"add_text_overlay {size[0]}x{size[1]}", samples)
+
+
+def bench_draw_wrapped_text(generator: CreativeGenerator, width: int, iterations: int, cold: bool):
+    """Wrap and draw the campaign message across the band of a creative of this width"""
+    band = Image.new('RGB', (width, width // 4))
+    draw = ImageDraw.Draw(band)
+    font_size = width // 25
+    generator._draw_wrapped_text(draw, MESSAGE, 20, 20, width - 40, font_size, "white")
+
+    samples = []
+    for _ in range(iterations):
+        if cold:
+            layout_text.cache_clear()
+        start = time.perf_counter()
+        generator._draw_wrapped_text(draw, MESSAGE, 20, 20, width - 40, font_size, "white")
+        samples.append(time.perf_counter() - start)
+    _report(f"_draw_wrapped_text {width}px {'cold' if cold else 'warm'} layout", samples)
+
+
+def bench_localized_render(generator: CreativeGenerator, locale_count: int, iterations: int):
+    """Whole render of one 1:1 creative from encoded variant bytes with locale_count localized messages"""
+    buffer = io.BytesIO()
+    Image.effect_noise((1024, 1024), 64).convert('RGB').save(buffer, format="JPEG", quality=90)
+    variant = buffer.getvalue()
+    locales = dict(list(LOCALIZED_MESSAGES.items())[:locale_count])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = Path(temp_dir)
+        localized = {locale: (message, str(output_dir / locale / "creative.jpg")) for locale, message in locales.items()}
+        args = (variant, str(output_dir / "creative.jpg"), MESSAGE, PRODUCT, "1:1", "remote", (), None, localized)
+        generator.render_creative_file(*args)
+
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            generator.render_creative_file(*args)
+            samples.append(time.perf_counter() - start)
+    _report(f"render_creative_file 1 + {locale_count} locales", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for text overlay rendering")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    generator = CreativeGenerator(image_generator=None, asset_manager=None)
+    for size in SIZES:
+        bench_add_text_overlay(generator, size, args.iterations)
+    for width in (1024, 2048):
+        for cold in (False, True):
+            bench_draw_wrapped_text(generator, width, args.iterations, cold)
+    for locale_count in (0, 1, len(LOCALIZED_MESSAGES)):
+        bench_localized_render(generator, locale_count, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
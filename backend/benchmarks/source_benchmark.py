@@ -0,0 +1,114 @@
+"""
+Benchmark for large source assets.
+
+Renders the three local aspect ratios from a large JPEG and PNG source, once
+decoding the original at full resolution for every creative (previous path)
+and once through SourceNormalizer, which decodes the source a single time at
+reduced scale (JPEG draft mode, integer reduce for other formats) into a
+working copy that the creatives are rendered from. Reports the normalization
+time, time per creative and peak RSS growth, each case in a fresh process,
+and asserts that the JPEG source is opened at reduced size after draft.
+
+Usage: python -m benchmarks.source_benchmark [--width 8000] [--height 6000] [--max-working-side 2048]
+"""
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image, ImageFilter
+from utils import CreativeGenerator, SourceNormalizer
+
+MESSAGE = "Clean your family's clothes the natural way. Gentle on skin, tough on stains, kind to the planet."
+PRODUCT = "EcoClean Detergent"
+ASPECT_RATIOS = ("1:1", "9:16", "16:9")
+
+
+def make_source(width: int, height: int, path: Path):
+    """Photo-like test source; detail is generated small and upscaled to keep setup fast"""
+    small = (max(1, width // 8), max(1, height // 8))
+    noise = Image.effect_noise(small, 48).filter(ImageFilter.GaussianBlur(1))
+    gradient = Image.linear_gradient('L').resize(small)
+    image = Image.merge('RGB', (noise, gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    image = image.resize((width, height), Image.BICUBIC)
+    if path.suffix == ".png":
+        image.save(path, format="PNG", compress_level=1)
+    else:
+        image.save(path, format="JPEG", quality=92)
+
+
+def check_draft(source_path: Path, max_working_side: int):
+    """JPEG sources larger than twice the working side must be decoded at reduced scale, not in full"""
+    with Image.open(source_path) as image:
+        full_size = image.size
+        image.draft('RGB', (max_working_side, max_working_side))
+        draft_size = image.size
+    if min(full_size) >= 2 * max_working_side:
+        assert max(draft_size) < max(full_size), f"draft did not reduce {full_size}, got {draft_size}"
+        assert min(draft_size) >= max_working_side, f"draft went below the working side: {draft_size}"
+    print(f"JPEG draft decodes {full_size[0]}x{full_size[1]} at {draft_size[0]}x{draft_size[1]}")
+
+
+def _run(name: str, source_path: str, output_dir: str, max_working_side: int, queue):
+    """Worker: render every aspect ratio and record time and peak RSS growth in a fresh process"""
+    generator = CreativeGenerator(image_generator=None, asset_manager=None)
+    normalizer = SourceNormalizer(max_working_side=max_working_side)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    source = normalizer.normalize(source_path) if name == "normalized" else source_path
+    normalize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for ratio_name in ASPECT_RATIOS:
+        output_path = Path(output_dir) / f"{name}_{ratio_name.replace(':', 'x')}.jpg"
+        generator.render_creative_file(source, str(output_path), MESSAGE, PRODUCT, ratio_name, "local")
+    per_creative = (time.perf_counter() - start) / len(ASPECT_RATIOS)
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((normalize_seconds, per_creative, (rss_after - rss_before) * 1024))
+
+
+def measure(name: str, source_path: Path, output_dir: Path, max_working_side: int):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run, args=(name, str(source_path), str(output_dir), max_working_side, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rendering creatives from large source assets")
+    parser.add_argument("--width", type=int, default=8000)
+    parser.add_argument("--height", type=int, default=6000)
+    parser.add_argument("--max-working-side", type=int, default=2048)
+    args = parser.parse_args()
+
+    print(f"Source {args.width}x{args.height} ({args.width * args.height / 1e6:.0f} MP), "
+          f"working side {args.max_working_side}, {len(ASPECT_RATIOS)} creatives per run")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        for extension in (".jpg", ".png"):
+            source_path = temp_dir / f"source{extension}"
+            make_source(args.width, args.height, source_path)
+            print(f"{extension[1:].upper()} source, {source_path.stat().st_size / 1024 ** 2:.1f} MB on disk")
+            if extension == ".jpg":
+                check_draft(source_path, args.max_working_side)
+
+            results = {}
+            for name in ("original", "normalized"):
+                normalize_seconds, per_creative, rss_growth = measure(name, source_path, temp_dir,
+                                                                      args.max_working_side)
+                results[name] = normalize_seconds + per_creative * len(ASPECT_RATIOS)
+                print(f"{name:>12}: normalize {normalize_seconds * 1000:8.1f} ms, "
+                      f"{per_creative * 1000:8.1f} ms/creative, peak RSS growth {rss_growth / 1024 ** 2:7.1f} MB")
+
+            saved = results["original"] - results["normalized"]
+            print(f"Saved {saved * 1000:.0f} ms per creative set ({saved / results['original'] * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Summary statistics shared by the benchmarks."""
+from typing import Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of the samples (pct in 0-100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Mean and p50/p95/p99 of the samples"""
+    return {
+        "mean": sum(samples) / len(samples) if samples else 0.0,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
@@ -7,6 +7,19 @@ This package contains the core utility modules for the Creative Automation Pipel
 - CreativeGenerator: Creates multi-aspect ratio creatives with text overlays
 - MetricsManager: Tracks campaign analytics and saves metrics to JSON files
 - ContentModerator: Validates campaign content for compliance and legal requirements
+- VariantCache: Content-addressed on-disk cache for img2img variants
+- TextLayout: Cached font loading and linear-time word wrapping for overlays
+- LocalRenderer: Deterministic saliency-aware crop/pad renderer for aspect ratio variants
+- JobStore: Durable SQLite campaign state and leased job queue
+- CampaignWorkerPool: Worker threads that process queued campaigns from the job store
+- RenderPool: Process pool for CPU-bound decode, overlay and encode work
+- ManifestManager: Per-campaign manifest of finished creatives with cached listings
+- BodySizeLimitMiddleware: Rejects oversized request bodies before they are parsed
+- stream_zip: Constant-memory streaming ZIP builder for bulk downloads
+- SourceNormalizer: Pixel limits and bounded-resolution working copies of large source assets
+- provider_registry: Text-to-image, img2img and moderation backends by name (Replicate, Groq, local procedural and rules)
+- ProviderScheduler: Rate limits, adaptive concurrency, retries and circuit breaking for remote providers
+- telemetry: Per-stage timing spans, counters and Prometheus text export
 """
 
 from .asset_manager import AssetManager
@@ -14,5 +27,22 @@ from .image_generator import ImageGenerator
 from .creative_generator import CreativeGenerator
 from .metrics_manager import MetricsManager
 from .content_moderator import ContentModerator
+from .variant_cache import VariantCache
+from .text_layout import TextLayout, get_font, layout_text
+from .local_renderer import LocalRenderer
+from .job_store import JobStore
+from .campaign_worker import CampaignWorkerPool
+from .render_pool import RenderPool
+from .manifest_manager import ManifestManager
+from .zip_stream import stream_zip
+from .body_limit import BodySizeLimitMiddleware
+from .source_normalizer import SourceNormalizer, SourceTooLargeError
+from .provider_registry import ProviderRegistry, provider_registry
+from .provider_scheduler import ProviderScheduler, ProviderUnavailableError
+from .telemetry import Telemetry, telemetry
 
-__all__ = ['AssetManager', 'ImageGenerator', 'CreativeGenerator', 'MetricsManager', 'ContentModerator']
\ No newline at end of file
+__all__ = ['AssetManager', 'ImageGenerator', 'CreativeGenerator', 'MetricsManager', 'ContentModerator', 'VariantCache',
+           'TextLayout', 'get_font', 'layout_text', 'LocalRenderer',
+           'JobStore', 'CampaignWorkerPool', 'RenderPool', 'ManifestManager', 'SourceNormalizer', 'SourceTooLargeError',
+           'ProviderRegistry', 'provider_registry', 'ProviderScheduler', 'ProviderUnavailableError',
+           'BodySizeLimitMiddleware', 'stream_zip', 'Telemetry', 'telemetry']
\ No newline at end of file
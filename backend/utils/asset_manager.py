@@ -1,14 +1,41 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from loguru import logger
-import shutil
+import hashlib
+import os
+import threading
+import uuid
 from fastapi import UploadFile
+from PIL import Image
+
+# Image types picked up as product assets
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp'}
+
+# Image types counted in the asset summary
+SUMMARY_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+# Chunk size for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 class AssetManager:
-    def __init__(self, assets_dir: str = "assets", output_dir: str = "output"):
+    def __init__(self, assets_dir: str = "assets", output_dir: str = "output", max_upload_bytes: int = 25 * 1024 * 1024,
+                 max_source_pixels: Optional[int] = None):
         self.assets_dir = Path(assets_dir)
         self.output_dir = Path(output_dir)
+        self.max_upload_bytes = max_upload_bytes
+        # Uploads larger than this (width x height, read from the header) are rejected
+        self.max_source_pixels = max_source_pixels
         self._setup_directories()
+        
+        # Content hashes of assets per product, built lazily on first upload: key -> {sha256: path}
+        self._content_hashes: Dict[str, Dict[str, str]] = {}
+        self._upload_lock = threading.Lock()
+        
+        # In-memory asset index: normalized product name -> (directory mtime, asset paths)
+        self._index: Dict[str, tuple] = {}
+        self._root_mtime: Optional[int] = None
+        self._index_lock = threading.Lock()
+        self.refresh_index()
     
     def _setup_directories(self):
         """Create necessary directories if they don't exist"""
@@ -16,56 +43,147 @@ class AssetManager:
         self.output_dir.mkdir(exist_ok=True)
         logger.info(f"Asset directories setup: {self.assets_dir}, {self.output_dir}")
     
+    @staticmethod
+    def normalize_product_name(product_name: str) -> str:
+        """Directory name used for a product's assets and outputs"""
+        return product_name.lower().replace(" ", "_")
+    
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        """Modification time of a path, or None if it doesn't exist"""
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def _scan_product_dir(self, product_dir: Path) -> List[str]:
+        """List image files in a product directory"""
+        existing_assets = []
+        for file_path in product_dir.glob("*"):
+            if file_path.is_file() and file_path.suffix.lower() in IMAGE_EXTENSIONS:
+                existing_assets.append(str(file_path))
+        return sorted(existing_assets)
+    
+    def refresh_index(self):
+        """Rebuild the asset index from disk"""
+        index = {}
+        root_mtime = self._mtime(self.assets_dir)
+        
+        if root_mtime is not None:
+            for product_dir in self.assets_dir.iterdir():
+                if product_dir.is_dir():
+                    index[product_dir.name] = (self._mtime(product_dir), self._scan_product_dir(product_dir))
+        
+        with self._index_lock:
+            self._index = index
+            self._root_mtime = root_mtime
+        
+        logger.info(f"Asset index built: {len(index)} products, {sum(len(a) for _, a in index.values())} assets")
+    
+    def _refresh_product(self, key: str) -> List[str]:
+        """Rescan one product directory and update its index entry"""
+        product_dir = self.assets_dir / key
+        mtime = self._mtime(product_dir)
+        assets = self._scan_product_dir(product_dir) if mtime is not None else []
+        
+        with self._index_lock:
+            if mtime is None:
+                self._index.pop(key, None)
+            else:
+                self._index[key] = (mtime, assets)
+        return assets
+    
+    def _sync_root(self):
+        """Pick up product directories created or removed outside the API"""
+        root_mtime = self._mtime(self.assets_dir)
+        if root_mtime == self._root_mtime:
+            return
+        
+        current = set()
+        if root_mtime is not None:
+            current = {p.name for p in self.assets_dir.iterdir() if p.is_dir()}
+        
+        with self._index_lock:
+            known = set(self._index)
+            for key in known - current:
+                self._index.pop(key, None)
+            self._root_mtime = root_mtime
+        
+        for key in current - known:
+            self._refresh_product(key)
+    
+    def register_asset(self, product_name: str, asset_path: Path):
+        """Upload/generation hook: add a new asset file to the index"""
+        key = self.normalize_product_name(product_name)
+        product_dir = self.assets_dir / key
+        
+        with self._index_lock:
+            _, assets = self._index.get(key, (None, []))
+            assets = sorted(set(assets) | {str(asset_path)})
+            self._index[key] = (self._mtime(product_dir), assets)
+            self._root_mtime = self._mtime(self.assets_dir)
+    
     def check_existing_assets(self, product_name: str) -> List[str]:
         """Check what assets exist for a product"""
-        product_dir = self.assets_dir / product_name.lower().replace(" ", "_")
-        existing_assets = []
+        key = self.normalize_product_name(product_name)
+        product_dir = self.assets_dir / key
         
-        if product_dir.exists():
-            # Look for image files
-            image_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp']
-            all_files = list(product_dir.glob("*"))
-            
-            for file_path in all_files:
-                if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-                    existing_assets.append(str(file_path))
+        entry = self._index.get(key)
+        if entry is None:
+            # Unknown product - a directory may have been added outside the API
+            self._sync_root()
+            entry = self._index.get(key)
+        
+        if entry is None:
+            existing_assets = []
+        elif entry[0] != self._mtime(product_dir):
+            # Directory changed on disk since it was indexed
+            existing_assets = self._refresh_product(key)
+        else:
+            existing_assets = entry[1]
         
-        logger.info(f"Asset scan for {product_name}: Found {len(existing_assets)} image files in {product_dir}")
-        return existing_assets
+        logger.info(f"Asset lookup for {product_name}: Found {len(existing_assets)} image files in {product_dir}")
+        return list(existing_assets)
     
     def get_asset_info(self) -> Dict:
         """Get summary of available assets"""
+        self._sync_root()
+        
         info = {
             "assets_directory": str(self.assets_dir),
             "output_directory": str(self.output_dir),
             "products_with_assets": []
         }
         
-        if self.assets_dir.exists():
-            for product_dir in self.assets_dir.iterdir():
-                if product_dir.is_dir():
-                    asset_count = len([f for f in product_dir.glob("*.*")
-                                    if f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.webp']])
-                    if asset_count > 0:  # Only show products with actual assets
-                        info["products_with_assets"].append({
-                            "product": product_dir.name,
-                            "asset_count": asset_count
-                        })
+        with self._index_lock:
+            entries = sorted(self._index.items())
+        
+        for product, (mtime, assets) in entries:
+            if mtime != self._mtime(self.assets_dir / product):
+                # Files added or removed inside the product directory since it was indexed
+                assets = self._refresh_product(product)
+            asset_count = sum(1 for a in assets if Path(a).suffix.lower() in SUMMARY_EXTENSIONS)
+            if asset_count > 0:  # Only show products with actual assets
+                info["products_with_assets"].append({
+                    "product": product,
+                    "asset_count": asset_count
+                })
         
+        info["total_products"] = len(info["products_with_assets"])
+        info["total_assets"] = sum(p["asset_count"] for p in info["products_with_assets"])
         return info
     
     def save_uploaded_image(self, product_name: str, upload_file: UploadFile) -> Dict:
         """Save an uploaded image file to the product's asset directory"""
         # Create product directory
-        product_dir = self.assets_dir / product_name.lower().replace(" ", "_")
+        product_dir = self.assets_dir / self.normalize_product_name(product_name)
         product_dir.mkdir(parents=True, exist_ok=True)
         
         # Validate file type by extension
-        allowed_extensions = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp'}
         file_extension = Path(upload_file.filename).suffix.lower()
         
-        if file_extension not in allowed_extensions:
-            raise ValueError(f"Unsupported file type. Allowed types: {', '.join(allowed_extensions)}")
+        if file_extension not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported file type. Allowed types: {', '.join(IMAGE_EXTENSIONS)}")
         
         # Validate MIME type
         allowed_mime_types = {
@@ -76,33 +194,123 @@ class AssetManager:
         if upload_file.content_type and upload_file.content_type not in allowed_mime_types:
             raise ValueError(f"Invalid file type. Expected image file, got {upload_file.content_type}")
         
-        # Generate safe filename
-        safe_filename = upload_file.filename.replace(" ", "_")
-        file_path = product_dir / safe_filename
-        
-        # Handle filename conflicts by adding a number
-        counter = 1
-        original_stem = file_path.stem
-        while file_path.exists():
-            file_path = product_dir / f"{original_stem}_{counter}{file_extension}"
-            counter += 1
+        # Stream to a temp file in chunks, hashing as we write and enforcing the size limit
+        temp_path = product_dir / f".upload-{uuid.uuid4().hex}.tmp"
+        sha = hashlib.sha256()
+        file_size = 0
+        try:
+            with open(temp_path, "wb") as buffer:
+                while True:
+                    chunk = upload_file.file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > self.max_upload_bytes:
+                        raise ValueError(f"File too large. Maximum size is {self.max_upload_bytes} bytes")
+                    sha.update(chunk)
+                    buffer.write(chunk)
+        except ValueError:
+            temp_path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            temp_path.unlink(missing_ok=True)
+            logger.error(f"Failed to save uploaded file: {str(e)}")
+            raise ValueError(f"Failed to save file: {str(e)}")
         
-        # Save the file
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(upload_file.file, buffer)
+            self._check_pixel_count(temp_path)
+        except ValueError:
+            temp_path.unlink(missing_ok=True)
+            raise
+        
+        content_hash = sha.hexdigest()
+        key = product_dir.name
+        
+        with self._upload_lock:
+            hashes = self._get_content_hashes(key)
+            existing_path = hashes.get(content_hash)
             
-            file_size = file_path.stat().st_size
+            if existing_path and Path(existing_path).exists():
+                # Same picture already stored for this product - keep the original
+                temp_path.unlink(missing_ok=True)
+                logger.info(f"Duplicate upload for {product_name}, reusing {existing_path}")
+                file_path = Path(existing_path)
+                duplicate = True
+            else:
+                # Generate safe filename
+                safe_filename = Path(upload_file.filename).name.replace(" ", "_")
+                file_path = self._publish_upload(temp_path, product_dir, safe_filename)
+                hashes[content_hash] = str(file_path)
+                duplicate = False
+        
+        if not duplicate:
             logger.info(f"Saved uploaded image: {file_path} ({file_size} bytes)")
-            
-            return {
-                "success": True,
-                "filename": file_path.name,
-                "path": str(file_path),
-                "size": file_size,
-                "product_directory": str(product_dir)
-            }
-            
+            self.register_asset(product_name, file_path)
+        
+        return {
+            "success": True,
+            "filename": file_path.name,
+            "path": str(file_path),
+            "size": file_size,
+            "content_hash": content_hash,
+            "duplicate": duplicate,
+            "product_directory": str(product_dir)
+        }
+    
+    def _check_pixel_count(self, image_path: Path):
+        """Reject images over the pixel limit without decoding them; unreadable headers are left to later stages"""
+        if not self.max_source_pixels:
+            return
+        try:
+            with Image.open(image_path) as image:
+                width, height = image.size
+        except Image.DecompressionBombError as e:
+            # Pillow refuses to open images far beyond its own limit, which is above ours
+            raise ValueError(f"Image too large. It is over {2 * Image.MAX_IMAGE_PIXELS / 1e6:.1f} MP, "
+                             f"maximum is {self.max_source_pixels / 1e6:.1f} MP") from e
         except Exception as e:
-            logger.error(f"Failed to save uploaded file: {str(e)}")
-            raise ValueError(f"Failed to save file: {str(e)}")
\ No newline at end of file
+            logger.warning(f"Could not read image header of {image_path}: {str(e)}")
+            return
+        if width * height > self.max_source_pixels:
+            raise ValueError(f"Image too large. {width}x{height} is {width * height / 1e6:.1f} MP, "
+                             f"maximum is {self.max_source_pixels / 1e6:.1f} MP")
+    
+    def _get_content_hashes(self, key: str) -> Dict[str, str]:
+        """Hashes of a product's assets, computed once per product (caller holds the upload lock)"""
+        hashes = self._content_hashes.get(key)
+        if hashes is None:
+            hashes = {}
+            for asset_path in self.check_existing_assets(key):
+                sha = hashlib.sha256()
+                with open(asset_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                        sha.update(chunk)
+                hashes.setdefault(sha.hexdigest(), asset_path)
+            self._content_hashes[key] = hashes
+        return hashes
+    
+    def _publish_upload(self, temp_path: Path, product_dir: Path, safe_filename: str) -> Path:
+        """Move a finished upload to a free filename without overwriting (adds _1, _2... on conflicts)"""
+        stem, suffix = Path(safe_filename).stem, Path(safe_filename).suffix
+        taken = {Path(a).name for a in self.check_existing_assets(product_dir.name)}
+        
+        counter = 0
+        while True:
+            name = safe_filename if counter == 0 else f"{stem}_{counter}{suffix}"
+            counter += 1
+            if name in taken:
+                continue
+            file_path = product_dir / name
+            try:
+                # Hard link fails if the name exists, so concurrent writers never clobber each other
+                os.link(temp_path, file_path)
+            except FileExistsError:
+                continue
+            except OSError:
+                # Filesystem without hard links - fall back to a plain rename
+                if file_path.exists():
+                    continue
+                os.replace(temp_path, file_path)
+                return file_path
+            temp_path.unlink(missing_ok=True)
+            return file_path
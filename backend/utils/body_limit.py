@@ -0,0 +1,53 @@
+from typing import Iterable
+from fastapi import HTTPException
+from loguru import logger
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app, max_body_bytes: int, paths: Iterable[str]):
+        """
+        Reject request bodies over max_body_bytes on the given paths before they are parsed and spooled
+        to disk: by Content-Length up front, and by counting bytes as chunked bodies arrive
+        """
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            logger.warning(f"Rejected {content_length.decode()} byte request to {scope['path']}")
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Raised while the route reads its form, answered by the app's HTTPException handler
+                    logger.warning(f"Rejected request to {scope['path']} after {received} bytes")
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self) -> str:
+        return f"Request body too large. Maximum is {self.max_body_bytes} bytes"
+
+    async def _reject(self, send):
+        body = ('{"detail": "%s"}' % self._detail()).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,84 @@
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, Dict, List
+from loguru import logger
+from .job_store import JobStore
+
+class CampaignWorkerPool:
+    def __init__(self,
+                 job_store: JobStore,
+                 handler: Callable[[str, Dict, int], None],
+                 worker_count: int = 2,
+                 poll_interval: float = 1.0):
+        """Worker threads that lease campaign jobs from the job store and run them"""
+        self.job_store = job_store
+        self.handler = handler
+        self.worker_count = worker_count
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # Unique per process so leases from other processes are never touched
+        self._worker_prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def start(self):
+        """Start worker threads"""
+        for index in range(self.worker_count):
+            worker_id = f"{self._worker_prefix}-{index}"
+            thread = threading.Thread(target=self._run, args=(worker_id,), name=f"campaign-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.worker_count} campaign workers ({self._worker_prefix})")
+
+    def stop(self, timeout: float = None):
+        """Signal workers to stop and wait for in-flight campaigns to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, worker_id: str):
+        """Worker loop: lease a job, process it while renewing the lease, repeat"""
+        while not self._stop.is_set():
+            try:
+                job = self.job_store.lease_job(worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to lease job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            campaign_id, brief, attempt = job
+            logger.info(f"Worker {worker_id} leased campaign {campaign_id} (attempt {attempt})")
+            self._process(worker_id, campaign_id, brief, attempt)
+
+    def _process(self, worker_id: str, campaign_id: str, brief: Dict, attempt: int):
+        """Run the handler with a heartbeat that keeps the lease alive"""
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.job_store.lease_seconds / 3):
+                try:
+                    if not self.job_store.renew_lease(campaign_id, worker_id):
+                        logger.warning(f"Worker {worker_id} lost lease on campaign {campaign_id}")
+                except Exception as e:
+                    logger.error(f"Failed to renew lease on campaign {campaign_id}: {str(e)}")
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+
+        state = "done"
+        try:
+            self.handler(campaign_id, brief, attempt)
+        except Exception as e:
+            state = "failed"
+            logger.error(f"Campaign worker error {campaign_id}: {str(e)}")
+            self.job_store.set_status(campaign_id, "failed")
+            self.job_store.append_log(campaign_id, f"System error: {str(e)}")
+        finally:
+            done.set()
+            heartbeat_thread.join()
+            self.job_store.complete_job(campaign_id, worker_id, state)
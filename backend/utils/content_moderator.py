@@ -1,63 +1,74 @@
-import re
-import os
-import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Tuple
 from loguru import logger
-from groq import Groq
 
 class ContentModerator:
-    def __init__(self, groq_api_key: str = None):
-        """Initialize the AI-powered content moderator using Groq"""
- 
-
-        self.groq_client = Groq(api_key=groq_api_key)
-        logger.info("Groq AI client initialized successfully")
-        
-        self.model = "llama-3.1-8b-instant"
+    def __init__(self,
+                 backend,
+                 batch_mode: bool = True,
+                 cache_ttl_seconds: int = 3600,
+                 cache_max_entries: int = 1024):
+        """Content moderator with verdict caching over a moderation backend (see provider_registry)"""
+        self.backend = backend
+        self.batch_mode = batch_mode
         
-        self.moderation_prompt = """You are a content moderation AI for advertising campaigns. Analyze the following content and determine if it violates any policies.
+        # TTL + LRU verdict cache: key -> (expires_at, (is_compliant, reason, violations))
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self._verdict_cache: "OrderedDict[str, Tuple[float, Tuple[bool, str, List[str]]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
-        Check for:
-        1. Discriminatory content (age, gender, race, religion, sexual orientation, disability discrimination)
-        2. Illegal content (violence, drugs, hate speech, adult content, scams)
-        3. False or misleading claims (medical claims, guaranteed results, miracle cures)
-        4. Excessive promotional language that could be considered misleading
+    def _cache_key(self, content: str) -> str:
+        """Build verdict cache key from normalized content and the backend's name and version"""
+        normalized = " ".join(content.split()).casefold()
+        key_material = "\n".join([self.backend.name, self.backend.version, normalized])
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
 
-        Content to analyze: "{content}"
+    def _get_cached_verdict(self, content: str):
+        """Return cached (is_compliant, reason, violations) or None"""
+        key = self._cache_key(content)
+        with self._cache_lock:
+            entry = self._verdict_cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._verdict_cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry[1]
+            if entry:
+                del self._verdict_cache[key]
+            self.cache_misses += 1
+        return None
 
-        Respond with a JSON object in this exact format:
-        {{
-            "is_compliant": true/false,
-            "violations": ["list of specific violations found"],
-            "reason": "brief explanation of why content was flagged or approved"
-        }}
+    def _store_verdict(self, content: str, verdict: Tuple[bool, str, List[str]]):
+        """Store verdict and evict least recently used entries over the limit"""
+        key = self._cache_key(content)
+        with self._cache_lock:
+            self._verdict_cache[key] = (time.monotonic() + self.cache_ttl_seconds, verdict)
+            self._verdict_cache.move_to_end(key)
+            while len(self._verdict_cache) > self.cache_max_entries:
+                self._verdict_cache.popitem(last=False)
 
-        Be strict but fair. Only flag content that clearly violates policies."""
+    def get_cache_stats(self) -> Dict:
+        """Get verdict cache counters and usage"""
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "entries": len(self._verdict_cache),
+                "max_entries": self.cache_max_entries,
+                "ttl_seconds": self.cache_ttl_seconds,
+                "backend": self.backend.name,
+                "backend_version": self.backend.version,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": self.cache_hits / lookups if lookups else 0.0
+            }
 
-    def _analyze_content_with_ai(self, content: str, content_type: str) -> Tuple[bool, str, List[str]]:
-        """
-        Analyze content using Groq AI for compliance
-        Returns: (is_compliant, failure_reason, flagged_violations)
-        """
-
-        prompt = self.moderation_prompt.format(content=content)
-        
-        response = self.groq_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.1,  # Low temperature for consistent results
-            max_tokens=500
-        )
-        
-        ai_response = response.choices[0].message.content.strip()
-        logger.debug(f"AI moderation response: {ai_response}")
-        
-        result = json.loads(ai_response)
+    def _verdict_from_result(self, result: Dict, content_type: str) -> Tuple[bool, str, List[str]]:
+        """Convert a backend verdict into (is_compliant, failure_reason, flagged_violations)"""
         is_compliant = result.get("is_compliant", True)
         violations = result.get("violations", [])
         reason = result.get("reason", "")
@@ -66,9 +77,82 @@ class ContentModerator:
             logger.warning(f"Policy violations in {content_type}: {reason}")
             return False, f"{reason}", violations
         else:
-            logger.info(f"AI approved {content_type}: {reason}")
+            logger.info(f"Approved {content_type}: {reason}")
             return True, "", []
 
+    def _analyze_content_with_ai(self, content: str, content_type: str, use_cache: bool = True) -> Tuple[bool, str, List[str]]:
+        """
+        Analyze content for compliance with the moderation backend
+        Returns: (is_compliant, failure_reason, flagged_violations)
+        """
+
+        cached = self._get_cached_verdict(content) if use_cache else None
+        if cached is not None:
+            logger.info(f"Using cached moderation verdict for {content_type}")
+            return cached
+
+        result = self.backend.analyze(content)
+        verdict = self._verdict_from_result(result, content_type)
+        self._store_verdict(content, verdict)
+        return verdict
+
+    def moderate_batch(self, items: Dict[str, str]) -> Dict[str, Tuple[bool, str, List[str]]]:
+        """
+        Moderate several content items with batched backend requests, reusing cached verdicts
+        Returns: {item_id: (is_compliant, failure_reason, flagged_violations)}
+        """
+        verdicts = {}
+        pending = {}
+        
+        for item_id, content in items.items():
+            cached = self._get_cached_verdict(content)
+            if cached is not None:
+                verdicts[item_id] = cached
+            else:
+                pending[item_id] = content
+        
+        if items:
+            logger.info(f"Moderation batch: {len(items) - len(pending)} cached, {len(pending)} to analyze")
+        
+        if not pending:
+            return verdicts
+        
+        # Identical content (e.g. the same message in many briefs) is analyzed once
+        unique = {}
+        for item_id, content in pending.items():
+            unique.setdefault(content, item_id)
+        request_items = {item_id: content for content, item_id in unique.items()}
+        
+        if len(request_items) == 1 or not self.batch_mode:
+            unique_verdicts = {
+                item_id: self._analyze_content_with_ai(content, item_id, use_cache=False)
+                for item_id, content in request_items.items()
+            }
+        else:
+            unique_verdicts = self._analyze_batch_with_ai(request_items)
+        
+        for item_id, content in pending.items():
+            verdicts[item_id] = unique_verdicts[unique[content]]
+        
+        return verdicts
+
+    def _analyze_batch_with_ai(self, pending: Dict[str, str]) -> Dict[str, Tuple[bool, str, List[str]]]:
+        """Moderate distinct uncached items with the backend's batch call, falling back to single requests per missing item"""
+        verdicts = {}
+        results = self.backend.analyze_batch(pending)
+        
+        for item_id, content in pending.items():
+            result = results.get(item_id)
+            if isinstance(result, dict):
+                verdict = self._verdict_from_result(result, item_id)
+                self._store_verdict(content, verdict)
+            else:
+                # Missing from the batch answer - moderate it on its own
+                verdict = self._analyze_content_with_ai(content, item_id, use_cache=False)
+            verdicts[item_id] = verdict
+        
+        return verdicts
+
     def _check_campaign_message(self, campaign_message: str) -> Tuple[bool, str, List[str]]:
         """
         Check campaign message for compliance using AI (private method)
@@ -89,19 +173,34 @@ class ContentModerator:
         Returns: (is_compliant, failure_reason)
         """
 
-        message_compliant, message_reason, _ = self._check_campaign_message(
-            campaign_brief.get('campaign_message', '')
-        )
-        
-        if not message_compliant:
-            return False, message_reason
+        return self.validate_campaign_contents([campaign_brief])[0]
+    
+    def validate_campaign_contents(self, campaign_briefs: List[Dict]) -> List[Tuple[bool, str]]:
+        """
+        Validate several campaign briefs with batched AI requests (public method)
+        Returns: [(is_compliant, failure_reason)] in the same order as the briefs
+        """
+        items = {}
+        for index, campaign_brief in enumerate(campaign_briefs):
+            items[f"{index}.campaign message"] = campaign_brief.get('campaign_message', '')
+            for localized in campaign_brief.get('localized_messages') or []:
+                items[f"{index}.campaign message {localized['locale']}"] = localized['message']
+            items[f"{index}.target audience"] = campaign_brief.get('target_audience', '')
         
-        audience_compliant, audience_reason, _ = self._check_target_audience(
-            campaign_brief.get('target_audience', '')
-        )
+        verdicts = self.moderate_batch(items)
         
-        if not audience_compliant:
-            return False, audience_reason
+        results = []
+        for index in range(len(campaign_briefs)):
+            # Messages (primary, then localized) before the audience, as in the item order above
+            failure = next(
+                (verdicts[item_id][1] for item_id in items
+                 if item_id.startswith(f"{index}.") and not verdicts[item_id][0]),
+                None
+            )
+            if failure is not None:
+                results.append((False, failure))
+            else:
+                results.append((True, "Content passed all compliance checks"))
         
-        return True, "Content passed all compliance checks"
+        return results
     
\ No newline at end of file
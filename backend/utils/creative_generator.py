@@ -1,168 +1,641 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, features
 from pathlib import Path
-from typing import Tuple, List, Dict
+from typing import Callable, Tuple, List, Dict, Optional, Union
 from loguru import logger
+from functools import lru_cache
+import concurrent.futures
+import contextvars
+import hashlib
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
 from .image_generator import ImageGenerator
 from .asset_manager import AssetManager
+from .variant_cache import VariantCache
+from .text_layout import TextLayout, layout_text
+from .local_renderer import LocalRenderer
+from .render_pool import RenderPool
+from .manifest_manager import ManifestManager
+from .single_flight import SingleFlight
+from .source_normalizer import SourceNormalizer, SourceTooLargeError
+from .telemetry import telemetry
+
+@lru_cache(maxsize=32)
+def _band_layer(width: int, height: int) -> Image.Image:
+    """Semi-transparent dark layer for the text band, shared by all creatives of the same size"""
+    return Image.new('RGBA', (width, height), (0, 0, 0, 180))
+
+# Derivative renditions written next to each creative: name -> (max long side, format, extension, save options)
+RENDITION_SPECS = {
+    "thumbnail": (320, "JPEG", "jpg", {"quality": 80, "optimize": True}),
+    "webp": (1080, "WEBP", "webp", {"quality": 80, "method": 4}),
+    "avif": (1080, "AVIF", "avif", {"quality": 60}),
+}
+RENDITIONS_DIRNAME = "renditions"
+
+# Un-overlaid img2img variants kept next to the creatives, so copy edits only redo the overlay
+VARIANTS_DIRNAME = "variants"
+
+# Creatives with localized messages: <product dir>/locales/<locale>/<creative filename>
+LOCALES_DIRNAME = "locales"
+
+# Baseline JPEG settings for final creatives, overridden per deployment with encoder_settings;
+# quality_per_ratio overrides quality for individual aspect ratios
+DEFAULT_ENCODER_SETTINGS = {
+    "quality": 95,
+    "quality_per_ratio": {},
+    "progressive": False,
+    "optimize": False,
+    "subsampling": "4:2:0",
+}
+
+# Generator used inside render processes, created on first job in each process
+_render_process_generator = None
+
+def _render_creative_in_process(*args) -> Dict:
+    """Render process entry point: decode, overlay and encode one creative"""
+    global _render_process_generator
+    if _render_process_generator is None:
+        _render_process_generator = CreativeGenerator(image_generator=None, asset_manager=None)
+    return _render_process_generator.render_creative_file(*args)
 
 class CreativeGenerator:
-    def __init__(self, image_generator: ImageGenerator, asset_manager: AssetManager):
+    def __init__(self, image_generator: ImageGenerator, asset_manager: AssetManager,
+                 max_concurrent_variants: int = 6, variant_cache: Optional[VariantCache] = None,
+                 local_renderer: Optional[LocalRenderer] = None, render_pool: Optional[RenderPool] = None,
+                 manifest_manager: Optional[ManifestManager] = None,
+                 rendition_formats: Tuple[str, ...] = ("thumbnail", "webp"),
+                 encoder_settings: Optional[Dict] = None,
+                 source_normalizer: Optional[SourceNormalizer] = None):
         self.image_generator = image_generator
         self.asset_manager = asset_manager
+        self.variant_cache = variant_cache
+        self.local_renderer = local_renderer or LocalRenderer()
+        # CPU-bound rendering goes to processes; without a pool it runs in the calling thread
+        self.render_pool = render_pool
+        self.manifest_manager = manifest_manager
+        self.rendition_formats = tuple(rendition_formats)
+        self.encoder_settings = {**DEFAULT_ENCODER_SETTINGS, **(encoder_settings or {})}
         self.aspect_ratios = ["1:1", "9:16", "16:9"]
+        self.font_name = "arial.ttf"
+        # Global limit on in-flight img2img variants, shared by every campaign
+        self.variant_semaphore = threading.BoundedSemaphore(max(1, max_concurrent_variants))
+        # Campaigns naming the same new product at the same time share one hero image generation
+        self.hero_flights = SingleFlight("hero image generation")
+        # Large sources are replaced by a bounded-resolution working copy before img2img and rendering
+        self.source_normalizer = source_normalizer
 
     
     def add_text_overlay(self,
                         image: Image.Image,
                         campaign_message: str,
-                        product_name: str) -> Image.Image:
-        """Add campaign message text overlay to image"""
-        # Create a copy to avoid modifying original
-        img_with_text = image.copy()
-        draw = ImageDraw.Draw(img_with_text)
-        
+                        product_name: str,
+                        in_place: bool = False) -> Image.Image:
+        """Add campaign message text overlay to image (in_place draws on RGB input directly)"""
         # Get image dimensions
-        width, height = img_with_text.size
+        width, height = image.size
         
-        # Try to load a font, fall back to default
-        try:
-            font_size = width // 25  # Responsive font size
-            font = ImageFont.truetype("arial.ttf", font_size)
-            small_font = ImageFont.truetype("arial.ttf", font_size // 2)
-        except:
-            font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-        
-        # Create semi-transparent overlay for text readability
-        overlay = Image.new('RGBA', img_with_text.size, (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
-        
-        # Add dark overlay at bottom for text
+        # Responsive font size, fonts are loaded once per size (falls back to default)
+        font_size = width // 25
+        
+        # Darken only the bottom band: composite the band region with a cached
+        # semi-transparent layer and paste it back instead of blending the full frame
         overlay_height = height // 4
-        overlay_draw.rectangle([0, height - overlay_height, width, height],
-                             fill=(0, 0, 0, 180))
+        band_box = (0, height - overlay_height, width, height)
+        
+        if image.mode == 'RGB':
+            # Create a copy to avoid modifying original
+            img_with_text = image if in_place else image.copy()
+            band = img_with_text.crop(band_box).convert('RGBA')
+        else:
+            # Source alpha takes part in the blend, so composite from the RGBA source
+            rgba_image = image.convert('RGBA')
+            img_with_text = rgba_image.convert('RGB')
+            band = rgba_image.crop(band_box)
         
-        # Composite overlay onto image
-        img_with_text = Image.alpha_composite(img_with_text.convert('RGBA'), overlay)
-        img_with_text = img_with_text.convert('RGB')
+        if overlay_height > 0:
+            band = Image.alpha_composite(band, _band_layer(width, overlay_height))
+            img_with_text.paste(band.convert('RGB'), band_box)
         
-        # Redraw on the composite image
         draw = ImageDraw.Draw(img_with_text)
         
         # Add campaign message
         message_y = height - overlay_height + 20
-        self._draw_wrapped_text(draw, campaign_message, 20, message_y, width - 40, font, "white")
+        self._draw_wrapped_text(draw, campaign_message, 20, message_y, width - 40, font_size, "white")
         
         # Add product name at top
         product_y = 20
-        self._draw_wrapped_text(draw, product_name.upper(), 20, product_y, width - 40, small_font, "white")
+        self._draw_wrapped_text(draw, product_name.upper(), 20, product_y, width - 40, font_size // 2, "white")
         
         return img_with_text
     
-    def _draw_wrapped_text(self, draw, text: str, x: int, y: int, max_width: int, font, fill: str):
-        """Draw text with word wrapping"""
-        words = text.split(' ')
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            line_width = bbox[2] - bbox[0]
-            
-            if line_width <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    lines.append(word)  # Single word is too long, add anyway
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Draw each line
-        line_height = 30
-        for i, line in enumerate(lines):
-            draw.text((x, y + i * line_height), line, fill=fill, font=font)
+    def _draw_wrapped_text(self, draw, text: str, x: int, y: int, max_width: int, font_size: int, fill: str) -> TextLayout:
+        """Draw text with word wrapping, reusing the cached layout for this text, font size and width"""
+        layout = layout_text(text, self.font_name, font_size, max_width)
+        layout.draw(draw, x, y, fill)
+        return layout
     
     def generate_creative_set(self, 
                             product_name: str,
                             product_description: str,
                             campaign_message: str,
                             output_dir: Path,
-                            existing_assets: List[str] = None) -> Dict[str, str]:
-        """Generate complete set of creatives for all aspect ratios"""
+                            existing_assets: List[str] = None,
+                            bypass_cache: bool = False,
+                            render_mode: str = "remote",
+                            on_creative: Optional[Callable[[str, str, Dict[str, str]], None]] = None,
+                            localized_messages: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Generate complete set of creatives for all aspect ratios (render_mode "remote" img2img or "local")
+        on_creative(aspect_ratio, output_path, renditions) is called as soon as each creative is saved
+        localized_messages: locale -> message, overlaid on the same decoded variant (see localized_output_path)
+        """
         results = {}
         
+        base_image_path, decodable = self._resolve_base_image(product_name, product_description, existing_assets)
+        if base_image_path is None:
+            return results
+        
+        if render_mode == "local" and not decodable:
+            logger.error(f"No base image to render locally for {product_name}")
+            return results
+        
+        img_prompt = self._image_prompt(product_name, product_description)
+        
+        # Fan out all aspect ratios at once; the shared semaphore bounds remote calls
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.aspect_ratios)) as pool:
+            futures = {
+                ratio_name: pool.submit(contextvars.copy_context().run, self._generate_variant,
+                                        product_name, campaign_message,
+                                        base_image_path, img_prompt, ratio_name, output_dir, bypass_cache,
+                                        render_mode, on_creative, localized_messages)
+                for ratio_name in self.aspect_ratios
+            }
+            # Collect in aspect ratio order so results are deterministic
+            for ratio_name in self.aspect_ratios:
+                output_path = futures[ratio_name].result()
+                if output_path:
+                    results[ratio_name] = output_path
+        
+        return results
+    
+    @staticmethod
+    def _image_prompt(product_name: str, product_description: str) -> str:
+        return f"Professional product photography of {product_name}, {product_description}, high quality, following the mood of product description"
+    
+    def _resolve_base_image(self,
+                            product_name: str,
+                            product_description: str,
+                            existing_assets: List[str] = None) -> Tuple[Optional[str], bool]:
+        """
+        Pick the existing asset or generate a hero image for the product
+        Returns: (base image path or None if generation failed, whether the image decodes)
+        """
         # Use existing asset if available, otherwise generate asset set
         if existing_assets and len(existing_assets) > 0:
             logger.info(f"Using existing asset for {product_name}: {existing_assets[0]}")
             try:
-                base_image = Image.open(existing_assets[0])
+                with Image.open(existing_assets[0]):
+                    pass
+            except Image.DecompressionBombError as e:
+                logger.error(f"Rejected source image {existing_assets[0]}: {str(e)}")
+                return None, False
             except Exception as e:
+                # Remote img2img may still accept the file
                 logger.error(f"Failed to load existing asset: {e}")
-                base_image = None
-        else:
-            # No existing assets - generate with AI image
-            logger.info(f"No assets found for {product_name}, generating single asset")
-            # Create product asset directory
-            product_dir = Path("assets") / product_name.lower().replace(" ", "_")
-            product_dir.mkdir(parents=True, exist_ok=True)
+                return existing_assets[0], False
+            return self._working_copy(existing_assets[0])
+        
+        # No existing assets - generate with AI image, or wait for the same generation already in flight
+        logger.info(f"No assets found for {product_name}, generating single asset")
+        # Names that share an assets directory share its product_1.jpg, so only normalized inputs go in the key
+        key = (product_name.lower().replace(" ", "_"), " ".join((product_description or "").split()).lower())
+        image_path, shared = self.hero_flights.do(key, self._generate_hero_image, product_name, product_description)
+        if shared:
+            telemetry.increment("pipeline_hero_generations_coalesced_total",
+                                help_text="Hero image requests served by a generation already in flight")
+        if image_path is None:
+            return None, False
+        return self._working_copy(image_path)
+    
+    def _working_copy(self, image_path: str) -> Tuple[Optional[str], bool]:
+        """Normalized working copy of a decodable source, or None if the source exceeds the pixel limit"""
+        if not self.source_normalizer:
+            return image_path, True
+        try:
+            return self.source_normalizer.normalize(image_path), True
+        except SourceTooLargeError as e:
+            logger.error(f"Rejected source image {image_path}: {str(e)}")
+            return None, False
+        except Exception as e:
+            logger.error(f"Failed to normalize {image_path}, using the original: {str(e)}")
+            return image_path, True
+    
+    def _generate_hero_image(self, product_name: str, product_description: str) -> Optional[str]:
+        """Generate the product's hero image and publish it atomically, returns its path or None on failure"""
+        # A generation that finished just before this one started has already published the asset
+        if self.asset_manager:
+            existing_assets = self.asset_manager.check_existing_assets(product_name)
+            if existing_assets:
+                logger.info(f"Using asset published meanwhile for {product_name}: {existing_assets[0]}")
+                return existing_assets[0]
+        
+        # Create product asset directory
+        product_dir = Path("assets") / product_name.lower().replace(" ", "_")
+        product_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Generate a AI image into a temp file; readers never see a partial product_1.jpg
+        image_path = product_dir / "product_1.jpg"
+        temp_path = product_dir / f".product_1.{uuid.uuid4().hex}.tmp"
+        try:
+            with telemetry.span("hero_generation"):
+                success = self.image_generator.generate_product_image(product_name, product_description, "", temp_path)
             
-            # Generate a AI image
-            image_path = product_dir / "product_1.jpg"
-            success = self.image_generator.generate_product_image(product_name, product_description, "", image_path)
+            if not success:
+                logger.error(f"Failed to generate asset for {product_name}")
+                return None
             
-            if success:
-                logger.info(f"Using newly generated asset: {image_path}")
-                try:
-                    base_image = Image.open(image_path)
-                except Exception as e:
-                    logger.error(f"Failed to load newly created asset: {e}")
-                    return results
+            try:
+                with Image.open(temp_path):
+                    pass
+            except Exception as e:
+                logger.error(f"Failed to load newly created asset: {e}")
+                return None
+            
+            os.replace(temp_path, image_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        
+        logger.info(f"Using newly generated asset: {image_path}")
+        if self.asset_manager:
+            self.asset_manager.register_asset(product_name, image_path)
+        return str(image_path)
+    
+    def prefetch_variants(self,
+                          product_name: str,
+                          product_description: str,
+                          existing_assets: List[str] = None,
+                          bypass_cache: bool = False,
+                          render_mode: str = "remote") -> int:
+        """
+        Resolve the base image and fill the variant cache for every aspect ratio without rendering,
+        so several campaigns with this product share one set of remote calls
+        Returns: number of variants available in the cache
+        """
+        base_image_path, _ = self._resolve_base_image(product_name, product_description, existing_assets)
+        if base_image_path is None or render_mode == "local":
+            return 0
+        
+        if not (self.variant_cache and self.variant_cache.enabled):
+            logger.warning(f"Variant cache disabled, {product_name} variants cannot be shared across campaigns")
+            return 0
+        
+        img_prompt = self._image_prompt(product_name, product_description)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.aspect_ratios)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._fetch_remote_variant,
+                            product_name, base_image_path, img_prompt, ratio_name, bypass_cache)
+                for ratio_name in self.aspect_ratios
+            ]
+            return sum(1 for future in futures if self._prefetch_result(future, product_name))
+    
+    @staticmethod
+    def _prefetch_result(future: concurrent.futures.Future, product_name: str) -> bool:
+        try:
+            return future.result() is not None
+        except Exception as e:
+            logger.error(f"Failed to prefetch variant for {product_name}: {str(e)}")
+            return False
+    
+    def _generate_variant(self,
+                          product_name: str,
+                          campaign_message: str,
+                          base_image_path: str,
+                          img_prompt: str,
+                          ratio_name: str,
+                          output_dir: Path,
+                          bypass_cache: bool = False,
+                          render_mode: str = "remote",
+                          on_creative: Optional[Callable[[str, str, Dict[str, str]], None]] = None,
+                          localized_messages: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Generate a single aspect ratio creative, returns output path or None on failure"""
+        try:
+            if render_mode == "local":
+                logger.info(f"Rendering {ratio_name} variant locally")
+                source = str(base_image_path)
             else:
-                logger.error(f"Failed to generate asset for {product_name}")
-                return results
+                source = self._fetch_remote_variant(
+                    product_name, base_image_path, img_prompt, ratio_name, bypass_cache
+                )
+            
+            if source is not None:
+                variant_path = None if render_mode == "local" else self._store_variant(
+                    source, output_dir, product_name, ratio_name
+                )
+                return self._render_variant(product_name, campaign_message, source, ratio_name, output_dir,
+                                            render_mode, variant_path, on_creative, localized_messages)
+            
+        except Exception as e:
+            logger.error(f"Failed to generate {ratio_name} creative for {product_name}: {str(e)}")
         
-
-        if existing_assets and len(existing_assets) > 0:
-            base_image_path = existing_assets[0]
-        else:
-            base_image_path = str(product_dir / "product_1.jpg")
+        return None
+    
+    @staticmethod
+    def _creative_filename(product_name: str, ratio_name: str) -> str:
+        return f"{product_name.lower().replace(' ', '_')}_{ratio_name.replace(':', 'x')}.jpg"
+    
+    @classmethod
+    def localized_output_path(cls, output_dir: Path, locale: str, product_name: str, ratio_name: str) -> Path:
+        return Path(output_dir) / LOCALES_DIRNAME / locale / cls._creative_filename(product_name, ratio_name)
+    
+    def _render_variant(self,
+                        product_name: str,
+                        campaign_message: str,
+                        source: Union[str, bytes],
+                        ratio_name: str,
+                        output_dir: Path,
+                        render_mode: str,
+                        variant_path: Optional[str],
+                        on_creative: Optional[Callable[[str, str, Dict[str, str]], None]],
+                        localized_messages: Optional[Dict[str, str]] = None) -> str:
+        """Overlay and encode one creative from its variant, record it and publish it, returns the output path"""
+        output_path = output_dir / self._creative_filename(product_name, ratio_name)
+        localized = {
+            locale: (message, str(self.localized_output_path(output_dir, locale, product_name, ratio_name)))
+            for locale, message in (localized_messages or {}).items()
+        }
+        
+        # Decode, overlay and encode off the I/O threads; downloaded variants cross
+        # processes as encoded bytes and are never written to a temp file
+        args = (source, str(output_path), campaign_message, product_name, ratio_name, render_mode,
+                self.rendition_formats, self.get_save_options(ratio_name), localized,
+                self.source_normalizer.max_working_side if self.source_normalizer else None)
+        with telemetry.span("render"):
+            if self.render_pool:
+                render_result = self.render_pool.run(_render_creative_in_process, *args)
+            else:
+                render_result = self.render_creative_file(*args)
+        
+        # Stages timed inside the render call, possibly in another process
+        for stage, seconds in render_result["timings"].items():
+            telemetry.record(stage, seconds)
+        
+        if self.manifest_manager:
+            with telemetry.span("manifest_update"):
+                self.manifest_manager.record_creative(output_path, ratio_name, render_result["renditions"],
+                                                      variant_path, render_result["locales"])
+        
+        self._log_render_result(product_name, ratio_name, render_result)
+        logger.info(f"Generated creative using {render_mode} rendering: {output_path}")
         
+        if on_creative:
+            try:
+                on_creative(ratio_name, str(output_path), render_result["renditions"])
+            except Exception as e:
+                logger.warning(f"Failed to publish {ratio_name} creative for {product_name}: {str(e)}")
+        return str(output_path)
+    
+    def _store_variant(self, source: Union[str, bytes], output_dir: Path, product_name: str,
+                       ratio_name: str) -> Optional[str]:
+        """Keep the un-overlaid variant with the campaign (hard link for files, atomic write for bytes)"""
+        variant_path = output_dir / VARIANTS_DIRNAME / self._creative_filename(product_name, ratio_name)
+        temp_path = variant_path.with_name(f".{variant_path.name}.{threading.get_ident()}.tmp")
+        try:
+            variant_path.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(source, bytes):
+                temp_path.write_bytes(source)
+            else:
+                try:
+                    # Cache entries are replaced, never modified, so sharing the inode is safe
+                    os.link(source, temp_path)
+                except OSError:
+                    shutil.copyfile(source, temp_path)
+            os.replace(temp_path, variant_path)
+            return str(variant_path)
+        except Exception as e:
+            logger.warning(f"Failed to keep {ratio_name} variant for {product_name}: {str(e)}")
+            temp_path.unlink(missing_ok=True)
+            return None
+    
+    def find_variants(self, output_dir: Path, product_name: str) -> Dict[str, str]:
+        """Un-overlaid variants kept by an earlier campaign for this product: ratio -> path"""
+        variants = {}
         for ratio_name in self.aspect_ratios:
+            variant_path = Path(output_dir) / VARIANTS_DIRNAME / self._creative_filename(product_name, ratio_name)
+            if variant_path.is_file():
+                variants[ratio_name] = str(variant_path)
+        return variants
+    
+    def rerender_creative_set(self,
+                              product_name: str,
+                              campaign_message: str,
+                              output_dir: Path,
+                              variants: Dict[str, str],
+                              on_creative: Optional[Callable[[str, str, Dict[str, str]], None]] = None,
+                              localized_messages: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Redo only the overlay: render creatives from variants kept by an earlier campaign,
+        without any remote calls. Returns ratio -> output path for the creatives rendered
+        """
+        def rerender(ratio_name: str, source: str) -> Optional[str]:
             try:
-                logger.info(f"Generating {ratio_name} variant using img2img model")
-                img_prompt = f"Professional product photography of {product_name}, {product_description}, high quality, following the mood of product description"
-                
-                variant_image_url = self.image_generator.generate_img2img_variant(
-                    input_image_path=base_image_path,
-                    aspect_ratio=ratio_name,
-                    prompt=img_prompt
-                )
-                
-                temp_variant_path = output_dir / f"temp_variant_{ratio_name.replace(':', 'x')}.jpg"
-                if self.image_generator.download_image_from_url(variant_image_url, temp_variant_path):
-                    variant_image = Image.open(temp_variant_path)
-                    
-                    # Add text overlay
-                    final_creative = self.add_text_overlay(variant_image, campaign_message, product_name)
-                    
-                    filename = f"{product_name.lower().replace(' ', '_')}_{ratio_name.replace(':', 'x')}.jpg"
-                    output_path = output_dir / filename
-                    final_creative.save(output_path, quality=95)
-                    
-                    # Clean up temp file
-                    temp_variant_path.unlink()
-                    
-                    results[ratio_name] = str(output_path)
-                    logger.info(f"Generated creative using img2img: {output_path}")
-                else:
-                    logger.error(f"Failed to download img2img variant for {ratio_name}")
-                
+                variant_path = self._store_variant(source, output_dir, product_name, ratio_name)
+                return self._render_variant(product_name, campaign_message, variant_path or source, ratio_name,
+                                            output_dir, "remote", variant_path, on_creative, localized_messages)
             except Exception as e:
-                logger.error(f"Failed to generate {ratio_name} creative for {product_name}: {str(e)}")
+                logger.error(f"Failed to re-render {ratio_name} creative for {product_name}: {str(e)}")
+                return None
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(variants))) as pool:
+            futures = {
+                ratio_name: pool.submit(contextvars.copy_context().run, rerender, ratio_name, source)
+                for ratio_name, source in variants.items()
+            }
+            results = {ratio_name: future.result() for ratio_name, future in futures.items()}
+        
+        return {ratio_name: path for ratio_name, path in results.items() if path}
+    
+    def get_save_options(self, aspect_ratio: str) -> Dict:
+        """Pillow JPEG save options for a ratio from the encoder settings"""
+        settings = self.encoder_settings
+        return {
+            "quality": settings["quality_per_ratio"].get(aspect_ratio, settings["quality"]),
+            "progressive": settings["progressive"],
+            "optimize": settings["optimize"],
+            "subsampling": settings["subsampling"],
+        }
+    
+    @staticmethod
+    def _log_render_result(product_name: str, aspect_ratio: str, render_result: Dict):
+        """Report what the in-memory path saved for one creative"""
+        if render_result["in_memory_bytes"]:
+            # The previous pipeline wrote the download to a temp file and read it back
+            logger.info(
+                f"{product_name} {aspect_ratio}: decoded {render_result['in_memory_bytes']} bytes from memory, "
+                f"{2 * render_result['in_memory_bytes']} bytes of temp file I/O avoided; "
+                f"encoded {render_result['output_bytes']} bytes in {render_result['timings']['encode'] * 1000:.1f} ms"
+            )
+        else:
+            logger.debug(
+                f"{product_name} {aspect_ratio}: encoded {render_result['output_bytes']} bytes "
+                f"in {render_result['timings']['encode'] * 1000:.1f} ms"
+            )
+    
+    def render_creative_file(self,
+                             source: Union[str, bytes],
+                             output_path: str,
+                             campaign_message: str,
+                             product_name: str,
+                             aspect_ratio: str,
+                             render_mode: str = "remote",
+                             rendition_formats: Tuple[str, ...] = (),
+                             save_options: Optional[Dict] = None,
+                             localized: Optional[Dict[str, Tuple[str, str]]] = None,
+                             max_source_side: Optional[int] = None) -> Dict:
+        """
+        Decode source image (a path or encoded bytes), render the aspect ratio if local, add overlay and encode to output_path
+        localized: locale -> (message, output path), each overlaid on a copy of the same decoded image
+        max_source_side: larger sources are decoded at reduced scale and downscaled to fit
+        Returns: renditions (name -> path), locales (locale -> path), sizes, and seconds spent per stage
+        """
+        timings = {}
+        started = time.perf_counter()
+        
+        in_memory = isinstance(source, (bytes, bytearray))
+        with Image.open(io.BytesIO(source) if in_memory else source) as source_file:
+            if max_source_side and max(source_file.size) > max_source_side:
+                source_file.draft('RGB', (max_source_side, max_source_side))
+                source_file.thumbnail((max_source_side, max_source_side), Image.LANCZOS, reducing_gap=2.0)
+            source_file.load()
+            image = source_file if source_file.mode == 'RGB' else source_file.convert('RGB')
+        started = self._lap(timings, "decode", started)
+        
+        if render_mode == "local":
+            image = self.local_renderer.render(image, aspect_ratio)
+            started = self._lap(timings, "local_render", started)
+        
+        # Localized overlays first, on copies; the primary overlay below draws in place
+        locales = {}
+        for locale, (message, locale_path) in (localized or {}).items():
+            localized_creative = self.add_text_overlay(image.copy(), message, product_name, in_place=True)
+            Path(locale_path).parent.mkdir(parents=True, exist_ok=True)
+            localized_creative.save(locale_path, format="JPEG", **(save_options or self.get_save_options(aspect_ratio)))
+            locales[locale] = locale_path
+        if localized:
+            started = self._lap(timings, "locale_overlays", started)
+        
+        # Add text overlay
+        final_creative = self.add_text_overlay(image, campaign_message, product_name, in_place=True)
+        started = self._lap(timings, "overlay", started)
+        
+        buffer = io.BytesIO()
+        final_creative.save(buffer, format="JPEG", **(save_options or self.get_save_options(aspect_ratio)))
+        payload = buffer.getbuffer()
+        with open(output_path, "wb") as f:
+            f.write(payload)
+        started = self._lap(timings, "encode", started)
+        
+        renditions = self._save_renditions(final_creative, Path(output_path), rendition_formats)
+        if rendition_formats:
+            self._lap(timings, "renditions", started)
+        
+        return {
+            "renditions": renditions,
+            "locales": locales,
+            "in_memory_bytes": len(source) if in_memory else 0,
+            "output_bytes": len(payload),
+            "timings": timings,
+        }
+    
+    @staticmethod
+    def _lap(timings: Dict[str, float], stage: str, started: float) -> float:
+        """Store seconds since started under stage, returns the new start time"""
+        now = time.perf_counter()
+        timings[stage] = now - started
+        return now
+    
+    def _save_renditions(self, final_creative: Image.Image, output_path: Path,
+                         rendition_formats: Tuple[str, ...]) -> Dict[str, str]:
+        """Encode downscaled previews of the final creative under renditions/, named by content hash"""
+        renditions = {}
+        if not rendition_formats:
+            return renditions
+        
+        renditions_dir = output_path.parent / RENDITIONS_DIRNAME
+        renditions_dir.mkdir(exist_ok=True)
+        
+        # Downscale largest first so smaller renditions resample the already reduced image
+        resized = final_creative
+        for name in sorted(rendition_formats, key=lambda n: -RENDITION_SPECS[n][0]):
+            max_side, image_format, extension, save_options = RENDITION_SPECS[name]
+            if image_format == "AVIF" and not features.check("avif"):
+                logger.debug("AVIF encoding not supported by this Pillow build, skipping avif rendition")
+                continue
+            
+            if max(resized.size) > max_side:
+                resized = resized.copy()
+                resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format, **save_options)
+            payload = buffer.getvalue()
+            
+            # Content-addressed names let clients cache renditions forever
+            digest = hashlib.sha256(payload).hexdigest()[:16]
+            rendition_path = renditions_dir / f"{output_path.stem}.{name}.{digest}.{extension}"
+            temp_path = rendition_path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_bytes(payload)
+            os.replace(temp_path, rendition_path)
+            renditions[name] = str(rendition_path)
+        
+        # Drop renditions left over from an earlier render of the same creative
+        current = set(renditions.values())
+        for stale in renditions_dir.glob(f"{output_path.stem}.*"):
+            if str(stale) not in current and not stale.name.endswith(".tmp"):
+                stale.unlink(missing_ok=True)
+        
+        return {name: renditions[name] for name in rendition_formats if name in renditions}
+    
+    def _fetch_remote_variant(self,
+                              product_name: str,
+                              base_image_path: str,
+                              img_prompt: str,
+                              ratio_name: str,
+                              bypass_cache: bool = False) -> Optional[Union[str, bytes]]:
+        """Get an img2img variant from the cache (as a path) or the remote model (as encoded bytes)"""
+        cache_key = None
+        
+        if self.variant_cache:
+            cache_key = self.variant_cache.make_key(
+                base_image_path, img_prompt, ratio_name, self.image_generator.img2img_model
+            )
+            if not bypass_cache:
+                cached_variant_path = self.variant_cache.get(cache_key)
+                if cached_variant_path:
+                    logger.info(f"Using cached {ratio_name} variant for {product_name}")
+                    return str(cached_variant_path)
+        
+        logger.info(f"Generating {ratio_name} variant using img2img model")
+        
+        wait_started = time.perf_counter()
+        with self.variant_semaphore:
+            telemetry.record("variant_slot_wait", time.perf_counter() - wait_started)
+            variant_output = self.image_generator.generate_img2img_variant(
+                input_image_path=base_image_path,
+                aspect_ratio=ratio_name,
+                prompt=img_prompt
+            )
+            
+            variant_bytes = self.image_generator.output_bytes(variant_output)
+        
+        if not variant_bytes:
+            logger.error(f"Failed to download img2img variant for {ratio_name}")
+            return None
+        
+        if cache_key:
+            self.variant_cache.put_bytes(cache_key, variant_bytes)
         
-        return results
\ No newline at end of file
+        return variant_bytes
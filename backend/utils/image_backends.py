@@ -0,0 +1,156 @@
+import hashlib
+import io
+import random
+from typing import Union
+from PIL import Image, ImageDraw, ImageEnhance
+from .lazy_client import LazyClient
+from .provider_scheduler import ProviderScheduler
+
+# Backends return either a URL to download the image from or the encoded image itself
+ImageOutput = Union[str, bytes]
+
+# Output sizes of text-to-image models per requested aspect ratio
+TEXT_TO_IMAGE_SIZES = {"1:1": (1024, 1024), "9:16": (768, 1344), "16:9": (1344, 768)}
+
+
+class _ReplicateBackend:
+    name = "replicate"
+
+    def __init__(self, api_token: str, model: str, scheduler: ProviderScheduler = None):
+        """Replicate predictions through a scheduler (throttling and retries); the client is built on first use"""
+        self.api_token = api_token
+        self.model = model
+        self.scheduler = scheduler or ProviderScheduler("replicate")
+        self.client = LazyClient("Replicate", self._create_client)
+
+    def _create_client(self):
+        import replicate
+        return replicate.Client(api_token=self.api_token)
+
+    def _run(self, run_model) -> ImageOutput:
+        """Call run_model(client) under the scheduler, returns the first output URL"""
+        import httpx
+
+        def call():
+            # Transport errors become ConnectionError, which the scheduler retries
+            try:
+                return run_model(self.client.get())
+            except httpx.TransportError as e:
+                raise ConnectionError(str(e)) from e
+
+        output = self.scheduler.call(call)
+        image_url = output if isinstance(output, str) else output[0] if isinstance(output, list) else None
+        if not image_url:
+            raise ValueError(f"No valid image URL returned from {self.model}")
+        return image_url
+
+
+class ReplicateTextToImage(_ReplicateBackend):
+    def __init__(self, api_token: str, model: str = "black-forest-labs/flux-dev", scheduler: ProviderScheduler = None):
+        super().__init__(api_token, model, scheduler)
+
+    def generate(self, prompt: str, aspect_ratio: str = "1:1") -> ImageOutput:
+        return self._run(lambda client: client.run(
+            self.model,
+            input={
+                "prompt": prompt,
+                "aspect_ratio": aspect_ratio,
+                "output_format": "jpg",
+                "output_quality": 90,
+                "num_inference_steps": 28
+            }
+        ))
+
+
+class ReplicateImg2Img(_ReplicateBackend):
+    def __init__(self, api_token: str,
+                 model: str = "bxclib2/flux_img2img:0ce45202d83c6bd379dfe58f4c0c41e6cadf93ebbd9d938cc63cc0f2fcb729a5",
+                 scheduler: ProviderScheduler = None):
+        super().__init__(api_token, model, scheduler)
+
+    def generate(self, image_path: str, prompt: str) -> ImageOutput:
+        """Output keeps the input image dimensions"""
+        def run_model(client):
+            # Reopened per attempt so a retry uploads the whole image again
+            with open(image_path, "rb") as image_file:
+                return client.run(
+                    self.model,
+                    input={
+                        "seed": 0,
+                        "image": image_file,
+                        "steps": 20,
+                        "denoising": 0.25,
+                        "scheduler": "simple",
+                        "sampler_name": "euler",
+                        "positive_prompt": prompt
+                    }
+                )
+
+        return self._run(run_model)
+
+
+def _prompt_random(prompt: str, seed: int) -> random.Random:
+    digest = hashlib.sha256(f"{seed}\n{prompt}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class ProceduralTextToImage:
+    name = "procedural"
+
+    def __init__(self, seed: int = 0, quality: int = 90):
+        """Local stand-in for text-to-image: a deterministic studio-style shot drawn from the prompt, no network"""
+        self.seed = seed
+        self.quality = quality
+        self.model = f"procedural-text-to-image/{seed}"
+        self.scheduler = None
+
+    def generate(self, prompt: str, aspect_ratio: str = "1:1") -> ImageOutput:
+        rng = _prompt_random(prompt, self.seed)
+        width, height = TEXT_TO_IMAGE_SIZES.get(aspect_ratio, (1024, 1024))
+
+        # Light backdrop with a vertical falloff, and a product-like shape with a soft shadow
+        backdrop = tuple(rng.randint(200, 245) for _ in range(3))
+        shade = tuple(c - 60 for c in backdrop)
+        gradient = Image.linear_gradient('L').resize((width, height))
+        image = Image.composite(Image.new('RGB', (width, height), shade),
+                                Image.new('RGB', (width, height), backdrop), gradient)
+
+        draw = ImageDraw.Draw(image)
+        body = tuple(rng.randint(30, 200) for _ in range(3))
+        product_width = int(width * rng.uniform(0.25, 0.4))
+        product_height = int(height * rng.uniform(0.4, 0.6))
+        left = (width - product_width) // 2
+        top = (height - product_height) // 2
+        draw.ellipse((left - product_width // 5, top + product_height - height // 40,
+                      left + product_width * 6 // 5, top + product_height + height // 40), fill=shade)
+        draw.rounded_rectangle((left, top, left + product_width, top + product_height),
+                               radius=product_width // 6, fill=body)
+        label = tuple(255 - c for c in body)
+        draw.rectangle((left, top + product_height // 3, left + product_width, top + product_height * 2 // 3),
+                       fill=label)
+        return _encode_jpeg(image, self.quality)
+
+
+class ProceduralImg2Img:
+    name = "procedural"
+
+    def __init__(self, seed: int = 0, quality: int = 90):
+        """Local stand-in for img2img: a deterministic color grade of the input, same dimensions, no network"""
+        self.seed = seed
+        self.quality = quality
+        self.model = f"procedural-img2img/{seed}"
+        self.scheduler = None
+
+    def generate(self, image_path: str, prompt: str) -> ImageOutput:
+        rng = _prompt_random(prompt, self.seed)
+        with Image.open(image_path) as source:
+            image = source.convert('RGB')
+        image = ImageEnhance.Color(image).enhance(rng.uniform(0.9, 1.15))
+        image = ImageEnhance.Contrast(image).enhance(rng.uniform(0.95, 1.1))
+        return _encode_jpeg(image, self.quality)
@@ -1,52 +1,62 @@
-from PIL import Image, ImageDraw, ImageFont
 import requests
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 from loguru import logger
-import os
-import random
-import replicate
+from .image_backends import ImageOutput
+from .provider_scheduler import ProviderScheduler
+from .telemetry import telemetry
+
+# Response bodies are read in chunks of this size instead of buffering them whole
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
 class ImageGenerator:
-    def __init__(self, replicate_api_token: str):
-        self.replicate_api_token = replicate_api_token
-        self.replicate_client = replicate.Client(api_token=replicate_api_token)
+    def __init__(self,
+                 text_to_image,
+                 img2img,
+                 download_scheduler: ProviderScheduler = None):
+        """
+        Hero images and img2img variants from the configured backends (see provider_registry);
+        outputs returned as URLs are downloaded through their own scheduler (throttling and retries)
+        """
+        self.text_to_image = text_to_image
+        self.img2img = img2img
+        self.download_scheduler = download_scheduler or ProviderScheduler(
+            "download", retry_on=(requests.Timeout, requests.ConnectionError)
+        )
+    
+    @property
+    def img2img_model(self) -> str:
+        """Identifies the img2img backend and model in variant cache keys"""
+        return self.img2img.model
         
-    def generate_with_replicate(self, product_name: str, product_description: str, aspect_ratio: str = "1:1") -> str:
-        """Generate image using Replicate API"""
+    def generate_hero_image(self, product_name: str, product_description: str, aspect_ratio: str = "1:1") -> ImageOutput:
+        """Generate image with the text-to-image backend, returns its URL or encoded bytes"""
         try:
             prompt = f"Professional high-quality product photography of {product_name}. {product_description}. Clean white background, professional studio lighting, commercial photography, 4K resolution, product catalog style"
             
-            output = self.replicate_client.run(
-                "black-forest-labs/flux-dev",
-                input={
-                    "prompt": prompt,
-                    "aspect_ratio": aspect_ratio,
-                    "output_format": "jpg",
-                    "output_quality": 90,
-                    "num_inference_steps": 28
-                }
-            )
+            with telemetry.span(f"{self.text_to_image.name}_text_to_image"):
+                output = self.text_to_image.generate(prompt, aspect_ratio)
             
-            image_url = output if isinstance(output, str) else output[0] if isinstance(output, list) else None
-            if image_url:
-                logger.info(f"Generated image with Replicate for {product_name}")
-                return image_url
-            else:
-                raise ValueError(f"No valid image URL returned from Replicate for {product_name}")
+            logger.info(f"Generated image with {self.text_to_image.name} for {product_name}")
+            return output
                 
         except Exception as e:
-            logger.error(f"Replicate generation failed: {str(e)}")
+            logger.error(f"{self.text_to_image.name} generation failed: {str(e)}")
             raise
     
     def download_image_from_url(self, url: str, save_path: Path) -> bool:
-        """Download image from URL and save to path"""
+        """Download image from URL and stream it to path"""
+        def download():
+            with requests.get(url, timeout=60, stream=True) as response:
+                response.raise_for_status()
+                
+                with open(save_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+        
         try:
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
+            with telemetry.span("download"):
+                self.download_scheduler.call(download)
             
             logger.info(f"Downloaded image to {save_path}")
             return True
@@ -55,34 +65,47 @@ class ImageGenerator:
             logger.error(f"Failed to download image: {str(e)}")
             return False
     
+    def download_image_bytes(self, url: str) -> Optional[bytes]:
+        """Download image from URL into memory, returns the encoded bytes or None on failure"""
+        def download() -> bytearray:
+            with requests.get(url, timeout=60, stream=True) as response:
+                response.raise_for_status()
+                
+                body = bytearray()
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    body.extend(chunk)
+                return body
+        
+        try:
+            with telemetry.span("download"):
+                body = self.download_scheduler.call(download)
+            
+            logger.info(f"Downloaded image ({len(body)} bytes) into memory")
+            return bytes(body)
+            
+        except Exception as e:
+            logger.error(f"Failed to download image: {str(e)}")
+            return None
+    
+    def output_bytes(self, output: ImageOutput) -> Optional[bytes]:
+        """Encoded image of a backend output, downloading it if it is a URL; None on failure"""
+        if isinstance(output, (bytes, bytearray)):
+            return bytes(output)
+        return self.download_image_bytes(output)
+    
     def generate_img2img_variant(self,
                                 input_image_path: str,
                                 aspect_ratio: str = "1:1",
-                                prompt: str = "high quality product photography, professional lighting, clean background") -> str:
-        """Generate image variant using img2img model"""
+                                prompt: str = "high quality product photography, professional lighting, clean background") -> ImageOutput:
+        """Generate image variant with the img2img backend, returns its URL or encoded bytes"""
         try:
             logger.info(f"Generating img2img variant (maintains original image dimensions)")
             
-            with open(input_image_path, "rb") as image_file:
-                output = self.replicate_client.run(
-                    "bxclib2/flux_img2img:0ce45202d83c6bd379dfe58f4c0c41e6cadf93ebbd9d938cc63cc0f2fcb729a5",
-                    input={
-                        "seed": 0,
-                        "image": image_file,
-                        "steps": 20,
-                        "denoising": 0.25,
-                        "scheduler": "simple",
-                        "sampler_name": "euler",
-                        "positive_prompt": prompt
-                    }
-                )
+            with telemetry.span(f"{self.img2img.name}_img2img"):
+                output = self.img2img.generate(input_image_path, prompt)
             
-            image_url = output if isinstance(output, str) else output[0] if isinstance(output, list) else None
-            if image_url:
-                logger.info(f"Generated img2img variant (same dimensions as input)")
-                return image_url
-            else:
-                raise ValueError(f"No valid image URL returned from img2img model")
+            logger.info(f"Generated img2img variant (same dimensions as input)")
+            return output
                 
         except Exception as e:
             logger.error(f"Img2img generation failed: {str(e)}")
@@ -97,8 +120,11 @@ class ImageGenerator:
                              aspect_ratio: str = "1:1") -> bool:
         """Generate or create product image and save to output path"""
         try:
-            image_url = self.generate_with_replicate(product_name, product_description, aspect_ratio)
-            if self.download_image_from_url(image_url, output_path):
+            output = self.generate_hero_image(product_name, product_description, aspect_ratio)
+            if isinstance(output, (bytes, bytearray)):
+                Path(output_path).write_bytes(output)
+                return True
+            if self.download_image_from_url(output, output_path):
                 return True
             else:
                 logger.error(f"Failed to download image for {product_name}")
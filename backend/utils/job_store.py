@@ -0,0 +1,394 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+class JobStore:
+    def __init__(self, db_path: str = "data/jobs.sqlite3", lease_seconds: int = 120, max_attempts: int = 3):
+        """Durable campaign state and job queue backed by SQLite in WAL mode"""
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._setup_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, opened lazily"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _setup_database(self):
+        """Create database file and tables if they don't exist"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                campaign_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                brief TEXT NOT NULL,
+                creatives TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS campaign_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                campaign_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_campaign_logs_campaign ON campaign_logs (campaign_id, id);
+            CREATE TABLE IF NOT EXISTS campaign_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                campaign_id TEXT NOT NULL,
+                event TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_campaign_events_campaign ON campaign_events (campaign_id, id);
+            CREATE TABLE IF NOT EXISTS jobs (
+                campaign_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, created_at);
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                campaign_ids TEXT NOT NULL,
+                preparation TEXT NOT NULL DEFAULT '{}',
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # Databases created before batches existed lack the column
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(campaigns)")]
+        if "batch_id" not in columns:
+            conn.execute("ALTER TABLE campaigns ADD COLUMN batch_id TEXT")
+        if "source_campaign_id" not in columns:
+            conn.execute("ALTER TABLE campaigns ADD COLUMN source_campaign_id TEXT")
+        logger.info(f"Job store setup: {self.db_path}")
+
+    # Campaign state
+
+    @staticmethod
+    def _insert_events(conn: sqlite3.Connection, campaign_id: str, events: List[Tuple[str, Dict]], now: float):
+        """Append progress events in the caller's transaction"""
+        conn.executemany(
+            "INSERT INTO campaign_events (campaign_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+            [(campaign_id, event, json.dumps(data), now) for event, data in events]
+        )
+
+    def create_campaign(self, campaign_id: str, brief: Dict, initial_log: str, source_campaign_id: str = None):
+        """Insert a campaign in processing state and queue its job (source_campaign_id for re-renders)"""
+        with self._transaction() as conn:
+            self._insert_campaign(conn, campaign_id, brief, initial_log, None, time.time())
+            if source_campaign_id:
+                conn.execute(
+                    "UPDATE campaigns SET source_campaign_id = ? WHERE campaign_id = ?",
+                    (source_campaign_id, campaign_id)
+                )
+
+    def create_batch(self, batch_id: str, campaigns: List[Tuple[str, Dict, str]]):
+        """Insert a batch of (campaign_id, brief, initial_log) and queue every campaign in one transaction"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO batches (batch_id, state, campaign_ids, created_at, updated_at) VALUES (?, 'pending', ?, ?, ?)",
+                (batch_id, json.dumps([campaign_id for campaign_id, _, _ in campaigns]), now, now)
+            )
+            for campaign_id, brief, initial_log in campaigns:
+                self._insert_campaign(conn, campaign_id, brief, initial_log, batch_id, now)
+
+    def _insert_campaign(self, conn: sqlite3.Connection, campaign_id: str, brief: Dict, initial_log: str,
+                         batch_id: Optional[str], now: float):
+        conn.execute(
+            "INSERT INTO campaigns (campaign_id, status, brief, creatives, batch_id, created_at, updated_at) "
+            "VALUES (?, 'processing', ?, '{}', ?, ?, ?)",
+            (campaign_id, json.dumps(brief), batch_id, now, now)
+        )
+        conn.execute(
+            "INSERT INTO campaign_logs (campaign_id, message, created_at) VALUES (?, ?, ?)",
+            (campaign_id, initial_log, now)
+        )
+        conn.execute(
+            "INSERT INTO jobs (campaign_id, state, created_at, updated_at) VALUES (?, 'queued', ?, ?)",
+            (campaign_id, now, now)
+        )
+        self._insert_events(conn, campaign_id, [
+            ("status", {"status": "processing"}),
+            ("log", {"message": initial_log})
+        ], now)
+
+    def append_log(self, campaign_id: str, message: str):
+        """Append a log line to a campaign"""
+        self.append_logs(campaign_id, [message])
+
+    def append_logs(self, campaign_id: str, messages: List[str]):
+        """Append several log lines to a campaign in order"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO campaign_logs (campaign_id, message, created_at) VALUES (?, ?, ?)",
+                [(campaign_id, message, now) for message in messages]
+            )
+            self._insert_events(conn, campaign_id, [("log", {"message": message}) for message in messages], now)
+
+    def set_status(self, campaign_id: str, status: str):
+        """Update campaign status"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE campaigns SET status = ?, updated_at = ? WHERE campaign_id = ?",
+                (status, now, campaign_id)
+            )
+            self._insert_events(conn, campaign_id, [("status", {"status": status})], now)
+
+    def set_product_result(self, campaign_id: str, product_name: str, product_result: Dict):
+        """Store the creatives result for one product"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT creatives FROM campaigns WHERE campaign_id = ?", (campaign_id,)).fetchone()
+            creatives = json.loads(row["creatives"]) if row else {}
+            creatives[product_name] = product_result
+            conn.execute(
+                "UPDATE campaigns SET creatives = ?, updated_at = ? WHERE campaign_id = ?",
+                (json.dumps(creatives), now, campaign_id)
+            )
+            self._insert_events(conn, campaign_id, [("product", {"product": product_name, "result": product_result})], now)
+
+    def reset_creatives(self, campaign_id: str):
+        """Clear product results before a campaign is reprocessed"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE campaigns SET creatives = '{}', status = 'processing', updated_at = ? WHERE campaign_id = ?",
+                (now, campaign_id)
+            )
+            self._insert_events(conn, campaign_id, [("reset", {}), ("status", {"status": "processing"})], now)
+
+    def add_event(self, campaign_id: str, event: str, data: Dict):
+        """Publish a progress event, e.g. a creative that was just saved"""
+        with self._transaction() as conn:
+            self._insert_events(conn, campaign_id, [(event, data)], time.time())
+
+    def get_events(self, campaign_id: str, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """Progress events with id greater than after_id, oldest first"""
+        conn = self._connect()
+        return [
+            {"id": row["id"], "event": row["event"], "data": json.loads(row["data"])}
+            for row in conn.execute(
+                "SELECT id, event, data FROM campaign_events WHERE campaign_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (campaign_id, after_id, limit)
+            )
+        ]
+
+    def get_campaign(self, campaign_id: str) -> Optional[Dict]:
+        """Get campaign result in the same shape the API returns"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT campaign_id, status, brief, creatives FROM campaigns WHERE campaign_id = ?",
+            (campaign_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        logs = [r["message"] for r in conn.execute(
+            "SELECT message FROM campaign_logs WHERE campaign_id = ? ORDER BY id", (campaign_id,)
+        )]
+        last_event = conn.execute(
+            "SELECT MAX(id) AS id FROM campaign_events WHERE campaign_id = ?", (campaign_id,)
+        ).fetchone()
+        return {
+            "campaign_id": row["campaign_id"],
+            "status": row["status"],
+            "brief": json.loads(row["brief"]),
+            "creatives": json.loads(row["creatives"]),
+            "logs": logs,
+            # Resume point for the events stream after this snapshot
+            "last_event_id": last_event["id"] or 0
+        }
+
+    def get_campaign_source_id(self, campaign_id: str) -> Optional[str]:
+        """Campaign a re-render was derived from, None for regular campaigns"""
+        row = self._connect().execute(
+            "SELECT source_campaign_id FROM campaigns WHERE campaign_id = ?", (campaign_id,)
+        ).fetchone()
+        return row["source_campaign_id"] if row else None
+
+    # Job queue
+
+    def lease_job(self, worker_id: str) -> Optional[Tuple[str, Dict, int]]:
+        """
+        Lease the oldest queued job, or one whose lease expired (its worker died)
+        Returns: (campaign_id, brief, attempt) or None when the queue is empty
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT j.campaign_id, j.attempts, c.brief FROM jobs j "
+                    "JOIN campaigns c ON c.campaign_id = j.campaign_id "
+                    "WHERE j.state = 'queued' OR (j.state = 'leased' AND j.lease_expires_at < ?) "
+                    "ORDER BY j.created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if row["attempts"] < self.max_attempts:
+                    break
+
+                # Crashed too many times - fail the campaign instead of retrying forever
+                logger.error(f"Campaign {row['campaign_id']} abandoned after {row['attempts']} attempts")
+                conn.execute(
+                    "UPDATE jobs SET state = 'failed', lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE campaign_id = ?",
+                    (now, row["campaign_id"])
+                )
+                conn.execute(
+                    "UPDATE campaigns SET status = 'failed', updated_at = ? WHERE campaign_id = ?",
+                    (now, row["campaign_id"])
+                )
+                message = f"System error: processing abandoned after {row['attempts']} attempts"
+                conn.execute(
+                    "INSERT INTO campaign_logs (campaign_id, message, created_at) VALUES (?, ?, ?)",
+                    (row["campaign_id"], message, now)
+                )
+                self._insert_events(conn, row["campaign_id"], [
+                    ("status", {"status": "failed"}),
+                    ("log", {"message": message})
+                ], now)
+
+            attempt = row["attempts"] + 1
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', attempts = ?, lease_owner = ?, lease_expires_at = ?, updated_at = ? "
+                "WHERE campaign_id = ?",
+                (attempt, worker_id, now + self.lease_seconds, now, row["campaign_id"])
+            )
+            return row["campaign_id"], json.loads(row["brief"]), attempt
+
+    def renew_lease(self, campaign_id: str, worker_id: str) -> bool:
+        """Extend a lease held by this worker, returns False if it was lost"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE campaign_id = ? AND lease_owner = ? AND state = 'leased'",
+                (now + self.lease_seconds, now, campaign_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete_job(self, campaign_id: str, worker_id: str, state: str = "done"):
+        """Finish a leased job with state 'done' or 'failed'"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE campaign_id = ? AND lease_owner = ?",
+                (state, time.time(), campaign_id, worker_id)
+            )
+
+    def get_job_state(self, campaign_id: str) -> Optional[str]:
+        """Job state ('queued', 'leased', 'done', 'failed') or None for unknown campaigns"""
+        row = self._connect().execute("SELECT state FROM jobs WHERE campaign_id = ?", (campaign_id,)).fetchone()
+        return row["state"] if row else None
+
+    def get_queue_stats(self) -> Dict:
+        """Count jobs by state"""
+        conn = self._connect()
+        stats = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        for row in conn.execute("SELECT state, COUNT(*) AS count FROM jobs GROUP BY state"):
+            stats[row["state"]] = row["count"]
+        return stats
+
+    # Batches
+
+    def get_campaign_batch_id(self, campaign_id: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT batch_id FROM campaigns WHERE campaign_id = ?", (campaign_id,)
+        ).fetchone()
+        return row["batch_id"] if row else None
+
+    def claim_batch(self, batch_id: str, worker_id: str) -> bool:
+        """
+        Take over the shared preparation of a batch: pending batches, or ones whose
+        preparing worker stopped renewing its lease. Returns True if this worker prepares it
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE batches SET state = 'preparing', lease_owner = ?, lease_expires_at = ?, updated_at = ? "
+                "WHERE batch_id = ? AND (state = 'pending' OR (state = 'preparing' AND lease_expires_at < ?))",
+                (worker_id, now + self.lease_seconds, now, batch_id, now)
+            )
+            return cursor.rowcount == 1
+
+    def renew_batch_lease(self, batch_id: str, worker_id: str) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE batches SET lease_expires_at = ?, updated_at = ? "
+                "WHERE batch_id = ? AND lease_owner = ? AND state = 'preparing'",
+                (now + self.lease_seconds, now, batch_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def finish_batch(self, batch_id: str, worker_id: str, state: str, preparation: Dict):
+        """Store the shared preparation result with state 'prepared' or 'failed'"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE batches SET state = ?, preparation = ?, lease_owner = NULL, lease_expires_at = NULL, "
+                "updated_at = ? WHERE batch_id = ? AND lease_owner = ?",
+                (state, json.dumps(preparation), time.time(), batch_id, worker_id)
+            )
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        """Batch row with its campaigns' statuses"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT batch_id, state, campaign_ids, preparation, created_at FROM batches WHERE batch_id = ?",
+            (batch_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        campaign_ids = json.loads(row["campaign_ids"])
+        statuses = {
+            r["campaign_id"]: r["status"]
+            for r in conn.execute("SELECT campaign_id, status FROM campaigns WHERE batch_id = ?", (batch_id,))
+        }
+        return {
+            "batch_id": row["batch_id"],
+            "state": row["state"],
+            "campaigns": [{"campaign_id": cid, "status": statuses.get(cid)} for cid in campaign_ids],
+            "preparation": json.loads(row["preparation"]),
+            "created_at": row["created_at"]
+        }
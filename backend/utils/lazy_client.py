@@ -0,0 +1,31 @@
+import threading
+from typing import Callable
+from loguru import logger
+
+
+class LazyClient:
+    def __init__(self, name: str, factory: Callable[[], object]):
+        """SDK client built by factory() on first use, so startup neither imports nor configures the SDK"""
+        self.name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                    logger.info(f"{self.name} client initialized")
+                client = self._client
+        return client
+
+    def set(self, client):
+        """Use an already built client (e.g. a stand-in for offline benchmarks)"""
+        with self._lock:
+            self._client = client
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
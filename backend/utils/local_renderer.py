@@ -0,0 +1,154 @@
+from PIL import Image
+from typing import Tuple
+from loguru import logger
+import numpy as np
+
+class LocalRenderer:
+    def __init__(self, max_long_side: int = 2048, analysis_size: int = 256, saliency_coverage: float = 0.95):
+        """Deterministic aspect ratio renderer: saliency-aware crop plus pad/resize, no network"""
+        self.max_long_side = max_long_side
+        self.analysis_size = analysis_size
+        # Fraction of saliency mass the crop must keep before padding is used instead
+        self.saliency_coverage = saliency_coverage
+
+    @staticmethod
+    def parse_ratio(aspect_ratio: str) -> float:
+        width, height = aspect_ratio.split(":")
+        return int(width) / int(height)
+
+    def _saliency_map(self, rgb: np.ndarray, background: np.ndarray) -> np.ndarray:
+        """Gradient magnitude plus colour distance from the background, normalized to [0, 1] each"""
+        pixels = rgb.astype(np.float32)
+        luminance = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+        gradient = np.zeros_like(luminance)
+        gradient[:, 1:] += np.abs(np.diff(luminance, axis=1))
+        gradient[1:, :] += np.abs(np.diff(luminance, axis=0))
+
+        distance = np.linalg.norm(pixels - background, axis=2)
+
+        saliency = gradient / (gradient.max() + 1e-6) + distance / (distance.max() + 1e-6)
+        return saliency
+
+    @staticmethod
+    def _background_color(rgb: np.ndarray) -> np.ndarray:
+        """Median colour of the image border, used for padding"""
+        border = np.concatenate([rgb[0, :], rgb[-1, :], rgb[:, 0], rgb[:, -1]])
+        return np.median(border, axis=0)
+
+    def _salient_bbox(self, saliency: np.ndarray) -> Tuple[int, int, int, int]:
+        """Box holding saliency_coverage of the saliency mass, from marginal quantiles"""
+        tail = (1.0 - self.saliency_coverage) / 2
+        boxes = []
+        for axis in (0, 1):
+            marginal = np.cumsum(saliency.sum(axis=axis))
+            marginal /= marginal[-1] if marginal[-1] > 0 else 1.0
+            start = int(np.searchsorted(marginal, tail))
+            end = int(np.searchsorted(marginal, 1.0 - tail)) + 1
+            boxes.append((start, min(end, len(marginal))))
+        (x0, x1), (y0, y1) = boxes
+        return x0, y0, x1, y1
+
+    def _best_window(self, saliency: np.ndarray, crop_w: int, crop_h: int,
+                     bbox: Tuple[int, int, int, int]) -> Tuple[int, int]:
+        """Top-left of the crop window with the most saliency that still contains the salient box"""
+        height, width = saliency.shape
+        integral = np.zeros((height + 1, width + 1), dtype=np.float64)
+        integral[1:, 1:] = saliency.cumsum(axis=0).cumsum(axis=1)
+
+        # Sum of every crop_w x crop_h window, indexed by its top-left corner
+        sums = (integral[crop_h:, crop_w:] - integral[:-crop_h, crop_w:]
+                - integral[crop_h:, :-crop_w] + integral[:-crop_h, :-crop_w])
+
+        # Only windows that keep the salient box are candidates
+        x0, y0, x1, y1 = bbox
+        ys = np.arange(sums.shape[0])[:, None]
+        xs = np.arange(sums.shape[1])[None, :]
+        valid = (xs <= x0) & (xs + crop_w >= x1) & (ys <= y0) & (ys + crop_h >= y1)
+        if not valid.any():
+            valid = np.ones_like(sums, dtype=bool)
+
+        # Slight preference for centred windows keeps ties deterministic and balanced
+        centre_penalty = (np.abs(xs - (width - crop_w) / 2) + np.abs(ys - (height - crop_h) / 2)) * 1e-6
+        scores = np.where(valid, sums - centre_penalty, -np.inf)
+        y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        return int(x), int(y)
+
+    def _plan_window(self, saliency: np.ndarray, ratio: float) -> Tuple[float, float, float, float]:
+        """Window (x0, y0, x1, y1) in analysis coordinates; parts outside the image are padded"""
+        height, width = saliency.shape
+        bbox = self._salient_bbox(saliency)
+        box_w, box_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+        # Largest window of the target ratio that fits in the image
+        if width / height > ratio:
+            crop_h, crop_w = height, max(1, min(width, round(height * ratio)))
+        else:
+            crop_w, crop_h = width, max(1, min(height, round(width / ratio)))
+
+        if box_w <= crop_w and box_h <= crop_h:
+            x, y = self._best_window(saliency, crop_w, crop_h, bbox)
+            return x, y, x + crop_w, y + crop_h
+
+        # Salient content does not fit a crop - keep it whole and pad to the ratio
+        if width / height > ratio:
+            win_w = max(box_w, crop_w)
+            win_h = win_w / ratio
+        else:
+            win_h = max(box_h, crop_h)
+            win_w = win_h * ratio
+
+        centre_x = (bbox[0] + bbox[2]) / 2
+        centre_y = (bbox[1] + bbox[3]) / 2
+        x0 = self._clamp_window(centre_x - win_w / 2, win_w, width)
+        y0 = self._clamp_window(centre_y - win_h / 2, win_h, height)
+        return x0, y0, x0 + win_w, y0 + win_h
+
+    @staticmethod
+    def _clamp_window(start: float, size: float, limit: int) -> float:
+        """Keep a window inside the image, or centre it when it is larger than the image"""
+        if size >= limit:
+            return (limit - size) / 2
+        return min(max(start, 0.0), limit - size)
+
+    def output_size(self, source_size: Tuple[int, int], aspect_ratio: str) -> Tuple[int, int]:
+        """Output dimensions for a ratio, keeping the source long side up to max_long_side"""
+        ratio = self.parse_ratio(aspect_ratio)
+        long_side = min(max(source_size), self.max_long_side)
+        if ratio >= 1:
+            return long_side, max(1, round(long_side / ratio))
+        return max(1, round(long_side * ratio)), long_side
+
+    def render(self, image: Image.Image, aspect_ratio: str) -> Image.Image:
+        """Render the image at the given aspect ratio (e.g. "9:16") without any remote call"""
+        source = image if image.mode == 'RGB' else image.convert('RGB')
+        width, height = source.size
+        ratio = self.parse_ratio(aspect_ratio)
+
+        # Analyse a small copy; windows are scaled back to source coordinates
+        scale = min(1.0, self.analysis_size / max(width, height))
+        analysis = source.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR)
+        rgb = np.asarray(analysis)
+        background = self._background_color(rgb)
+        saliency = self._saliency_map(rgb, background)
+
+        scale_x = width / analysis.width
+        scale_y = height / analysis.height
+        x0, y0, x1, y1 = self._plan_window(saliency, ratio)
+        window = (round(x0 * scale_x), round(y0 * scale_y), round(x1 * scale_x), round(y1 * scale_y))
+
+        output_size = self.output_size(source.size, aspect_ratio)
+        window_w, window_h = window[2] - window[0], window[3] - window[1]
+
+        if window[0] >= 0 and window[1] >= 0 and window[2] <= width and window[3] <= height:
+            rendered = source.resize(output_size, Image.LANCZOS, box=window)
+        else:
+            # Pad with the border colour, then resize the padded canvas
+            fill = tuple(int(c) for c in background)
+            canvas = Image.new('RGB', (window_w, window_h), fill)
+            visible = (max(window[0], 0), max(window[1], 0), min(window[2], width), min(window[3], height))
+            canvas.paste(source.crop(visible), (visible[0] - window[0], visible[1] - window[1]))
+            rendered = canvas.resize(output_size, Image.LANCZOS)
+
+        logger.debug(f"Local render {aspect_ratio}: window {window} -> {output_size}")
+        return rendered
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from PIL import Image
+from loguru import logger
+
+MANIFEST_FILENAME = "manifest.json"
+
+RENDITION_MEDIA_TYPES = {".jpg": "image/jpeg", ".webp": "image/webp", ".avif": "image/avif"}
+
+class ManifestManager:
+    def __init__(self, output_dir: str = "output"):
+        """Per-campaign manifest of finished creatives, served from an in-process cache"""
+        self.output_dir = Path(output_dir)
+        # campaign_id -> (manifest mtime_ns, manifest, etag)
+        self._cache: Dict[str, Tuple[int, Dict, str]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, campaign_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(campaign_id, threading.Lock())
+
+    def _manifest_path(self, campaign_id: str) -> Path:
+        return self.output_dir / campaign_id / MANIFEST_FILENAME
+
+    @staticmethod
+    def _etag(payload: bytes) -> str:
+        return f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+
+    @staticmethod
+    def _describe_rendition(rendition_file: Path) -> Dict:
+        """Manifest entry for one derivative rendition, localized version or the un-overlaid variant of a creative"""
+        with Image.open(rendition_file) as image:
+            width, height = image.size
+        
+        return {
+            "filename": rendition_file.name,
+            "path": str(rendition_file),
+            "size": rendition_file.stat().st_size,
+            "width": width,
+            "height": height,
+            "media_type": RENDITION_MEDIA_TYPES.get(rendition_file.suffix, "application/octet-stream")
+        }
+
+    @staticmethod
+    def _describe_image(image_file: Path, aspect_ratio: str) -> Dict:
+        """Manifest entry for one creative file"""
+        sha = hashlib.sha256()
+        with open(image_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+
+        # Only the header is read to get dimensions
+        with Image.open(image_file) as image:
+            width, height = image.size
+
+        return {
+            "filename": image_file.name,
+            "path": str(image_file),
+            "size": image_file.stat().st_size,
+            "aspect_ratio": aspect_ratio,
+            "width": width,
+            "height": height,
+            "content_hash": sha.hexdigest()
+        }
+
+    def _write(self, campaign_id: str, manifest: Dict):
+        """Atomically write the manifest and refresh the cache (caller holds the campaign lock)"""
+        manifest["total_images"] = sum(len(images) for images in manifest["images"].values())
+        manifest["updated_at"] = datetime.now().isoformat()
+        payload = json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8")
+
+        manifest_path = self._manifest_path(campaign_id)
+        temp_path = manifest_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(payload)
+        os.replace(temp_path, manifest_path)
+
+        self._cache[campaign_id] = (manifest_path.stat().st_mtime_ns, manifest, self._etag(payload))
+
+    def _read(self, campaign_id: str) -> Optional[Tuple[Dict, str]]:
+        """Load manifest from disk, or None if the campaign has none yet"""
+        manifest_path = self._manifest_path(campaign_id)
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+            payload = manifest_path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        manifest = json.loads(payload)
+        etag = self._etag(payload)
+        self._cache[campaign_id] = (mtime, manifest, etag)
+        return manifest, etag
+
+    def record_creative(self, output_path: Path, aspect_ratio: str, renditions: Optional[Dict[str, str]] = None,
+                        variant_path: Optional[str] = None, locales: Optional[Dict[str, str]] = None):
+        """
+        Add or replace a finished creative (output/<campaign>/<product>/<file>) in its campaign manifest,
+        with its renditions, localized versions and the un-overlaid variant it was rendered from
+        """
+        output_path = Path(output_path)
+        product_dir_name = output_path.parent.name
+        campaign_id = output_path.parent.parent.name
+
+        try:
+            entry = self._describe_image(output_path, aspect_ratio)
+            entry["renditions"] = {
+                name: self._describe_rendition(Path(path)) for name, path in (renditions or {}).items()
+            }
+            if variant_path:
+                entry["variant"] = self._describe_rendition(Path(variant_path))
+            if locales:
+                entry["locales"] = {locale: self._describe_rendition(Path(path)) for locale, path in locales.items()}
+            with self._lock_for(campaign_id):
+                loaded = self._read(campaign_id)
+                manifest = loaded[0] if loaded else {"campaign_id": campaign_id, "images": {}}
+
+                images = [i for i in manifest["images"].get(product_dir_name, []) if i["filename"] != entry["filename"]]
+                images.append(entry)
+                manifest["images"][product_dir_name] = sorted(images, key=lambda i: i["filename"])
+                self._write(campaign_id, manifest)
+        except Exception as e:
+            logger.error(f"Failed to update manifest for {output_path}: {str(e)}")
+
+    def _build_from_directory(self, campaign_id: str) -> Optional[Tuple[Dict, str]]:
+        """Build a manifest for campaigns rendered before manifests existed"""
+        campaign_dir = self.output_dir / campaign_id
+        if not campaign_dir.is_dir():
+            return None
+
+        manifest = {"campaign_id": campaign_id, "images": {}}
+        for product_dir in sorted(campaign_dir.iterdir()):
+            if product_dir.is_dir():
+                manifest["images"][product_dir.name] = [
+                    self._describe_image(image_file, image_file.stem.split('_')[-1].replace('x', ':'))
+                    for image_file in sorted(product_dir.glob("*.jpg"))
+                ]
+
+        logger.info(f"Built manifest from output directory for campaign {campaign_id}")
+        self._write(campaign_id, manifest)
+        return self._cache[campaign_id][1], self._cache[campaign_id][2]
+
+    def get_manifest(self, campaign_id: str) -> Optional[Tuple[Dict, str]]:
+        """
+        Get campaign manifest and its ETag, from cache unless the file changed on disk
+        Returns: (manifest, etag) or None when the campaign has no output
+        """
+        if campaign_id in ("", ".", "..") or "/" in campaign_id or "\\" in campaign_id:
+            return None
+        
+        cached = self._cache.get(campaign_id)
+        if cached:
+            try:
+                if self._manifest_path(campaign_id).stat().st_mtime_ns == cached[0]:
+                    return cached[1], cached[2]
+            except FileNotFoundError:
+                pass
+
+        with self._lock_for(campaign_id):
+            loaded = self._read(campaign_id)
+            if loaded is None:
+                loaded = self._build_from_directory(campaign_id)
+            return loaded
+
+    def get_rendition(self, campaign_id: str, product_dir_name: str, filename: str) -> Optional[Dict]:
+        """Find a rendition listed in the campaign manifest, or None if it is not one of its files"""
+        loaded = self.get_manifest(campaign_id)
+        if loaded is None:
+            return None
+
+        for image in loaded[0]["images"].get(product_dir_name, []):
+            for rendition in image.get("renditions", {}).values():
+                if rendition["filename"] == filename:
+                    return rendition
+        return None
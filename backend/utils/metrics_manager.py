@@ -1,26 +1,107 @@
 import json
+import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 from loguru import logger
 
 class MetricsManager:
     def __init__(self, metrics_dir: str = "metrics"):
         self.metrics_dir = Path(metrics_dir)
+        self.db_path = self.metrics_dir / "metrics.sqlite3"
+        self._local = threading.local()
         self._setup_directory()
+        self._setup_index()
     
     def _setup_directory(self):
         """Create metrics directory if it doesn't exist"""
         self.metrics_dir.mkdir(exist_ok=True)
         logger.info(f"Metrics directory setup: {self.metrics_dir}")
     
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, opened lazily"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    
+    def _setup_index(self):
+        """Create the metrics index and backfill it from existing JSON files"""
+        conn = self._connect()
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS campaign_metrics (
+                    campaign_id TEXT PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    final_status TEXT NOT NULL,
+                    total_products INTEGER NOT NULL,
+                    products_with_existing_assets INTEGER NOT NULL,
+                    products_with_generated_assets INTEGER NOT NULL,
+                    total_creatives_generated INTEGER NOT NULL,
+                    record TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_campaign_metrics_timestamp ON campaign_metrics (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_campaign_metrics_status ON campaign_metrics (final_status, timestamp);
+                CREATE TABLE IF NOT EXISTS campaign_metric_products (
+                    campaign_id TEXT NOT NULL,
+                    product_name TEXT NOT NULL,
+                    PRIMARY KEY (product_name, campaign_id)
+                );
+            """)
+        
+        indexed = {row["campaign_id"] for row in conn.execute("SELECT campaign_id FROM campaign_metrics")}
+        backfilled = 0
+        for metrics_file in self.metrics_dir.glob("*_metrics.json"):
+            if metrics_file.name[:-len("_metrics.json")] in indexed:
+                continue
+            try:
+                with open(metrics_file, 'r', encoding='utf-8') as f:
+                    self._index_metrics(json.load(f))
+                backfilled += 1
+            except Exception as e:
+                logger.error(f"Failed to index metrics from {metrics_file}: {str(e)}")
+        
+        logger.info(f"Metrics index setup: {self.db_path} ({len(indexed) + backfilled} campaigns, {backfilled} backfilled)")
+    
+    def _index_metrics(self, metrics: Dict):
+        """Insert or replace one campaign's metrics in the index"""
+        summary = metrics.get("summary", {})
+        products = [p["name"] for p in metrics.get("campaign_brief", {}).get("products", [])]
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO campaign_metrics (campaign_id, timestamp, final_status, total_products, "
+                "products_with_existing_assets, products_with_generated_assets, total_creatives_generated, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    metrics["campaign_id"],
+                    metrics.get("timestamp", ""),
+                    metrics.get("final_status", ""),
+                    summary.get("total_products", len(products)),
+                    summary.get("products_with_existing_assets", 0),
+                    summary.get("products_with_generated_assets", 0),
+                    summary.get("total_creatives_generated", 0),
+                    json.dumps(metrics, ensure_ascii=False)
+                )
+            )
+            conn.execute("DELETE FROM campaign_metric_products WHERE campaign_id = ?", (metrics["campaign_id"],))
+            conn.executemany(
+                "INSERT OR IGNORE INTO campaign_metric_products (campaign_id, product_name) VALUES (?, ?)",
+                [(metrics["campaign_id"], name.lower()) for name in products]
+            )
+    
     def save_campaign_metrics(self,
                             campaign_id: str,
                             campaign_brief: Dict,
                             final_status: str,
                             product_metrics: Dict,
-                            reason: str = "") -> bool:
-        """Save campaign metrics to JSON file"""
+                            reason: str = "",
+                            stage_timings: Optional[Dict] = None) -> bool:
+        """Save campaign metrics to JSON file, with per-stage timing summaries when given"""
         try:
             metrics = {
                 "campaign_id": campaign_id,
@@ -34,6 +115,7 @@ class MetricsManager:
                 "final_status": final_status,
                 "reason": reason,
                 "product_metrics": product_metrics,
+                "stage_timings": stage_timings or {},
                 "summary": {
                     "total_products": len(campaign_brief["products"]),
                     "products_with_existing_assets": sum(1 for p in product_metrics.values() if p["asset_status"] == "reused"),
@@ -47,6 +129,8 @@ class MetricsManager:
             with open(metrics_file, 'w', encoding='utf-8') as f:
                 json.dump(metrics, f, indent=2, ensure_ascii=False)
             
+            self._index_metrics(metrics)
+            
             logger.info(f"Campaign metrics saved: {metrics_file}")
             return True
             
@@ -68,18 +152,98 @@ class MetricsManager:
             logger.error(f"Failed to load metrics for campaign {campaign_id}: {str(e)}")
             return None
     
-    def list_all_metrics(self) -> List[Dict]:
-        """Get metrics for all campaigns"""
-        all_metrics = []
+    def _filter_clause(self,
+                       status: Optional[str] = None,
+                       since: Optional[str] = None,
+                       until: Optional[str] = None,
+                       product: Optional[str] = None):
+        """Build WHERE clause and parameters for metrics queries"""
+        clauses = []
+        params = []
+        if status:
+            clauses.append("final_status = ?")
+            params.append(status)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if product:
+            clauses.append("campaign_id IN (SELECT campaign_id FROM campaign_metric_products WHERE product_name = ?)")
+            params.append(product.lower())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+    
+    def query_metrics(self,
+                      status: Optional[str] = None,
+                      since: Optional[str] = None,
+                      until: Optional[str] = None,
+                      product: Optional[str] = None,
+                      limit: int = 50,
+                      offset: int = 0) -> Dict:
+        """Get a page of campaign metrics (newest first) with the total matching count"""
+        where, params = self._filter_clause(status, since, until, product)
+        conn = self._connect()
         
-        for metrics_file in self.metrics_dir.glob("*_metrics.json"):
-            try:
-                with open(metrics_file, 'r', encoding='utf-8') as f:
-                    metrics = json.load(f)
-                    all_metrics.append(metrics)
-            except Exception as e:
-                logger.error(f"Failed to load metrics from {metrics_file}: {str(e)}")
+        total = conn.execute(f"SELECT COUNT(*) FROM campaign_metrics {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT record FROM campaign_metrics {where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        )
+        
+        return {
+            "items": [json.loads(row["record"]) for row in rows],
+            "total": total,
+            "limit": limit,
+            "offset": offset
+        }
+    
+    def get_aggregates(self,
+                       since: Optional[str] = None,
+                       until: Optional[str] = None,
+                       product: Optional[str] = None) -> Dict:
+        """Compute success rate, asset reuse counts and creatives per day in SQL"""
+        where, params = self._filter_clause(None, since, until, product)
+        conn = self._connect()
         
-        # Sort by timestamp (newest first)
-        all_metrics.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return all_metrics
\ No newline at end of file
+        totals = conn.execute(
+            "SELECT COUNT(*) AS campaigns, "
+            "COALESCE(SUM(final_status = 'completed'), 0) AS completed, "
+            "COALESCE(SUM(products_with_existing_assets), 0) AS reused, "
+            "COALESCE(SUM(products_with_generated_assets), 0) AS generated, "
+            "COALESCE(SUM(total_creatives_generated), 0) AS creatives "
+            f"FROM campaign_metrics {where}",
+            params
+        ).fetchone()
+        
+        status_counts = {
+            row["final_status"]: row["count"]
+            for row in conn.execute(
+                f"SELECT final_status, COUNT(*) AS count FROM campaign_metrics {where} GROUP BY final_status", params
+            )
+        }
+        
+        creatives_per_day = [
+            {"date": row["day"], "campaigns": row["campaigns"], "creatives": row["creatives"]}
+            for row in conn.execute(
+                "SELECT substr(timestamp, 1, 10) AS day, COUNT(*) AS campaigns, "
+                "SUM(total_creatives_generated) AS creatives "
+                f"FROM campaign_metrics {where} GROUP BY day ORDER BY day",
+                params
+            )
+        ]
+        
+        return {
+            "total_campaigns": totals["campaigns"],
+            "status_counts": status_counts,
+            "success_rate": totals["completed"] / totals["campaigns"] if totals["campaigns"] else 0.0,
+            "products_with_existing_assets": totals["reused"],
+            "products_with_generated_assets": totals["generated"],
+            "total_creatives_generated": totals["creatives"],
+            "creatives_per_day": creatives_per_day
+        }
+    
+    def list_all_metrics(self) -> List[Dict]:
+        """Get metrics for all campaigns (newest first)"""
+        return self.query_metrics(limit=-1)["items"]
@@ -0,0 +1,166 @@
+import json
+import re
+from typing import Dict, List, Tuple
+from loguru import logger
+from .lazy_client import LazyClient
+from .provider_scheduler import ProviderScheduler
+from .telemetry import telemetry
+
+
+class GroqModeration:
+    name = "groq"
+    # Bump whenever the moderation prompts change so cached verdicts are not reused
+    PROMPT_VERSION = "v1"
+    # Items per batch request and the output budget of one request, kept well inside the model's limits
+    BATCH_MAX_ITEMS = 15
+    BATCH_TOKENS_PER_ITEM = 300
+    BATCH_MAX_TOKENS = 4096
+
+    def __init__(self, api_key: str = None, model: str = "llama-3.1-8b-instant", scheduler: ProviderScheduler = None):
+        """LLM moderation with Groq; the client is built on first use and retries are left to the scheduler"""
+        self.api_key = api_key
+        self.model = model
+        self.version = f"{self.PROMPT_VERSION}:{model}"
+        self.scheduler = scheduler or ProviderScheduler("groq")
+        self.client = LazyClient("Groq", self._create_client)
+
+        self.moderation_prompt = """You are a content moderation AI for advertising campaigns. Analyze the following content and determine if it violates any policies.
+
+        Check for:
+        1. Discriminatory content (age, gender, race, religion, sexual orientation, disability discrimination)
+        2. Illegal content (violence, drugs, hate speech, adult content, scams)
+        3. False or misleading claims (medical claims, guaranteed results, miracle cures)
+        4. Excessive promotional language that could be considered misleading
+
+        Content to analyze: "{content}"
+
+        Respond with a JSON object in this exact format:
+        {{
+            "is_compliant": true/false,
+            "violations": ["list of specific violations found"],
+            "reason": "brief explanation of why content was flagged or approved"
+        }}
+
+        Be strict but fair. Only flag content that clearly violates policies."""
+
+        self.batch_moderation_prompt = """You are a content moderation AI for advertising campaigns. Analyze each of the following content items independently and determine if it violates any policies.
+
+        Check for:
+        1. Discriminatory content (age, gender, race, religion, sexual orientation, disability discrimination)
+        2. Illegal content (violence, drugs, hate speech, adult content, scams)
+        3. False or misleading claims (medical claims, guaranteed results, miracle cures)
+        4. Excessive promotional language that could be considered misleading
+
+        Content items to analyze (JSON object of id -> content):
+        {items}
+
+        Respond with a JSON object in this exact format, with one entry for every id:
+        {{
+            "results": {{
+                "<id>": {{
+                    "is_compliant": true/false,
+                    "violations": ["list of specific violations found"],
+                    "reason": "brief explanation of why content was flagged or approved"
+                }}
+            }}
+        }}
+
+        Be strict but fair. Only flag content that clearly violates policies."""
+
+    def _create_client(self):
+        from groq import Groq
+        return Groq(api_key=self.api_key, max_retries=0)
+
+    def _complete(self, prompt: str, max_tokens: int) -> str:
+        from groq import APIConnectionError
+
+        def create():
+            # Connection errors become ConnectionError, which the scheduler retries
+            try:
+                return self.client.get().chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    temperature=0.1,  # Low temperature for consistent results
+                    max_tokens=max_tokens
+                )
+            except APIConnectionError as e:
+                raise ConnectionError(str(e)) from e
+
+        response = self.scheduler.call(create)
+        return response.choices[0].message.content.strip()
+
+    def analyze(self, content: str) -> Dict:
+        """Verdict for one item: {"is_compliant", "violations", "reason"}"""
+        with telemetry.span("groq_moderation"):
+            ai_response = self._complete(self.moderation_prompt.format(content=content), 500)
+        logger.debug(f"AI moderation response: {ai_response}")
+        return json.loads(ai_response)
+
+    def analyze_batch(self, items: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Verdicts for several items, BATCH_MAX_ITEMS per request; items missing from an answer, or in a
+        chunk whose request failed, are left out
+        """
+        item_list = list(items.items())
+        results = {}
+        for start in range(0, len(item_list), self.BATCH_MAX_ITEMS):
+            chunk = dict(item_list[start:start + self.BATCH_MAX_ITEMS])
+            try:
+                results.update(self._analyze_chunk(chunk))
+            except Exception as e:
+                logger.warning(f"Batch moderation of {len(chunk)} items failed, leaving them out: {str(e)}")
+        return results
+
+    def _analyze_chunk(self, items: Dict[str, str]) -> Dict[str, Dict]:
+        prompt = self.batch_moderation_prompt.format(items=json.dumps(items, ensure_ascii=False, indent=2))
+        max_tokens = min(self.BATCH_TOKENS_PER_ITEM * len(items), self.BATCH_MAX_TOKENS)
+        with telemetry.span("groq_moderation_batch"):
+            ai_response = self._complete(prompt, max_tokens)
+        logger.debug(f"AI batch moderation response: {ai_response}")
+
+        try:
+            results = json.loads(ai_response).get("results", {})
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning(f"Unparseable batch moderation response: {str(e)}")
+            return {}
+        return results if isinstance(results, dict) else {}
+
+
+class RuleBasedModeration:
+    name = "rules"
+    version = "v1"
+
+    # (violation, pattern) - matched case-insensitively against the whole text
+    RULES: List[Tuple[str, str]] = [
+        ("Discriminatory targeting", r"\b(only|no|not for|except)\s+(for\s+)?(men|women|girls|boys|whites?|blacks?|"
+                                     r"asians?|christians?|muslims?|jews?|gays?|old|elderly|young|disabled)\b"),
+        ("Hate speech", r"\b(inferior|subhuman|vermin)\b"),
+        ("Illegal drugs", r"\b(cocaine|heroin|meth|mdma|ecstasy)\b"),
+        ("Violence or weapons", r"\b(kill|shoot|bomb|firearms?|weapons?)\b"),
+        ("Adult content", r"\b(porn|xxx|nude|escort)\b"),
+        ("Scam or get-rich-quick claim", r"\b(get rich quick|double your money|free money|wire transfer)\b"),
+        ("Misleading medical claim", r"\b(cures?|heals?|treats?)\s+(cancer|diabetes|covid|disease|arthritis|anxiety)\b"),
+        ("Miracle or guaranteed results", r"\b(miracle|guaranteed|100%\s*(effective|guaranteed|results)|risk[- ]free)\b"),
+        ("Unrealistic weight loss claim", r"\blose\s+\d+\s*(kg|kilos|lbs|pounds)\b"),
+        ("Excessive promotional language", r"!{3,}|\b(best ever|number one in the world|act now)\b"),
+    ]
+
+    def __init__(self):
+        """Offline keyword and pattern moderation: instant and deterministic, for capacity tests and provider outages"""
+        self.scheduler = None
+        self._rules = [(violation, re.compile(pattern, re.IGNORECASE)) for violation, pattern in self.RULES]
+
+    def analyze(self, content: str) -> Dict:
+        violations = [violation for violation, pattern in self._rules if pattern.search(content or "")]
+        if violations:
+            return {"is_compliant": False, "violations": violations,
+                    "reason": f"Matched content rules: {', '.join(violations)}"}
+        return {"is_compliant": True, "violations": [], "reason": "No content rule matched"}
+
+    def analyze_batch(self, items: Dict[str, str]) -> Dict[str, Dict]:
+        return {item_id: self.analyze(content) for item_id, content in items.items()}
@@ -0,0 +1,44 @@
+from typing import Callable, Dict, List
+from loguru import logger
+from .image_backends import ReplicateTextToImage, ReplicateImg2Img, ProceduralTextToImage, ProceduralImg2Img
+from .moderation_backends import GroqModeration, RuleBasedModeration
+
+# Backend kinds and the interface each backend provides:
+# - text_to_image: generate(prompt, aspect_ratio) -> image URL or encoded bytes
+# - img2img: generate(image_path, prompt) -> image URL or encoded bytes
+# - moderation: analyze(content) -> verdict dict, analyze_batch({id: content}) -> {id: verdict dict}
+# Every backend has a name, a model/version used in cache keys and a scheduler (None for local backends)
+PROVIDER_KINDS = ("text_to_image", "img2img", "moderation")
+
+
+class ProviderRegistry:
+    def __init__(self):
+        """Backend factories by kind and name, so deployments pick backends by configuration"""
+        self._factories: Dict[str, Dict[str, Callable]] = {kind: {} for kind in PROVIDER_KINDS}
+
+    def register(self, kind: str, name: str, factory: Callable):
+        """factory(**options) builds the backend; it must not contact the provider"""
+        if kind not in self._factories:
+            raise ValueError(f"Unknown provider kind '{kind}'. Expected one of: {', '.join(PROVIDER_KINDS)}")
+        self._factories[kind][name] = factory
+
+    def create(self, kind: str, name: str, **options):
+        if kind not in self._factories:
+            raise ValueError(f"Unknown provider kind '{kind}'. Expected one of: {', '.join(PROVIDER_KINDS)}")
+        factory = self._factories[kind].get(name)
+        if factory is None:
+            raise ValueError(f"Unknown {kind} backend '{name}'. Available: {', '.join(self.names(kind))}")
+        logger.info(f"Using {name} {kind} backend")
+        return factory(**options)
+
+    def names(self, kind: str) -> List[str]:
+        return sorted(self._factories.get(kind, {}))
+
+
+provider_registry = ProviderRegistry()
+provider_registry.register("text_to_image", "replicate", ReplicateTextToImage)
+provider_registry.register("text_to_image", "procedural", ProceduralTextToImage)
+provider_registry.register("img2img", "replicate", ReplicateImg2Img)
+provider_registry.register("img2img", "procedural", ProceduralImg2Img)
+provider_registry.register("moderation", "groq", GroqModeration)
+provider_registry.register("moderation", "rules", RuleBasedModeration)
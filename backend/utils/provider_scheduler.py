@@ -0,0 +1,259 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Type
+from loguru import logger
+from .telemetry import telemetry
+
+# HTTP statuses worth retrying besides 429: timeouts, conflicts and server errors
+RETRYABLE_STATUSES = (408, 409, 500, 502, 503, 504)
+
+
+class ProviderUnavailableError(Exception):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        """Request rate limit; a rate of 0 disables it"""
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token, returns the seconds to wait before using it (callers queue in reservation order)"""
+        if self.rate_per_second <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate_per_second
+
+    def available(self) -> float:
+        if self.rate_per_second <= 0:
+            return float(self.burst)
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, self._tokens)
+
+
+class ProviderScheduler:
+    def __init__(self,
+                 name: str,
+                 rate_per_second: float = 0.0,
+                 burst: int = 1,
+                 min_concurrency: int = 1,
+                 max_concurrency: int = 8,
+                 initial_concurrency: int = None,
+                 latency_target_seconds: float = None,
+                 decrease_factor: float = 0.5,
+                 max_retries: int = 3,
+                 base_backoff_seconds: float = 1.0,
+                 max_backoff_seconds: float = 30.0,
+                 failure_threshold: int = 5,
+                 reset_timeout_seconds: float = 30.0,
+                 retry_on: Tuple[Type[BaseException], ...] = ()):
+        """
+        Throttles, retries and circuit-breaks calls to one remote provider:
+        - token bucket for the provider's request rate quota
+        - AIMD concurrency limit: +1 per limit's worth of successes, multiplied by decrease_factor
+          on a 429 or a call slower than latency_target_seconds
+        - exponential backoff with full jitter (honouring Retry-After) for 429s, retryable statuses
+          and the transport errors in retry_on
+        - circuit breaker that fails fast after failure_threshold consecutive failures,
+          then lets a single probe through after reset_timeout_seconds
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.latency_target_seconds = latency_target_seconds
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.retry_on = tuple(retry_on)
+
+        self._limit = float(min(self.max_concurrency, max(self.min_concurrency,
+                                                          initial_concurrency or self.max_concurrency)))
+        self._in_flight = 0
+        self._queued = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._random = random.Random()
+
+        # Circuit breaker: "closed", "open" or "half_open" (one probe call in flight)
+        self._circuit = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) under the provider's limits, retrying transient failures"""
+        attempt = 0
+        while True:
+            probe = self._acquire()
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                kind = self.classify_error(e) if isinstance(e, Exception) else "fatal"
+                self._release(start, kind, probe)
+                if kind == "fatal" or attempt >= self.max_retries:
+                    raise
+
+                delay = self._backoff(attempt, self._retry_after(e))
+                attempt += 1
+                with self._condition:
+                    self.retries += 1
+                telemetry.increment("pipeline_provider_retries_total", {"provider": self.name, "reason": kind},
+                                    help_text="Provider calls retried after a transient failure")
+                logger.warning(f"{self.name} call failed ({kind}: {str(e)}), "
+                               f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self._release(start, None, probe)
+            return result
+
+    def classify_error(self, error: Exception) -> str:
+        """'rate_limited', 'retryable' or 'fatal'"""
+        status = self._status_code(error)
+        if status == 429:
+            return "rate_limited"
+        if status is not None:
+            return "retryable" if status in RETRYABLE_STATUSES else "fatal"
+        if isinstance(error, (TimeoutError, ConnectionError) + self.retry_on):
+            return "retryable"
+        return "fatal"
+
+    @staticmethod
+    def _status_code(error: Exception) -> Optional[int]:
+        # Groq errors carry status_code, Replicate errors status, requests errors a response
+        for status in (getattr(error, "status_code", None), getattr(error, "status", None),
+                       getattr(getattr(error, "response", None), "status_code", None)):
+            if isinstance(status, int):
+                return status
+        return None
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        try:
+            return float(headers.get("retry-after")) if headers else None
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = self._random.uniform(0, min(self.max_backoff_seconds, self.base_backoff_seconds * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff_seconds))
+        return delay
+
+    def _acquire(self) -> bool:
+        """Wait for a concurrency slot and a rate token, returns True for a half-open probe call"""
+        with self._condition:
+            probe = self._check_circuit()
+            self._queued += 1
+            try:
+                while self._in_flight >= int(self._limit):
+                    self._condition.wait()
+                self._in_flight += 1
+            except BaseException:
+                self._queued -= 1
+                raise
+
+        try:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+        finally:
+            with self._condition:
+                self._queued -= 1
+        return probe
+
+    def _check_circuit(self) -> bool:
+        """Raise while the circuit is open, returns True if this call is the half-open probe"""
+        if self._circuit == "closed":
+            return False
+        if self._circuit == "open" and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+            self._circuit = "half_open"
+            logger.info(f"{self.name} circuit half-open, sending a probe call")
+            return True
+
+        self.rejected += 1
+        telemetry.increment("pipeline_provider_rejected_total", {"provider": self.name},
+                            help_text="Provider calls rejected by an open circuit breaker")
+        raise ProviderUnavailableError(f"{self.name} circuit breaker is open after repeated failures")
+
+    def _release(self, start: float, error_kind: Optional[str], probe: bool):
+        """Free the slot and adapt the concurrency limit and circuit state to the call's outcome"""
+        now = time.monotonic()
+        with self._condition:
+            self._in_flight -= 1
+            self.calls += 1
+
+            if error_kind is None:
+                self._consecutive_failures = 0
+                if self.latency_target_seconds and now - start > self.latency_target_seconds:
+                    self._decrease(start, now)
+                else:
+                    self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            elif error_kind == "rate_limited":
+                self.rate_limited += 1
+                self._decrease(start, now)
+            elif error_kind == "retryable":
+                self.failures += 1
+                self._consecutive_failures += 1
+                if probe or self._consecutive_failures >= self.failure_threshold:
+                    if self._circuit != "open":
+                        logger.error(f"{self.name} circuit opened after {self._consecutive_failures} failures")
+                    self._circuit = "open"
+                    self._opened_at = now
+
+            # Anything but a transient failure proves the provider is reachable again
+            if probe and self._circuit == "half_open":
+                self._circuit = "closed"
+                logger.info(f"{self.name} circuit closed")
+
+            self._condition.notify_all()
+
+    def _decrease(self, start: float, now: float):
+        # Calls that started before the last decrease saw the old limit; one cut per congestion signal
+        if start < self._last_decrease:
+            return
+        self._limit = max(self.min_concurrency, self._limit * self.decrease_factor)
+        self._last_decrease = now
+
+    def get_stats(self) -> Dict:
+        """Current limits, queue length and call counters"""
+        with self._condition:
+            return {
+                "provider": self.name,
+                "concurrency_limit": int(self._limit),
+                "min_concurrency": self.min_concurrency,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "rate_per_second": self.bucket.rate_per_second,
+                "tokens_available": round(self.bucket.available(), 2),
+                "circuit": self._circuit,
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures,
+                "rejected": self.rejected
+            }
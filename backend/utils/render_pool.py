@@ -0,0 +1,52 @@
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+from loguru import logger
+
+class RenderPool:
+    def __init__(self, max_workers: Optional[int] = None):
+        """Process pool for CPU-bound decode, overlay and encode work (0 workers renders inline)"""
+        self.max_workers = os.cpu_count() or 1 if max_workers is None else max_workers
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """
+        Start the pool on first use; spawn avoids forking a process full of threads. Spawned processes re-run
+        the main script, so entry points (app.py, worker.py) must not build the app outside their __main__ guard
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Render process pool started with {self.max_workers} processes")
+            return self._executor
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Run fn in a render process and wait for its result; arguments must be picklable"""
+        if self.max_workers == 0:
+            return fn(*args, **kwargs)
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args, **kwargs).result()
+        except BrokenProcessPool:
+            # A render process died (e.g. OOM) - replace the pool for the next job
+            logger.error("Render process pool broke, restarting it")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+
+    def shutdown(self):
+        """Stop render processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
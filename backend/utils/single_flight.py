@@ -0,0 +1,59 @@
+import threading
+from typing import Callable, Dict, Hashable, Tuple
+from loguru import logger
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """Coalesces concurrent calls with the same key into one execution"""
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[object, bool]:
+        """
+        Run fn(*args, **kwargs), or wait for the call already in flight for key
+        Returns: (result, shared) - shared is True when another caller's result was reused.
+        Exceptions raised by fn are re-raised in every waiting caller
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.executions += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            logger.info(f"Waiting for in-flight {self.name} of {key}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Later callers start a new flight; they find the published result on disk instead
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "executions": self.executions, "coalesced": self.coalesced}
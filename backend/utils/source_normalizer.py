@@ -0,0 +1,83 @@
+import os
+import threading
+from pathlib import Path
+from typing import Tuple
+from PIL import Image
+from loguru import logger
+from .telemetry import telemetry
+
+# Working copies live next to the original asset; the dot directory is skipped by asset discovery
+WORKING_DIRNAME = ".working"
+
+
+class SourceTooLargeError(ValueError):
+    """Source image has more pixels than the configured limit"""
+
+
+class SourceNormalizer:
+    def __init__(self, max_working_side: int = 2048, max_source_pixels: int = 60_000_000, quality: int = 95):
+        """
+        Bounded-resolution RGB JPEG working copies of source assets, so large uploads are decoded
+        once at reduced scale instead of at full size by every creative
+        """
+        self.max_working_side = max_working_side
+        self.max_source_pixels = max_source_pixels
+        self.quality = quality
+
+    def check_dimensions(self, image_path: Path) -> Tuple[int, int]:
+        """Read only the header, raises SourceTooLargeError over the pixel limit"""
+        try:
+            with Image.open(image_path) as image:
+                width, height = image.size
+        except Image.DecompressionBombError as e:
+            # Pillow refuses to open images far beyond its own limit, which is above ours
+            raise SourceTooLargeError(f"Image is over {2 * Image.MAX_IMAGE_PIXELS / 1e6:.1f} MP, "
+                                      f"the limit is {self.max_source_pixels / 1e6:.1f} MP") from e
+        if width * height > self.max_source_pixels:
+            raise SourceTooLargeError(
+                f"Image is {width}x{height} ({width * height / 1e6:.1f} MP), "
+                f"the limit is {self.max_source_pixels / 1e6:.1f} MP"
+            )
+        return width, height
+
+    def working_path(self, source_path: Path) -> Path:
+        source_path = Path(source_path)
+        return source_path.parent / WORKING_DIRNAME / f"{source_path.name}.{self.max_working_side}.jpg"
+
+    def normalize(self, source_path: str) -> str:
+        """
+        Path of the working copy of source_path, created (or refreshed after the source changed) on demand.
+        Sources that already are RGB JPEGs within the working resolution are used as they are
+        """
+        source_path = Path(source_path)
+        width, height = self.check_dimensions(source_path)
+        with Image.open(source_path) as image:
+            if max(width, height) <= self.max_working_side and image.format == "JPEG" and image.mode == "RGB":
+                return str(source_path)
+
+        working_path = self.working_path(source_path)
+        try:
+            if working_path.stat().st_mtime_ns >= source_path.stat().st_mtime_ns:
+                return str(working_path)
+        except FileNotFoundError:
+            pass
+
+        with telemetry.span("source_normalize"):
+            with Image.open(source_path) as image:
+                # JPEG decodes straight to the smallest 1/2, 1/4 or 1/8 scale still covering the working side
+                # (draft, a no-op for other formats), which are reduced by an integer factor before the resample
+                image.draft('RGB', (self.max_working_side, self.max_working_side))
+                image.thumbnail((self.max_working_side, self.max_working_side), Image.Resampling.LANCZOS,
+                                reducing_gap=2.0)
+                working = image if image.mode == 'RGB' else image.convert('RGB')
+
+            working_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = working_path.with_name(f".{working_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                working.save(temp_path, format="JPEG", quality=self.quality)
+                os.replace(temp_path, working_path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+
+        logger.info(f"Normalized {source_path} ({width}x{height}) to {working_path} {working.size[0]}x{working.size[1]}")
+        return str(working_path)
@@ -0,0 +1,161 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds, from in-process work up to slow remote calls
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class SpanCollector:
+    def __init__(self):
+        """Per-campaign span totals, shared by every thread working on the campaign"""
+        self._stages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, error: bool):
+        with self._lock:
+            summary = self._stages.setdefault(
+                stage, {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            summary["count"] += 1
+            summary["errors"] += int(error)
+            summary["total_seconds"] += seconds
+            summary["max_seconds"] = max(summary["max_seconds"], seconds)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Stage -> count, errors, total, mean and max seconds (rounded for the metrics JSON)"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "total_seconds": round(s["total_seconds"], 4),
+                    "mean_seconds": round(s["total_seconds"] / s["count"], 4),
+                    "max_seconds": round(s["max_seconds"], 4)
+                }
+                for stage, s in sorted(self._stages.items())
+            }
+
+
+# Collector of the campaign being processed; copied into worker threads with contextvars.copy_context()
+_current_collector: contextvars.ContextVar[Optional[SpanCollector]] = contextvars.ContextVar(
+    "current_span_collector", default=None
+)
+
+
+class Telemetry:
+    def __init__(self, buckets: Iterable[float] = DURATION_BUCKETS):
+        """Stage timing histograms and counters, rendered in Prometheus text format"""
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # stage -> (bucket counts, sum, count)
+        self._histograms: Dict[str, Tuple[List[int], float, int]] = {}
+        # (name, labels) -> value
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._counter_help: Dict[str, str] = {}
+
+    @contextmanager
+    def collect(self):
+        """Collect span summaries for everything run in this context (one campaign)"""
+        collector = SpanCollector()
+        token = _current_collector.set(collector)
+        try:
+            yield collector
+        finally:
+            _current_collector.reset(token)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time a pipeline stage; exceptions are counted as stage errors and re-raised"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, error)
+
+    def record(self, stage: str, seconds: float, error: bool = False):
+        """Record a stage duration measured elsewhere (e.g. inside a render process)"""
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts, total, count = self._histograms.get(stage) or ([0] * len(self.buckets), 0.0, 0)
+            if index < len(counts):
+                counts[index] += 1
+            self._histograms[stage] = (counts, total + seconds, count + 1)
+
+        if error:
+            self.increment("pipeline_stage_errors_total", {"stage": stage}, help_text="Pipeline stages that raised")
+
+        collector = _current_collector.get()
+        if collector is not None:
+            collector.add(stage, seconds, error)
+
+    def increment(self, name: str, labels: Optional[Dict[str, str]] = None, value: float = 1,
+                  help_text: str = ""):
+        """Add to a counter"""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help_text:
+                self._counter_help.setdefault(name, help_text)
+
+    @staticmethod
+    def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+        parts = []
+        for name, value in labels:
+            value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            parts.append(f'{name}="{value}"')
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render_prometheus(self, sampled: Optional[Dict[str, Tuple[str, str, Dict[LabelKey, float]]]] = None) -> str:
+        """
+        Prometheus text exposition of histograms, counters and metrics sampled at scrape time
+        sampled: name -> (type, help text, {labels: value}), e.g. queue depth gauges
+        """
+        lines = [
+            "# HELP pipeline_stage_duration_seconds Duration of pipeline stages",
+            "# TYPE pipeline_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {stage: (list(c), s, n) for stage, (c, s, n) in self._histograms.items()}
+            counters = dict(self._counters)
+            counter_help = dict(self._counter_help)
+
+        for stage, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = self._format_labels([("stage", stage), ("le", repr(bound))])
+                lines.append(f"pipeline_stage_duration_seconds_bucket{labels} {cumulative}")
+            inf_labels = self._format_labels([("stage", stage), ("le", "+Inf")])
+            lines.append(f"pipeline_stage_duration_seconds_bucket{inf_labels} {count}")
+            stage_labels = self._format_labels([("stage", stage)])
+            lines.append(f"pipeline_stage_duration_seconds_sum{stage_labels} {total}")
+            lines.append(f"pipeline_stage_duration_seconds_count{stage_labels} {count}")
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {name} {counter_help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for name, (metric_type, help_text, samples) in sorted((sampled or {}).items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(samples.items()):
+                lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide instance used by the pipeline modules
+telemetry = Telemetry()
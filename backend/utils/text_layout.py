@@ -0,0 +1,104 @@
+from PIL import ImageFont
+from functools import lru_cache
+from typing import Dict, Tuple
+from loguru import logger
+import threading
+
+# Extra spacing between wrapped lines, as a fraction of the font height
+LINE_SPACING = 0.2
+
+# Glyph advance widths per loaded font: (font_name, size) -> {char: width}
+_advance_widths: Dict[Tuple[str, int], Dict[str, float]] = {}
+_advance_lock = threading.Lock()
+
+
+@lru_cache(maxsize=64)
+def get_font(font_name: str, size: int):
+    """Load a font once per (font, size), falling back to the default font"""
+    try:
+        return ImageFont.truetype(font_name, size)
+    except Exception:
+        logger.debug(f"Font {font_name} at size {size} unavailable, using default font")
+        return ImageFont.load_default()
+
+
+def _line_height(font) -> int:
+    """Line height from the font metrics plus spacing"""
+    if hasattr(font, "getmetrics"):
+        ascent, descent = font.getmetrics()
+        font_height = ascent + descent
+    else:
+        bbox = font.getbbox("Ag")
+        font_height = bbox[3] - bbox[1]
+    return max(1, round(font_height * (1 + LINE_SPACING)))
+
+
+def _get_advance_widths(font_name: str, size: int) -> Dict[str, float]:
+    """Advance width cache for a loaded font"""
+    font_key = (font_name, size)
+    widths = _advance_widths.get(font_key)
+    if widths is None:
+        with _advance_lock:
+            widths = _advance_widths.setdefault(font_key, {})
+    return widths
+
+
+def _text_width(text: str, font, widths: Dict[str, float]) -> float:
+    """Sum of cached glyph advance widths for the text"""
+    total = 0.0
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            width = font.getlength(char)
+            widths[char] = width
+        total += width
+    return total
+
+
+class TextLayout:
+    def __init__(self, lines: Tuple[str, ...], line_height: int, font):
+        """Wrapped lines of text ready to draw with a given font"""
+        self.lines = lines
+        self.line_height = line_height
+        self.font = font
+
+    @property
+    def height(self) -> int:
+        return len(self.lines) * self.line_height
+
+    def draw(self, draw, x: int, y: int, fill: str):
+        """Draw each line of the layout starting at (x, y)"""
+        for i, line in enumerate(self.lines):
+            draw.text((x, y + i * self.line_height), line, fill=fill, font=self.font)
+
+
+@lru_cache(maxsize=256)
+def layout_text(text: str, font_name: str, size: int, max_width: int) -> TextLayout:
+    """Word-wrap text to max_width in a single pass, cached per (text, font, size, width)"""
+    font = get_font(font_name, size)
+    widths = _get_advance_widths(font_name, size)
+    space_width = _text_width(" ", font, widths)
+
+    lines = []
+    current_line = []
+    current_width = 0.0
+
+    for word in text.split(' '):
+        word_width = _text_width(word, font, widths)
+        line_width = current_width + space_width + word_width if current_line else word_width
+
+        if line_width <= max_width:
+            current_line.append(word)
+            current_width = line_width
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+                current_width = word_width
+            else:
+                lines.append(word)  # Single word is too long, add anyway
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    return TextLayout(tuple(lines), _line_height(font), font)
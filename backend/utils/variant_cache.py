@@ -0,0 +1,194 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+# Most input files whose hashes are remembered; the oldest are dropped first
+FILE_HASH_MEMO_MAX_ENTRIES = 1024
+# Processes sharing a cache directory don't see each other's writes in their own accounting, so the directory
+# is rescanned at least this often (and whenever this process goes over the limit) before evicting
+DIRECTORY_RESCAN_SECONDS = 30.0
+
+class VariantCache:
+    def __init__(self, cache_dir: str = "cache/variants", max_size_bytes: int = 2 * 1024 ** 3, enabled: bool = True):
+        """Content-addressed on-disk cache for img2img variants with LRU eviction"""
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> size in bytes, ordered from least to most recently used
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_size = 0
+        self._scanned_at = 0.0
+        # (path, mtime_ns, size) -> sha256 of the file, avoids rehashing unchanged inputs; LRU-capped
+        self._file_hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._setup_directory()
+
+    def _setup_directory(self):
+        """Create cache directory and load existing entries in LRU order"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._scan_directory()
+        logger.info(f"Variant cache setup: {self.cache_dir} ({len(self._entries)} entries, {self._total_size} bytes)")
+
+    def _scan_directory(self):
+        """Rebuild entries and total size from the files on disk, least recently used (oldest mtime) first"""
+        entries = []
+        for entry in self.cache_dir.glob("*.jpg"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another process while scanning
+                continue
+            entries.append((stat.st_mtime_ns, entry.stem, stat.st_size))
+
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total_size = sum(size for _, _, size in entries)
+        self._scanned_at = time.monotonic()
+
+    def _hash_file(self, file_path: str) -> str:
+        """Hash file contents, memoized on path, mtime and size"""
+        stat = os.stat(file_path)
+        memo_key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            digest = self._file_hashes.get(memo_key)
+            if digest is not None:
+                self._file_hashes.move_to_end(memo_key)
+                return digest
+
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with self._lock:
+            self._file_hashes[memo_key] = digest
+            while len(self._file_hashes) > FILE_HASH_MEMO_MAX_ENTRIES:
+                self._file_hashes.popitem(last=False)
+
+        return digest
+
+    def make_key(self, input_image_path: str, prompt: str, aspect_ratio: str, model: str) -> str:
+        """Build cache key from input image bytes, prompt, aspect ratio and model version"""
+        image_hash = self._hash_file(input_image_path)
+        key_material = "\n".join([image_hash, prompt, aspect_ratio, model])
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.jpg"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return cached variant path on hit, None on miss"""
+        if not self.enabled:
+            return None
+
+        entry_path = self._entry_path(key)
+        with self._lock:
+            try:
+                size = entry_path.stat().st_size
+            except FileNotFoundError:
+                if key in self._entries:
+                    # File removed behind our back
+                    self._total_size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                # Published by another process sharing the cache directory (e.g. a worker.py batch preparation)
+                self._entries[key] = size
+                self._total_size += size
+                self._evict()
+            self.hits += 1
+            # Keep mtime in sync so LRU order survives restarts
+            os.utime(entry_path)
+            return entry_path
+
+    def put(self, key: str, source_path: Path) -> Optional[Path]:
+        """Copy a variant into the cache and evict least recently used entries over the size limit"""
+        if not self.enabled:
+            return None
+
+        temp_path = self.cache_dir / f".{key}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(source_path, temp_path)
+        except Exception as e:
+            logger.error(f"Failed to store variant in cache: {str(e)}")
+            temp_path.unlink(missing_ok=True)
+            return None
+
+        return self._publish(key, temp_path)
+
+    def put_bytes(self, key: str, data: bytes) -> Optional[Path]:
+        """Store an in-memory variant in the cache, same eviction as put"""
+        if not self.enabled:
+            return None
+
+        temp_path = self.cache_dir / f".{key}.{threading.get_ident()}.tmp"
+        try:
+            temp_path.write_bytes(data)
+        except Exception as e:
+            logger.error(f"Failed to store variant in cache: {str(e)}")
+            temp_path.unlink(missing_ok=True)
+            return None
+
+        return self._publish(key, temp_path)
+
+    def _publish(self, key: str, temp_path: Path) -> Optional[Path]:
+        """Move a fully written temp file into place and account for it"""
+        entry_path = self._entry_path(key)
+        try:
+            os.replace(temp_path, entry_path)
+        except Exception as e:
+            logger.error(f"Failed to store variant in cache: {str(e)}")
+            temp_path.unlink(missing_ok=True)
+            return None
+
+        size = entry_path.stat().st_size
+        with self._lock:
+            if key in self._entries:
+                self._total_size -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_size += size
+            if (self._total_size > self.max_size_bytes
+                    or time.monotonic() - self._scanned_at > DIRECTORY_RESCAN_SECONDS):
+                # Count what other processes sharing the directory have added, and their LRU order
+                self._scan_directory()
+            self._evict()
+
+        return entry_path
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (caller holds the lock)"""
+        while self._total_size > self.max_size_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_size -= size
+            self.evictions += 1
+            self._entry_path(key).unlink(missing_ok=True)
+            logger.debug(f"Evicted cached variant {key}")
+
+    def get_stats(self) -> Dict:
+        """Get cache counters and usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "cache_directory": str(self.cache_dir),
+                "entries": len(self._entries),
+                "size_bytes": self._total_size,
+                "max_size_bytes": self.max_size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,50 @@
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+class _StreamBuffer:
+    """Write-only file object that hands written bytes back to the generator"""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files: Iterable[Tuple[Path, str]], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Build a ZIP archive on the fly from (file path, archive name) pairs
+    Entries are stored uncompressed and memory use stays around one chunk per file
+    """
+    buffer = _StreamBuffer()
+    # The buffer has no tell/seek, so zipfile writes data descriptors instead of seeking back
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for file_path, arcname in files:
+            file_path = Path(file_path)
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(stat.st_mtime)[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = stat.st_size
+
+            with open(file_path, "rb") as source, archive.open(info, mode="w", force_zip64=stat.st_size > 0x7FFFFFFF) as entry:
+                for chunk in iter(lambda: source.read(chunk_size), b""):
+                    entry.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+
+    # Central directory
+    yield buffer.drain()
@@ -0,0 +1,30 @@
+"""
+Standalone campaign worker process.
+
+Runs campaign jobs from the shared job store without serving the API, so API
+and worker processes can be scaled independently on one host:
+
+    CAMPAIGN_WORKERS=0 uvicorn app:app --workers 4
+    CAMPAIGN_WORKERS=4 python worker.py
+"""
+import signal
+import threading
+from loguru import logger
+
+if __name__ == "__main__":
+    # Imported here: spawned render processes re-run this script and must not build the app again
+    from app import campaign_workers, render_pool, CAMPAIGN_WORKERS
+    
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    
+    if CAMPAIGN_WORKERS < 1:
+        raise SystemExit("CAMPAIGN_WORKERS must be at least 1 for a worker process")
+    
+    campaign_workers.start()
+    stop_event.wait()
+    
+    logger.info("Stopping campaign workers, waiting for in-flight campaigns")
+    campaign_workers.stop()
+    render_pool.shutdown()
@@ -11,35 +11,65 @@ import {
   Alert,
   Spinner
 } from '@cloudscape-design/components';
-import { getCampaignStatus } from '../services/api';
+import { getCampaignStatus, campaignEventsUrl } from '../services/api';
 
 export default function CampaignResults({ campaignId, onError }) {
   const [campaignData, setCampaignData] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [readyCreatives, setReadyCreatives] = useState([]);
+  const [lastEventId, setLastEventId] = useState(null);
 
   useEffect(() => {
     if (campaignId) {
-      // Check status immediately
+      // Load a snapshot once, then follow the event stream from there
+      setReadyCreatives([]);
+      setLastEventId(null);
       checkCampaignStatus();
     }
   }, [campaignId]);
 
   useEffect(() => {
-    if (campaignId && campaignData?.status === 'processing') {
-      // Set up polling only when campaign is processing
-      const interval = setInterval(() => {
-        checkCampaignStatus();
-      }, 3000);
-
-      return () => clearInterval(interval);
+    if (!campaignId || lastEventId === null || campaignData?.status !== 'processing') {
+      return undefined;
     }
-  }, [campaignId, campaignData?.status]);
+
+    // EventSource reconnects by itself and resumes after the last received event
+    const source = new EventSource(campaignEventsUrl(campaignId, lastEventId));
+    const parse = (event) => JSON.parse(event.data);
+
+    source.addEventListener('log', (event) => {
+      const { message } = parse(event);
+      setCampaignData((current) => ({ ...current, logs: [...(current.logs || []), message] }));
+    });
+    source.addEventListener('status', (event) => {
+      const { status } = parse(event);
+      setCampaignData((current) => ({ ...current, status }));
+    });
+    source.addEventListener('creative', (event) => {
+      const creative = parse(event);
+      setReadyCreatives((current) => [...current, creative]);
+    });
+    source.addEventListener('product', (event) => {
+      const { product, result } = parse(event);
+      setCampaignData((current) => ({ ...current, creatives: { ...current.creatives, [product]: result } }));
+    });
+    source.addEventListener('reset', () => {
+      setReadyCreatives([]);
+      setCampaignData((current) => ({ ...current, creatives: {} }));
+    });
+    // Status is read from the snapshot only: the stream stays open past the final status
+    // event so trailing log lines arrive, and closes on 'end'
+    source.addEventListener('end', () => source.close());
+
+    return () => source.close();
+  }, [campaignId, lastEventId]);
 
   const checkCampaignStatus = async () => {
     setLoading(true);
     try {
       const result = await getCampaignStatus(campaignId);
       setCampaignData(result);
+      setLastEventId(result.last_event_id || 0);
     } catch (error) {
       onError(`Error: ${error.message}`);
     } finally {
@@ -65,7 +95,11 @@ export default function CampaignResults({ campaignId, onError }) {
   const getProgress = (status) => {
     switch (status) {
       case 'completed': return 100;
-      case 'processing': return 60;
+      case 'processing': {
+        // Three aspect ratios per product
+        const expected = (campaignData?.brief?.products?.length || 0) * 3;
+        return expected ? Math.min(95, 10 + Math.round((readyCreatives.length / expected) * 85)) : 10;
+      }
       case 'failed': return 100;
       default: return 0;
     }
@@ -101,7 +135,7 @@ export default function CampaignResults({ campaignId, onError }) {
           <Box>
             <ProgressBar
               value={getProgress(campaignData.status)}
-              description={campaignData.status === 'processing' ? 'Generating creatives...' : ''}
+              description={campaignData.status === 'processing' ? `Generating creatives... ${readyCreatives.length} ready` : ''}
               variant={campaignData.status === 'failed' ? 'error' : 'success'}
             />
           </Box>
@@ -10,7 +10,7 @@ import {
   ExpandableSection,
   Alert
 } from '@cloudscape-design/components';
-import { listCampaigns, getCampaignImages, downloadCampaignImage } from '../services/api';
+import { listCampaigns, getCampaignImages, downloadCampaignImage, campaignRenditionUrl } from '../services/api';
 
 export default function DownloadsPage({ onError }) {
   const [campaigns, setCampaigns] = useState([]);
@@ -131,6 +131,14 @@ export default function DownloadsPage({ onError }) {
                     {images.map((image, index) => (
                       <Box key={index}>
                         <SpaceBetween direction="horizontal" size="s" alignItems="center">
+                          {image.renditions?.thumbnail && (
+                            <img
+                              src={campaignRenditionUrl(selectedCampaign.value, productName, image.renditions.thumbnail.filename)}
+                              alt={`${productName} ${image.aspect_ratio}`}
+                              loading="lazy"
+                              style={{ maxWidth: 80, maxHeight: 80 }}
+                            />
+                          )}
                           <Box>
                             <strong>{image.aspect_ratio}</strong> ({image.aspect_ratio === '1:1' ? 'Square' : image.aspect_ratio === '9:16' ? 'Portrait' : 'Landscape'})
                           </Box>
@@ -27,6 +27,11 @@ export const getCampaignStatus = async (campaignId) => {
   return response.json();
 };
 
+// Server-Sent Events stream of campaign progress, starting after the given event id
+export const campaignEventsUrl = (campaignId, afterEventId = 0) => {
+  return `${API_BASE}/campaign/${campaignId}/events?after=${afterEventId}`;
+};
+
 export const listCampaigns = async () => {
   const response = await fetch(`${API_BASE}/campaigns`);
   
@@ -63,6 +68,10 @@ export const downloadCampaignImage = (campaignId, productName, filename) => {
   return `${API_BASE}/campaign/${campaignId}/download/${productName}/${filename}`;
 };
 
+export const campaignRenditionUrl = (campaignId, productName, filename) => {
+  return `${API_BASE}/campaign/${campaignId}/renditions/${productName}/${filename}`;
+};
+
 // Image upload
 export const uploadProductImage = async (productName, imageFile) => {
   const formData = new FormData();